@@ -1,15 +1,158 @@
 from flask import Flask
+import json
 import os
 
-def create_app():
+# Settings that are always strings, even when they happen to parse as JSON
+STRING_SETTINGS = {"SECRET_KEY", "DATABASE", "PASSWORD_HASH_METHOD"}
+
+
+def config_from_env(environ=None, prefix="HMS_"):
+    """
+    Config overrides from the environment: HMS_<KEY>=<value> -> {KEY: value}.
+    Values are parsed as JSON when possible (numbers, true/false, null,
+    {"pragma": ...} objects), otherwise kept as strings.
+    """
+    environ = os.environ if environ is None else environ
+    config = {}
+    for name, raw in environ.items():
+        if not name.startswith(prefix):
+            continue
+        key = name[len(prefix):]
+        if key in STRING_SETTINGS:
+            config[key] = raw
+            continue
+        try:
+            config[key] = json.loads(raw)
+        except ValueError:
+            config[key] = raw
+    return config
+
+
+def prepare_database(db_path, config=None):
+    """Create missing tables and apply pending migrations, sized by `config` (e.g. SLOT_MINUTES)."""
+    from models.models import create_tables
+    from models.migrations import migrate
+    create_tables(db_path)
+    migrate(db_path, config)
+
+
+def create_app(config=None, migrate=True):
     app = Flask(__name__)
     app.config["SECRET_KEY"] = "change-this-secret-key"
     base_dir = os.path.dirname(__file__)
     app.config["DATABASE"] = os.path.join(base_dir, "instance", "hospital.db")
 
+    # Connection pool: one connection per request, shared by every helper
+    app.config["DB_POOL_SIZE"] = 5
+    app.config["DB_POOL_TIMEOUT"] = 10.0
+    app.config["DB_PRAGMAS"] = {"temp_store": "MEMORY"}
+
+    # "concurrent" = WAL + one serialized writer connection (opt-in)
+    app.config["DB_STORAGE_MODE"] = "default"
+    app.config["DB_WRITE_RETRIES"] = 5
+
+    # How long a patient/doctor id cached in the session is trusted before re-checking
+    app.config["PROFILE_RECHECK_SECONDS"] = 300
+
+    # Keyset-paginated listings
+    app.config["ADMIN_APPOINTMENTS_PAGE_SIZE"] = 50
+    app.config["HISTORY_PAGE_SIZE"] = 20
+    app.config["MAX_PAGE_SIZE"] = 500
+
+    # Departments / doctor directory cache (CACHE_BACKEND=None -> in-process dict)
+    app.config["CACHE_BACKEND"] = None
+    app.config["CACHE_DEFAULT_TTL"] = 300
+    app.config["DIRECTORY_CACHE_TTL"] = 300
+
+    # Compiled templates cached on disk (None = off), and the default TTL of
+    # {% cache %} template fragments
+    app.config["TEMPLATE_BYTECODE_CACHE_DIR"] = os.path.join(base_dir, "instance", "jinja_cache")
+    app.config["FRAGMENT_CACHE_TTL"] = 300
+
+    # Patient dashboard's shared 7-day availability rows: rebuilt at least this
+    # often (seconds) so changes made by other workers show up
+    app.config["AVAILABILITY_SNAPSHOT_MAX_AGE"] = 60
+
+    # Length of one bookable slot inside an availability window
+    app.config["SLOT_MINUTES"] = 15
+    app.config["MAX_SCHEDULE_WEEKS"] = 26
+
+    # Rows fetched per fetchmany() batch by the streaming exports
+    app.config["EXPORT_BATCH_SIZE"] = 500
+
+    # Password hashing: werkzeug method string (cost included), and the bounded
+    # pool login() verifies on; older hashes are upgraded on next login
+    app.config["PASSWORD_HASH_METHOD"] = "scrypt"
+    app.config["PASSWORD_VERIFY_WORKERS"] = 2
+    app.config["PASSWORD_VERIFY_QUEUE"] = 32
+    app.config["PASSWORD_VERIFY_TIMEOUT"] = 10.0
+
+    # Per-endpoint latency / SQL metrics at /admin/metrics (Prometheus text);
+    # off by default since every connection is then traced (on in
+    # create_production_app). SQL_SLOW_QUERY_MS = None keeps the slow-query log off
+    app.config["METRICS_ENABLED"] = False
+    app.config["SQL_N_PLUS_ONE_THRESHOLD"] = 10
+    app.config["SQL_SLOW_QUERY_MS"] = None
+
+    # Async serving mode (asgi.py): DB executor threads, and threads running
+    # the Flask app for routes without an async handler
+    app.config["ASYNC_DB_WORKERS"] = 4
+    app.config["ASGI_WSGI_THREADS"] = 8
+
+    if config:
+        app.config.update(config)
+
+    # Bring the schema up to date before any worker touches it (serve.py does
+    # it once before forking and passes migrate=False)
+    if migrate:
+        prepare_database(app.config["DATABASE"], app.config)
+
+    from models import pool
+    pool.init_app(app)
+
+    from models import cache
+    cache.init_app(app)
+
+    from models import fragments
+    fragments.init_app(app)
+
+    from models import snapshot
+    snapshot.init_app(app)
+
+    from models import passwords
+    passwords.init_app(app)
+
+    if app.config["METRICS_ENABLED"]:
+        from models import metrics
+        metrics.init_app(app)
+
     from controllers.routes import main_bp
     app.register_blueprint(main_bp)
 
+    from controllers.api import api_bp
+    app.register_blueprint(api_bp)
+
+    from commands import register_commands
+    register_commands(app)
+
+    return app
+
+
+def create_production_app(environ=None, migrate=True):
+    """
+    create_app() configured from HMS_* environment variables, warmed up so
+    the first request doesn't pay for template compilation or cold
+    connections/caches (see warmup.py). HMS_SECRET_KEY is required.
+    """
+    config = config_from_env(environ)
+    if "SECRET_KEY" not in config:
+        raise RuntimeError("HMS_SECRET_KEY must be set for production")
+    config.setdefault("METRICS_ENABLED", True)
+
+    app = create_app(config, migrate=migrate)
+
+    from warmup import warm_up
+    warm_up(app)
     return app
 
 
@@ -0,0 +1,350 @@
+# asgi.py
+"""
+Async (ASGI) serving mode.
+
+    uvicorn --factory asgi:create_asgi_app --workers 2
+
+The endpoints that clients poll run as coroutines on models.async_db, so a
+slow query never holds a worker:
+
+    GET /api/stats
+    GET /api/v1/doctors/<id>/availability
+    GET /api/v1/appointments
+
+Their payloads, validators and access checks come from the same helpers
+as the Flask views (controllers.api, controllers.routes.stats_summary), so
+both modes return the same bodies and validators. Every other request,
+and any request whose session needs its profile re-checked, goes to the
+unchanged Flask app on a thread pool. Flask views run synchronously
+either way (async def views would still hold a thread per request).
+"""
+import asyncio
+import concurrent.futures
+import io
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qsl
+
+from werkzeug.http import parse_date, parse_etags
+
+from app import create_app
+from controllers.api import (
+    appointments_listing,
+    availability_payload,
+    encode_json,
+    make_etag,
+    validator_headers,
+    validators_match,
+)
+from controllers.routes import PROFILE_QUERIES, page_size, profile_is_stale, stats_summary
+from models.async_db import AsyncDatabase
+from models.pool import CONCURRENT_PRAGMAS
+
+
+class ClientDisconnected(Exception):
+    """The client went away while a WSGI response was being produced."""
+
+
+class Request:
+    """The parts of an ASGI http scope the async handlers need."""
+
+    def __init__(self, scope):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query_string = scope.get("query_string", b"").decode("latin-1")
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        self.args = {}
+        for key, value in parse_qsl(self.query_string, keep_blank_values=True):
+            self.args.setdefault(key, value)  # first value wins, like request.args.get
+        self.if_none_match = parse_etags(self.headers.get("if-none-match"))
+        self.if_modified_since = parse_date(self.headers.get("if-modified-since"))
+        self.session = None
+
+    def is_fresh(self, etag, last_modified=None):
+        return validators_match(etag, last_modified, self.if_none_match, self.if_modified_since)
+
+
+class AsyncApp:
+    def __init__(self, flask_app, db, wsgi_threads=8):
+        self.flask_app = flask_app
+        self.db = db
+        self.metrics = flask_app.extensions.get("metrics")
+        self._wsgi_pool = ThreadPoolExecutor(max_workers=wsgi_threads, thread_name_prefix="wsgi")
+        self._session_serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+        self.routes = [
+            (re.compile(r"^/api/stats$"), self.api_stats),
+            (re.compile(r"^/api/v1/doctors/(\d+)/availability$"), self.doctor_availability),
+            (re.compile(r"^/api/v1/appointments$"), self.appointments),
+        ]
+
+    # --------- ASGI entry ---------
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+
+        if scope["method"] in ("GET", "HEAD"):
+            for pattern, handler in self.routes:
+                match = pattern.match(scope["path"])
+                if match:
+                    request = Request(scope)
+                    request.session = self.load_session(request)
+                    if request.session is not None:
+                        started = time.perf_counter()
+                        response = await handler(request, *match.groups())
+                        if response is not None:
+                            status, headers, body = response
+                            self.record(handler.__name__, request.method, status, started)
+                            return await self.respond(send, status, headers, body, head=request.method == "HEAD")
+                    break  # no usable session, or the handler deferred: let Flask answer
+
+        await self.call_wsgi(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def close(self):
+        self._wsgi_pool.shutdown(wait=False)
+        self.db.close()
+
+    # --------- Sessions ---------
+    def load_session(self, request):
+        """
+        The Flask session, if it can be trusted without a database round
+        trip; None means "hand the request to Flask" (missing, invalid, or
+        the cached profile id is due for a re-check).
+        """
+        cookie = SimpleCookie(request.headers.get("cookie", ""))
+        morsel = cookie.get(self.flask_app.config["SESSION_COOKIE_NAME"])
+        if morsel is None or self._session_serializer is None:
+            return None
+        try:
+            max_age = int(self.flask_app.permanent_session_lifetime.total_seconds())
+            sess = self._session_serializer.loads(morsel.value, max_age=max_age)
+        except Exception:
+            return None
+        if "user_id" not in sess:
+            return None
+        if sess.get("role") in PROFILE_QUERIES:
+            with self.flask_app.app_context():
+                if profile_is_stale(sess):
+                    return None
+        return sess
+
+    # --------- Responses ---------
+    async def respond(self, send, status, headers, body, head=False):
+        # Every async answer depends on the session, as Flask's Vary: Cookie says.
+        headers = [(b"content-length", str(len(body)).encode()), (b"vary", b"Cookie")] + [
+            (k.lower().encode("latin-1"), v.encode("latin-1"))
+            for k, v in headers if k.lower() not in ("content-length", "vary")
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if head else body})
+
+    def json(self, request, payload, etag=None, last_modified=None):
+        """controllers.api.json_response, for the async handlers."""
+        body = encode_json(payload)
+        if etag is None:
+            etag = make_etag(body)
+        if request.is_fresh(etag, last_modified):
+            return self.not_modified(etag, last_modified)
+        headers = [("Content-Type", "application/json")] + validator_headers(etag, last_modified)
+        return 200, headers, body.encode("utf-8")
+
+    def not_modified(self, etag, last_modified=None):
+        return 304, validator_headers(etag, last_modified), b""
+
+    def error(self, status, message):
+        """controllers.api.api_error, for the async handlers."""
+        body = json.dumps({"error": message}).encode("utf-8")
+        return status, [("Content-Type", "application/json")], body
+
+    def record(self, name, method, status, started):
+        # No SQL sample: statements on the async DB threads are not traced.
+        if self.metrics is not None:
+            self.metrics.observe_request(f"async.{name}", method, status, time.perf_counter() - started)
+
+    # --------- Async handlers ---------
+    async def api_stats(self, request):
+        if request.session.get("role") != "admin":
+            return None  # Flask's role_required redirect
+        payload = await self.db.run(stats_summary)
+        with self.flask_app.app_context():
+            response = self.flask_app.json.response(payload)  # what jsonify returns
+        return response.status_code, list(response.headers.items()), response.get_data()
+
+    async def doctor_availability(self, request, doctor_id):
+        doctor_id = int(doctor_id)
+        doctor = await self.db.fetchone(
+            """
+            SELECT 1 FROM doctors d JOIN users u ON d.user_id = u.id
+            WHERE d.id = ? AND d.is_blacklisted = 0 AND u.is_active = 1;
+            """,
+            (doctor_id,),
+        )  # the rows get_doctor_directory() lists
+        if doctor is None:
+            return self.error(404, "Doctor not found.")
+        return self.json(request, await self.db.run(availability_payload, doctor_id))
+
+    async def appointments(self, request):
+        """controllers.api.appointments, with both queries on one DB thread hop."""
+        section = request.args.get("section", "upcoming")
+        if section not in ("upcoming", "past"):
+            return self.error(400, "section must be 'upcoming' or 'past'.")
+
+        limit = page_size("HISTORY_PAGE_SIZE", request.args, self.flask_app.config)
+        etag, last_modified, payload = await self.db.run(
+            appointments_listing,
+            request.session["role"],
+            request.session.get("profile_id"),
+            section,
+            request.args,
+            request.query_string,
+            limit,
+            request.is_fresh,
+        )
+        if payload is None:
+            return self.not_modified(etag, last_modified)
+        return self.json(request, payload, etag=etag, last_modified=last_modified)
+
+    # --------- Everything else: the Flask app on a thread ---------
+    async def call_wsgi(self, scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(maxsize=8)
+        done = object()
+        gone = threading.Event()  # set when the client disconnects
+
+        def put(item):
+            if gone.is_set():
+                raise ClientDisconnected()
+            pending = asyncio.run_coroutine_threadsafe(chunks.put(item), loop)
+            while True:
+                try:
+                    return pending.result(timeout=0.5)
+                except concurrent.futures.TimeoutError:
+                    if gone.is_set():
+                        pending.cancel()
+                        raise ClientDisconnected() from None
+
+        def produce():
+            # The whole response is produced on this one thread, so streamed
+            # responses (stream_with_context) keep their context intact.
+            def start_response(status, headers, exc_info=None):
+                put(("start", int(status.split(" ", 1)[0]), headers))
+
+            result = self.flask_app(build_environ(scope, body), start_response)
+            try:
+                for chunk in result:
+                    if chunk:
+                        put(("body", chunk))
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+
+        def run():
+            try:
+                produce()
+            except ClientDisconnected:
+                pass  # the iterable is closed; nobody is waiting for the rest
+            finally:
+                try:
+                    put(done)
+                except ClientDisconnected:
+                    pass
+
+        async def disconnected():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        future = loop.run_in_executor(self._wsgi_pool, run)
+        watcher = asyncio.ensure_future(disconnected())
+        try:
+            while True:
+                getter = asyncio.ensure_future(chunks.get())
+                await asyncio.wait((getter, watcher), return_when=asyncio.FIRST_COMPLETED)
+                if watcher.done():
+                    getter.cancel()
+                    return  # client went away: the finally stops the producer
+                item = getter.result()
+                if item is done:
+                    break
+                if item[0] == "start":
+                    await send({
+                        "type": "http.response.start",
+                        "status": item[1],
+                        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in item[2]],
+                    })
+                else:
+                    await send({"type": "http.response.body", "body": item[1], "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            watcher.cancel()
+            gone.set()  # unblocks (and ends) the producer if it is still running
+            await asyncio.shield(future)
+
+
+def build_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("127.0.0.1", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    environ["CONTENT_LENGTH"] = str(len(body))  # body is fully buffered (also covers chunked uploads)
+    return environ
+
+
+def create_asgi_app(config=None):
+    flask_app = create_app(config)
+    pragmas = dict(flask_app.config.get("DB_PRAGMAS") or {})
+    if flask_app.config.get("DB_STORAGE_MODE") == "concurrent":
+        pragmas = {**CONCURRENT_PRAGMAS, **pragmas}
+    db = AsyncDatabase(
+        flask_app.config["DATABASE"],
+        workers=flask_app.config.get("ASYNC_DB_WORKERS", 4),
+        pragmas=pragmas,
+    )
+    return AsyncApp(flask_app, db, wsgi_threads=flask_app.config.get("ASGI_WSGI_THREADS", 8))
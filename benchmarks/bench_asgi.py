@@ -0,0 +1,173 @@
+# benchmarks/bench_asgi.py
+"""
+Polling throughput: the Flask app on a fixed pool of threads (a threaded
+WSGI server) vs the async handlers in asgi.py on one event loop.
+Logged-in patients and doctors poll /api/v1/appointments and doctor
+availability; requests/second and latency percentiles are reported for each
+mode at the same client concurrency.
+
+    python -m benchmarks.bench_asgi --clients 64 --requests 2000
+    python -m benchmarks.bench_asgi --db /tmp/big.db --threads 8 --db-workers 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgi import create_asgi_app
+from benchmarks.synthetic import generate
+from models.models import get_db_connection
+
+HASH_METHOD = "pbkdf2:sha256:1000"  # what benchmarks.synthetic hashes with by default
+
+
+def percentile(samples, pct):
+    idx = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+    return samples[idx]
+
+
+def login_cookies(flask_app, usernames, password):
+    cookies = []
+    for username in usernames:
+        client = flask_app.test_client()
+        client.post("/login", data={"username": username, "password": password})
+        cookie = client.get_cookie(flask_app.config["SESSION_COOKIE_NAME"])
+        cookies.append(f"{cookie.key}={cookie.value}")
+    return cookies
+
+
+def plan(args, cookies, doctor_ids):
+    """The same (cookie, path, query) sequence for both modes."""
+    rnd = random.Random(args.seed)
+    requests = []
+    for _ in range(args.requests):
+        cookie = rnd.choice(cookies)
+        if rnd.random() < 0.5:
+            requests.append((cookie, "/api/v1/appointments", "per_page=20"))
+        else:
+            requests.append((cookie, f"/api/v1/doctors/{rnd.choice(doctor_ids)}/availability", ""))
+    return requests
+
+
+def run_wsgi(flask_app, requests, clients, threads):
+    pool = ThreadPoolExecutor(max_workers=threads)  # the server's worker threads
+    latencies, statuses = [], []
+
+    def handle(cookie, path, query):
+        client = flask_app.test_client()
+        key, _, value = cookie.partition("=")
+        client.set_cookie(key, value)
+        return client.get(path, query_string=query).status_code
+
+    def client(n):
+        # Each client waits for its response before sending the next request.
+        for cookie, path, query in requests[n::clients]:
+            started = time.perf_counter()
+            statuses.append(pool.submit(handle, cookie, path, query).result())
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as senders:
+        list(senders.map(client, range(clients)))
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+    return elapsed, latencies, statuses
+
+
+async def run_asgi(app, requests, clients):
+    latencies, statuses = [], []
+
+    async def call(cookie, path, query):
+        messages = []
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if request_sent:
+                await asyncio.Event().wait()  # the client never disconnects
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+            "headers": [(b"cookie", cookie.encode())],
+        }
+        await app(scope, receive, send)
+        return messages[0]["status"]
+
+    async def client(n):
+        for cookie, path, query in requests[n::clients]:
+            started = time.perf_counter()
+            statuses.append(await call(cookie, path, query))
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    return time.perf_counter() - started, latencies, statuses
+
+
+def report(name, elapsed, latencies, statuses):
+    samples = sorted(latencies)
+    errors = sum(1 for s in statuses if s != 200)
+    print(
+        f"{name:6s} {len(samples) / elapsed:9.1f} {percentile(samples, 50) * 1000:8.1f} "
+        f"{percentile(samples, 95) * 1000:8.1f} {percentile(samples, 99) * 1000:8.1f} {errors:7d}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", help="existing database generated by benchmarks.synthetic")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--password", default="password", help="password of the generated users")
+    parser.add_argument("--users", type=int, default=32, help="distinct logged-in sessions")
+    parser.add_argument("--clients", type=int, default=64, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per mode")
+    parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads")
+    parser.add_argument("--db-workers", type=int, default=4, help="ASYNC_DB_WORKERS")
+    parser.add_argument("--mode", choices=("default", "concurrent"), default="concurrent", help="DB_STORAGE_MODE")
+    args = parser.parse_args()
+
+    db_path = args.db
+    if not db_path:
+        db_path = os.path.join(tempfile.mkdtemp(), "asgi.db")
+        print(f"Generating data into {db_path}...")
+        generate(db_path, seed=args.seed, doctors=args.doctors, patients=args.patients,
+                 password=args.password, log=lambda msg: None)
+
+    app = create_asgi_app({
+        "DATABASE": db_path,
+        "DB_STORAGE_MODE": args.mode,
+        "DB_POOL_SIZE": args.threads,
+        "PASSWORD_HASH_METHOD": HASH_METHOD,
+        "ASYNC_DB_WORKERS": args.db_workers,
+    })
+    flask_app = app.flask_app
+
+    conn = get_db_connection(db_path)
+    usernames = [r[0] for r in conn.execute(
+        "SELECT username FROM users WHERE role IN ('patient', 'doctor') AND is_active = 1 ORDER BY id LIMIT ?;",
+        (args.users,),
+    )]
+    doctor_ids = [r[0] for r in conn.execute("SELECT id FROM doctors WHERE is_blacklisted = 0;")]
+    conn.close()
+
+    requests = plan(args, login_cookies(flask_app, usernames, args.password), doctor_ids)
+
+    print(f"\n{args.requests} requests, {args.clients} clients, storage mode {args.mode!r}")
+    print(f"{'mode':6s} {'req/s':>9s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'errors':>7s}")
+    report("wsgi", *run_wsgi(flask_app, requests, args.clients, args.threads))
+    report("asgi", *asyncio.run(run_asgi(app, requests, args.clients)))
+    app.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# benchmarks/bench_booking.py
+"""
+Booking stress test: many threads race for one doctor's slots.
+Verifies there are no double bookings and no window goes over
+max_appointments, and reports booking throughput for both storage modes.
+
+    python -m benchmarks.bench_booking --threads 16 --attempts 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from app import create_app
+from models.availability import expand_window
+from models.booking import BookingError, book_appointment
+from models.models import create_tables, get_db_connection
+from models.pool import run_write
+
+
+def seed(db_path, patients, windows, capacity):
+    create_tables(db_path)
+    conn = get_db_connection(db_path)
+    now = datetime.utcnow().isoformat()
+    cur = conn.execute(
+        "INSERT INTO users (username, password_hash, full_name, role, is_active, created_at) "
+        "VALUES ('doc', 'x', 'Dr Busy', 'doctor', 1, ?);",
+        (now,),
+    )
+    conn.execute("INSERT INTO doctors (user_id) VALUES (?);", (cur.lastrowid,))
+    for i in range(patients):
+        cur = conn.execute(
+            "INSERT INTO users (username, password_hash, full_name, role, is_active, created_at) "
+            "VALUES (?, 'x', ?, 'patient', 1, ?);",
+            (f"p{i}", f"Patient {i}", now),
+        )
+        conn.execute("INSERT INTO patients (user_id) VALUES (?);", (cur.lastrowid,))
+    conn.commit()
+    conn.close()
+
+    # Windows are added after the app has migrated the schema (slot grid exists)
+    day = (date.today() + timedelta(days=1)).isoformat()
+    return [(day, f"{9 + i:02d}:00", f"{10 + i:02d}:00", capacity) for i in range(windows)]
+
+
+def add_windows(app, windows):
+    def insert(cur):
+        for day, start, end, capacity in windows:
+            cur.execute(
+                "INSERT INTO doctor_availability (doctor_id, date, start_time, end_time, max_appointments, is_available) "
+                "VALUES (1, ?, ?, ?, ?, 1);",
+                (day, start, end, capacity),
+            )
+            expand_window(cur, cur.lastrowid, app.config["SLOT_MINUTES"])
+
+    with app.app_context():
+        run_write(insert)
+
+
+def verify(db_path):
+    """Return a list of invariant violations (empty = no overbooking)."""
+    conn = get_db_connection(db_path)
+    problems = []
+    dupes = conn.execute(
+        "SELECT doctor_id, date, time, COUNT(*) c FROM appointments "
+        "GROUP BY doctor_id, date, time HAVING c > 1;"
+    ).fetchall()
+    problems += [f"double booking at {r['date']} {r['time']}" for r in dupes]
+    over = conn.execute(
+        """
+        SELECT da.id, da.max_appointments,
+               (SELECT COUNT(*) FROM appointments a
+                WHERE a.doctor_id = da.doctor_id AND a.date = da.date
+                  AND a.time >= da.start_time AND a.time < da.end_time
+                  AND a.status != 'Cancelled') AS booked
+        FROM doctor_availability da;
+        """
+    ).fetchall()
+    problems += [
+        f"window {r['id']} has {r['booked']} > max {r['max_appointments']}"
+        for r in over if r["booked"] > r["max_appointments"]
+    ]
+    conn.close()
+    return problems
+
+
+def run_mode(mode, args):
+    db_path = os.path.join(tempfile.mkdtemp(), "booking.db")
+    windows = seed(db_path, args.threads * 4, args.windows, args.capacity)
+    app = create_app({
+        "DATABASE": db_path,
+        "DB_STORAGE_MODE": mode,
+        "DB_POOL_SIZE": args.threads,
+        "DB_WRITE_RETRIES": 10,
+    })
+    add_windows(app, windows)
+    slot_minutes = app.config["SLOT_MINUTES"]
+    times = [f"{9 + w:02d}:{m:02d}" for w in range(args.windows) for m in range(0, 60, slot_minutes)]
+    day = windows[0][0]
+
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def worker(n):
+        rnd = random.Random(n)
+        for _ in range(args.attempts):
+            patient_id = rnd.randint(1, args.threads * 4)
+            slot = rnd.choice(times)
+            try:
+                with app.app_context():
+                    run_write(lambda cur: book_appointment(cur, patient_id, 1, day, slot))
+                result = "booked"
+            except BookingError as e:
+                result = e.reason
+            except Exception as e:  # lock timeouts etc. are reported, not hidden
+                result = type(e).__name__
+            with lock:
+                outcomes[result] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    attempts = sum(outcomes.values())
+    expected = min(len(times), args.windows * args.capacity)
+    problems = verify(db_path)
+    print(
+        f"[{mode}] {attempts} attempts in {elapsed:.2f}s ({attempts / elapsed:.0f} attempts/s), "
+        f"booked {outcomes['booked']}/{expected} possible, outcomes={dict(outcomes)}"
+    )
+    for p in problems:
+        print(f"  OVERBOOKED: {p}")
+    return not problems and outcomes["booked"] == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--attempts", type=int, default=200, help="booking attempts per thread")
+    parser.add_argument("--windows", type=int, default=3)
+    parser.add_argument("--capacity", type=int, default=3, help="max_appointments per window")
+    args = parser.parse_args()
+
+    ok = all([run_mode(mode, args) for mode in ("default", "concurrent")])
+    print("OK: no overbooking." if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
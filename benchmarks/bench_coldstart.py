@@ -0,0 +1,100 @@
+# benchmarks/bench_coldstart.py
+"""
+Cold start to first response: create_app() vs the warmed-up
+create_production_app(). Each run is a fresh interpreter that imports the
+app, builds it, and serves the first request of a few routes; the medians
+over --runs are reported.
+
+    python -m benchmarks.bench_coldstart --runs 5
+    python -m benchmarks.bench_coldstart --db /tmp/big.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROUTES = ("/login", "/admin/dashboard", "/admin/appointments", "/api/v1/doctors")
+
+
+def child(mode, db_path, admin_id):
+    """Runs in the fresh interpreter; prints {step: ms} as JSON."""
+    started = time.perf_counter()
+    from app import create_app, create_production_app
+    timings = {"import": time.perf_counter() - started}
+
+    step = time.perf_counter()
+    if mode == "production":
+        app = create_production_app({"HMS_DATABASE": db_path, "HMS_SECRET_KEY": "bench"})
+    else:
+        app = create_app({"DATABASE": db_path})
+    timings["factory"] = time.perf_counter() - step
+
+    import encodings.idna  # noqa: F401 -- imported by the test client on first use, not by the app
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = admin_id
+        sess["role"] = "admin"
+    for path in ROUTES:
+        step = time.perf_counter()
+        status = client.get(path).status_code
+        timings[f"first {path}"] = time.perf_counter() - step
+        timings.setdefault("start to first response", time.perf_counter() - started)
+        if status != 200:
+            raise SystemExit(f"{path}: HTTP {status}")
+    print(json.dumps({k: v * 1000 for k, v in timings.items()}))
+
+
+def run(mode, db_path, admin_id):
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_coldstart", "--child", mode, "--db", db_path,
+         "--admin-id", str(admin_id)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", help="existing database (default: a generated one)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", choices=("default", "production"), help=argparse.SUPPRESS)
+    parser.add_argument("--admin-id", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.db, args.admin_id)
+
+    db_path = args.db
+    if not db_path:
+        from benchmarks.synthetic import generate
+        from models.models import seed_admin_and_defaults
+
+        db_path = os.path.join(tempfile.mkdtemp(), "coldstart.db")
+        print(f"Generating data into {db_path}...")
+        generate(db_path, log=lambda msg: None)
+        seed_admin_and_defaults(db_path)
+
+    conn = sqlite3.connect(db_path)
+    admin_id = conn.execute("SELECT id FROM users WHERE role = 'admin' ORDER BY id LIMIT 1;").fetchone()[0]
+    conn.close()
+
+    results = {
+        mode: [run(mode, db_path, admin_id) for _ in range(args.runs)]
+        for mode in ("default", "production")
+    }
+
+    print(f"\nmedian of {args.runs} runs, ms")
+    print(f"{'step':32s} {'create_app':>12s} {'production':>12s}")
+    for step in results["default"][0]:
+        before, after = (statistics.median(r[step] for r in results[mode]) for mode in ("default", "production"))
+        print(f"{step:32s} {before:12.1f} {after:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_passwords.py
+"""
+Login throughput at different password hashing costs.
+Each method gets a fresh database with users hashed under it; concurrent
+clients then POST /login and the logins/second and latencies are reported.
+
+    python -m benchmarks.bench_passwords --threads 8 --logins 64
+    python -m benchmarks.bench_passwords --method pbkdf2:sha256:100000 --method scrypt:16384:8:1
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from app import create_app
+from models.models import create_tables, get_db_connection
+from models.passwords import hash_with
+
+DEFAULT_METHODS = (
+    "pbkdf2:sha256:100000",
+    "pbkdf2:sha256:600000",
+    "scrypt:16384:8:1",
+    "scrypt:32768:8:1",
+)
+
+
+def seed(db_path, users, method):
+    create_tables(db_path)
+    conn = get_db_connection(db_path)
+    now = datetime.utcnow().isoformat()
+    pwhash = hash_with("secret", method)  # same cost for every user, hashed once
+    conn.executemany(
+        "INSERT INTO users (username, password_hash, full_name, role, is_active, created_at) "
+        "VALUES (?, ?, ?, 'admin', 1, ?);",
+        [(f"u{i}", pwhash, f"User {i}", now) for i in range(users)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_method(method, args):
+    db_path = os.path.join(tempfile.mkdtemp(), "passwords.db")
+    seed(db_path, args.threads, method)
+    app = create_app({
+        "DATABASE": db_path,
+        "DB_POOL_SIZE": args.threads,
+        "PASSWORD_HASH_METHOD": method,
+        "PASSWORD_VERIFY_WORKERS": args.workers,
+        "PASSWORD_VERIFY_QUEUE": args.queue,
+    })
+
+    latencies = []
+    statuses = []
+    lock = threading.Lock()
+    per_thread = max(1, args.logins // args.threads)
+
+    def worker(n):
+        client = app.test_client()
+        for _ in range(per_thread):
+            started = time.perf_counter()
+            resp = client.post("/login", data={"username": f"u{n}", "password": "secret"})
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses.append(resp.status_code)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    ok = statuses.count(302)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0
+    print(
+        f"{method:24s} {ok / elapsed:8.1f} logins/s   "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms   "
+        f"ok {ok}/{len(statuses)}  busy(503) {statuses.count(503)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--method", action="append", help="hash method (repeatable)")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--logins", type=int, default=64, help="total logins per method")
+    parser.add_argument("--workers", type=int, default=2, help="PASSWORD_VERIFY_WORKERS")
+    parser.add_argument("--queue", type=int, default=32, help="PASSWORD_VERIFY_QUEUE")
+    args = parser.parse_args()
+
+    for method in args.method or DEFAULT_METHODS:
+        run_method(method, args)
+
+
+if __name__ == "__main__":
+    main()
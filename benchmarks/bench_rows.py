@@ -0,0 +1,98 @@
+# benchmarks/bench_rows.py
+"""
+Memory and render time of a large listing (admin_patients.html over every
+patient) with each row representation in models/rows.py:
+
+    row          fetchall() of sqlite3.Row + render_template   (previous behaviour)
+    record       fetch_records() (compact Records) + render_template
+    lazy         LazyRows over the sqlite3.Row cursor + stream_page  (the view now)
+    lazy-record  iter_records() + stream_page
+
+Each mode runs in a fresh interpreter; the growth of peak RSS while
+querying and rendering is reported, with the render time.
+
+    python -m benchmarks.bench_rows --patients 100000
+    python -m benchmarks.bench_rows --db /tmp/big.db --runs 3
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("row", "record", "lazy", "lazy-record")
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+def child(mode, db_path):
+    from flask import render_template
+
+    from app import create_app
+    from controllers.routes import ADMIN_PATIENTS_QUERY, stream_page
+    from models.pool import get_db
+    from models.rows import LazyRows, fetch_records, iter_records
+
+    query = ADMIN_PATIENTS_QUERY + " ORDER BY u.full_name;"  # the view without a search
+    app = create_app({"DATABASE": db_path, "METRICS_ENABLED": False})
+    with app.test_request_context("/admin/patients"):
+        render_template("admin_patients.html", patients=[])  # compile outside the measurement
+        conn = get_db()
+        baseline = peak_rss_mb()
+        started = time.perf_counter()
+        if mode == "row":
+            size = len(render_template("admin_patients.html", patients=conn.execute(query).fetchall()))
+        elif mode == "record":
+            size = len(render_template("admin_patients.html", patients=fetch_records(conn, query)))
+        else:
+            rows = LazyRows(conn.execute(query)) if mode == "lazy" else iter_records(conn, query)
+            size = sum(len(chunk) for chunk in stream_page("admin_patients.html", patients=rows).response)
+        elapsed = time.perf_counter() - started
+    print(json.dumps({"rss_growth_mb": peak_rss_mb() - baseline, "render_ms": elapsed * 1000, "html_mb": size / 1e6}))
+
+
+def run(mode, db_path):
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_rows", "--child", mode, "--db", db_path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", help="existing database generated by benchmarks.synthetic")
+    parser.add_argument("--patients", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.db)
+
+    db_path = args.db
+    if not db_path:
+        from benchmarks.synthetic import generate
+
+        db_path = os.path.join(tempfile.mkdtemp(), "rows.db")
+        print(f"Generating {args.patients:,d} patients into {db_path}...")
+        generate(db_path, doctors=10, patients=args.patients, days_back=1, days_ahead=1, log=lambda msg: None)
+
+    print(f"\nmedian of {args.runs} runs")
+    print(f"{'mode':12s} {'peak RSS +MB':>13s} {'render ms':>10s} {'HTML MB':>8s}")
+    for mode in MODES:
+        results = [run(mode, db_path) for _ in range(args.runs)]
+        print(
+            f"{mode:12s} {statistics.median(r['rss_growth_mb'] for r in results):13.1f} "
+            f"{statistics.median(r['render_ms'] for r in results):10.1f} {results[0]['html_mb']:8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
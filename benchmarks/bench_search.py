@@ -0,0 +1,104 @@
+# benchmarks/bench_search.py
+"""
+People search: LIKE '%q%' scan vs. the FTS5 people_search index.
+
+    python -m benchmarks.bench_search --sizes 10000,100000,1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from models.migrations import migrate
+from models.models import create_tables, get_db_connection
+from models.search import PATIENT_COLUMNS, build_match_query, has_search_index
+
+FIRST = ["Asha", "Rahul", "Priya", "Vikram", "Neha", "Arjun", "Kavya", "Rohan", "Sneha", "Aditya",
+         "Meera", "Karan", "Isha", "Dev", "Ananya", "Nikhil", "Pooja", "Sanjay", "Tara", "Varun"]
+LAST = ["Sharma", "Iyer", "Mukherjee", "Reddy", "Patel", "Nair", "Gupta", "Das", "Kapoor", "Menon",
+        "Bose", "Rao", "Singh", "Joshi", "Chatterjee", "Pillai", "Verma", "Sen", "Kulkarni", "Ghosh"]
+
+PATIENT_SELECT = """
+    SELECT p.id AS patient_id, u.full_name, u.username, u.email, u.phone
+    FROM patients p
+    JOIN users u ON p.user_id = u.id
+"""
+LIKE_SQL = PATIENT_SELECT + """
+    WHERE u.full_name LIKE ? OR u.email LIKE ? OR u.phone LIKE ?
+    ORDER BY u.full_name;
+"""
+FTS_SQL = PATIENT_SELECT + """
+    JOIN people_search s ON s.rowid = u.id
+    WHERE s.people_search MATCH ? AND s.role = 'patient'
+    ORDER BY s.rank;
+"""
+
+
+def build(db_path, n_users, batch=50000):
+    create_tables(db_path)
+    migrate(db_path)
+    conn = get_db_connection(db_path)
+    rnd = random.Random(n_users)
+    now = datetime.utcnow().isoformat()
+    for start in range(0, n_users, batch):
+        rows = []
+        for i in range(start, min(start + batch, n_users)):
+            first, last = rnd.choice(FIRST), rnd.choice(LAST)
+            rows.append((
+                f"user{i}", "x", f"{first} {last} {i}", f"{first.lower()}.{last.lower()}{i}@mail.com",
+                f"9{rnd.randrange(10 ** 9):09d}", now,
+            ))
+        cur = conn.cursor()
+        cur.executemany(
+            "INSERT INTO users (username, password_hash, full_name, email, phone, role, is_active, created_at) "
+            "VALUES (?, ?, ?, ?, ?, 'patient', 1, ?);",
+            rows,
+        )
+        conn.execute(
+            "INSERT INTO patients (user_id) SELECT id FROM users WHERE id > ? AND role = 'patient';",
+            (conn.execute("SELECT COALESCE(MAX(user_id), 0) FROM patients;").fetchone()[0],),
+        )
+        conn.commit()
+    return conn
+
+
+def timed(conn, sql, params, repeat):
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = len(conn.execute(sql, params).fetchall())
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    queries = ["Priya", "kap", "Rahul Iyer", "sneha.menon", "98765"]
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        db_path = os.path.join(tempfile.mkdtemp(), "search.db")
+        start = time.perf_counter()
+        conn = build(db_path, size)
+        print(f"== {size} users (built in {time.perf_counter() - start:.1f}s)")
+        if not has_search_index(conn):
+            print("  FTS5 not available in this SQLite build; only LIKE can run.")
+        for q in queries:
+            like_ms, like_rows = timed(conn, LIKE_SQL, (f"%{q}%",) * 3, args.repeat)
+            line = f"  {q!r:14} LIKE {like_ms:9.2f}ms ({like_rows} rows)"
+            if has_search_index(conn):
+                fts_ms, fts_rows = timed(conn, FTS_SQL, (build_match_query(q, PATIENT_COLUMNS),), args.repeat)
+                line += f" | FTS5 {fts_ms:8.2f}ms ({fts_rows} rows) | x{like_ms / max(fts_ms, 1e-6):.0f}"
+            print(line)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
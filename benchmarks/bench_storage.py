@@ -0,0 +1,139 @@
+# benchmarks/bench_storage.py
+"""
+Mixed read/write load against the default (rollback journal) storage mode
+and the opt-in "concurrent" (WAL + serialized writer) mode.
+
+    python -m benchmarks.bench_storage --threads 8 --ops 400 --write-ratio 0.2
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from app import create_app
+from models.models import create_tables, get_db_connection
+from models.pool import get_db, run_write
+
+DASHBOARD_QUERY = """
+    SELECT a.id, a.date, a.time, a.status, u.full_name AS patient_name
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.id
+    JOIN users u ON p.user_id = u.id
+    WHERE a.doctor_id = ? AND a.status = 'Booked' AND a.date >= ?
+    ORDER BY a.date, a.time
+    LIMIT 5;
+"""
+
+
+def seed(db_path, doctors, patients):
+    create_tables(db_path)
+    conn = get_db_connection(db_path)
+    now = datetime.utcnow().isoformat()
+    for i in range(doctors + patients):
+        role = "doctor" if i < doctors else "patient"
+        cur = conn.execute(
+            "INSERT INTO users (username, password_hash, full_name, role, is_active, created_at) "
+            "VALUES (?, 'x', ?, ?, 1, ?);",
+            (f"{role}{i}", f"{role.title()} {i}", role, now),
+        )
+        if role == "doctor":
+            conn.execute("INSERT INTO doctors (user_id) VALUES (?);", (cur.lastrowid,))
+        else:
+            conn.execute("INSERT INTO patients (user_id) VALUES (?);", (cur.lastrowid,))
+    conn.commit()
+    conn.close()
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    idx = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+    return samples[idx]
+
+
+def run_mode(mode, args):
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, "bench.db")
+    seed(db_path, args.doctors, args.patients)
+    app = create_app({"DATABASE": db_path, "DB_STORAGE_MODE": mode, "DB_POOL_SIZE": args.threads})
+
+    reads, writes, errors = [], [], []
+    today = date.today()
+    counter = iter(range(10 ** 9))
+    counter_lock = threading.Lock()
+
+    def book(cur, patient_id, doctor_id, day, slot):
+        now = datetime.utcnow().isoformat()
+        cur.execute(
+            "INSERT INTO appointments (patient_id, doctor_id, date, time, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, 'Booked', ?, ?);",
+            (patient_id, doctor_id, day, slot, now, now),
+        )
+
+    def worker(seed_value):
+        rnd = random.Random(seed_value)
+        for _ in range(args.ops):
+            doctor_id = rnd.randint(1, args.doctors)
+            start = time.perf_counter()
+            try:
+                with app.app_context():
+                    if rnd.random() < args.write_ratio:
+                        with counter_lock:
+                            n = next(counter)
+                        day = (today + timedelta(days=n // 96)).isoformat()
+                        slot = f"{(n % 96) // 4:02d}:{(n % 4) * 15:02d}"
+                        run_write(lambda cur: book(cur, rnd.randint(1, args.patients), doctor_id, day, slot))
+                        writes.append(time.perf_counter() - start)
+                    else:
+                        get_db().execute(DASHBOARD_QUERY, (doctor_id, today.isoformat())).fetchall()
+                        reads.append(time.perf_counter() - start)
+            except Exception as e:  # keep going, report at the end
+                errors.append(repr(e))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    app.extensions["db_pool"].close_all()
+    if "db_writer" in app.extensions:
+        app.extensions["db_writer"].close()
+
+    def fmt(samples):
+        if not samples:
+            return "n/a"
+        return "p50={:.2f}ms p99={:.2f}ms mean={:.2f}ms".format(
+            percentile(samples, 50) * 1000,
+            percentile(samples, 99) * 1000,
+            statistics.mean(samples) * 1000,
+        )
+
+    total = len(reads) + len(writes)
+    print(f"[{mode}] {total} ops in {elapsed:.2f}s ({total / elapsed:.0f} ops/s), errors={len(errors)}")
+    print(f"  reads  ({len(reads)}): {fmt(reads)}")
+    print(f"  writes ({len(writes)}): {fmt(writes)}")
+    if errors:
+        print(f"  first error: {errors[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=400, help="operations per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=2000)
+    args = parser.parse_args()
+
+    for mode in ("default", "concurrent"):
+        run_mode(mode, args)
+
+
+if __name__ == "__main__":
+    main()
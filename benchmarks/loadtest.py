@@ -0,0 +1,186 @@
+# benchmarks/loadtest.py
+"""
+Load test: virtual users drive the Flask test client through the real route
+mix (login, dashboards, search, booking, treatment) and per-route throughput
+and latency percentiles are reported.
+
+    python -m benchmarks.loadtest --users 16 --duration 30
+    python -m benchmarks.loadtest --db /tmp/big.db --mode concurrent
+
+Without --db a fresh database is generated with benchmarks.synthetic.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from app import create_app
+from benchmarks.synthetic import LAST_NAMES, generate
+from models.models import get_db_connection, seed_admin_and_defaults
+
+HASH_METHOD = "pbkdf2:sha256:1000"  # what benchmarks.synthetic hashes with by default
+ROLE_MIX = {"patient": 0.7, "doctor": 0.25, "admin": 0.05}
+OK_STATUSES = {200, 302, 304}
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def call(self, name, fn, *args, **kwargs):
+        started = time.perf_counter()
+        resp = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[name].append(elapsed)
+            if resp.status_code not in OK_STATUSES:
+                self.errors[name] += 1
+        return resp
+
+
+def percentile(samples, pct):
+    idx = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+    return samples[idx]
+
+
+# --------- Scenarios (one action per call) ---------
+def patient_action(client, rec, rnd, ctx):
+    action = rnd.choices(("dashboard", "search", "book", "history", "api"), (3, 2, 1, 2, 1))[0]
+    if action == "dashboard":
+        rec.call("GET /patient/dashboard", client.get, "/patient/dashboard")
+    elif action == "search":
+        rec.call("GET /patient/doctors?q=", client.get, "/patient/doctors", query_string={"q": rnd.choice(LAST_NAMES)})
+    elif action == "history":
+        rec.call("GET /patient/appointments", client.get, "/patient/appointments")
+    elif action == "api":
+        rec.call("GET /api/v1/appointments", client.get, "/api/v1/appointments")
+    else:
+        doctor_id = rnd.choice(ctx["doctor_ids"])
+        resp = rec.call("GET /api/v1/doctors/<id>/availability", client.get, f"/api/v1/doctors/{doctor_id}/availability")
+        slots = resp.get_json().get("slots") if resp.status_code == 200 else None
+        if slots:
+            day, at = rnd.choice(slots)
+            rec.call("POST /patient/book/<id>", client.post, f"/patient/book/{doctor_id}", data={"slot": f"{day}|{at}"})
+
+
+def doctor_action(client, rec, rnd, ctx):
+    action = rnd.choices(("dashboard", "appointments", "treatment", "availability"), (3, 2, 1, 1))[0]
+    if action == "dashboard":
+        rec.call("GET /doctor/dashboard", client.get, "/doctor/dashboard")
+    elif action == "appointments":
+        rec.call("GET /doctor/appointments", client.get, "/doctor/appointments")
+    elif action == "availability":
+        rec.call("GET /doctor/availability", client.get, "/doctor/availability")
+    else:
+        resp = rec.call("GET /api/v1/appointments", client.get, "/api/v1/appointments")
+        items = resp.get_json().get("items") if resp.status_code == 200 else None
+        if items:
+            appt = rnd.choice(items)
+            rec.call(
+                "POST /doctor/appointments/<id>/treatment",
+                client.post,
+                f"/doctor/appointments/{appt['id']}/treatment",
+                data={"diagnosis": "Load test", "prescription": "Rest", "notes": ""},
+            )
+
+
+def admin_action(client, rec, rnd, ctx):
+    action = rnd.choices(("dashboard", "appointments", "patients", "doctors"), (3, 2, 1, 1))[0]
+    if action == "dashboard":
+        rec.call("GET /admin/dashboard", client.get, "/admin/dashboard")
+    elif action == "appointments":
+        rec.call("GET /admin/appointments", client.get, "/admin/appointments")
+    elif action == "patients":
+        rec.call("GET /admin/patients?q=", client.get, "/admin/patients", query_string={"q": rnd.choice(LAST_NAMES)})
+    else:
+        rec.call("GET /admin/doctors", client.get, "/admin/doctors")
+
+
+ACTIONS = {"patient": patient_action, "doctor": doctor_action, "admin": admin_action}
+
+
+def virtual_user(app, rec, ctx, n, deadline, actions_per_session):
+    rnd = random.Random(n)
+    while time.perf_counter() < deadline:
+        role = rnd.choices(list(ROLE_MIX), list(ROLE_MIX.values()))[0]
+        username, password = ("admin", "admin123") if role == "admin" else (rnd.choice(ctx[role]), ctx["password"])
+        client = app.test_client()
+        rec.call("POST /login", client.post, "/login", data={"username": username, "password": password})
+        for _ in range(actions_per_session):
+            if time.perf_counter() >= deadline:
+                break
+            ACTIONS[role](client, rec, rnd, ctx)
+        client.get("/logout")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", help="existing database generated by benchmarks.synthetic")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--password", default="password", help="password of the generated users")
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--actions", type=int, default=10, help="actions per login session")
+    parser.add_argument("--mode", choices=("default", "concurrent"), default="default", help="DB_STORAGE_MODE")
+    args = parser.parse_args()
+
+    db_path = args.db
+    if not db_path:
+        db_path = os.path.join(tempfile.mkdtemp(), "loadtest.db")
+        print(f"Generating data into {db_path}...")
+        generate(db_path, seed=args.seed, doctors=args.doctors, patients=args.patients,
+                 password=args.password, log=lambda msg: None)
+    seed_admin_and_defaults(db_path)
+
+    app = create_app({
+        "DATABASE": db_path,
+        "DB_STORAGE_MODE": args.mode,
+        "DB_POOL_SIZE": args.users,
+        "PASSWORD_HASH_METHOD": HASH_METHOD,
+    })
+
+    conn = get_db_connection(db_path)
+    ctx = {
+        "password": args.password,
+        "doctor": [r[0] for r in conn.execute("SELECT username FROM users WHERE role = 'doctor' AND is_active = 1;")],
+        "patient": [r[0] for r in conn.execute("SELECT username FROM users WHERE role = 'patient' AND is_active = 1;")],
+        "doctor_ids": [r[0] for r in conn.execute("SELECT id FROM doctors WHERE is_blacklisted = 0;")],
+    }
+    conn.close()
+
+    rec = Recorder()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=virtual_user, args=(app, rec, ctx, i, deadline, args.actions))
+        for i in range(args.users)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{args.users} users, {elapsed:.1f}s, storage mode {args.mode!r}")
+    print(f"{'route':42s} {'count':>7s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'errors':>7s}")
+    total = 0
+    for name in sorted(rec.latencies):
+        samples = sorted(rec.latencies[name])
+        total += len(samples)
+        print(
+            f"{name:42s} {len(samples):7d} {len(samples) / elapsed:8.1f} "
+            f"{percentile(samples, 50) * 1000:8.1f} {percentile(samples, 95) * 1000:8.1f} "
+            f"{percentile(samples, 99) * 1000:8.1f} {rec.errors[name]:7d}"
+        )
+    print(f"{'total':42s} {total:7d} {total / elapsed:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
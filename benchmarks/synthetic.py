@@ -0,0 +1,234 @@
+# benchmarks/synthetic.py
+"""
+Deterministic synthetic data: fills a database with departments, doctors,
+patients, availability windows (expanded into slots), appointments and
+treatments. The same --seed always produces the same data (dates are
+relative to today).
+
+    python -m benchmarks.synthetic --db instance/hospital.db --doctors 200 --patients 20000
+
+Rows get explicit ids (continuing after the current MAX(id)) and are inserted
+with executemany in one transaction per table. The triggers stay on, so the
+stats counters, the search index and the slot grid stay consistent.
+All generated users share one password (--password), hashed once.
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from models.availability import expand_windows, slot_times
+from models.migrations import migrate
+from models.models import create_tables, get_db_connection
+from models.passwords import hash_with
+
+DEPARTMENTS = (
+    "General Medicine", "Cardiology", "Orthopedics", "Pediatrics", "Dermatology", "Neurology",
+    "Gynecology", "ENT", "Ophthalmology", "Psychiatry", "Oncology", "Urology",
+    "Gastroenterology", "Pulmonology", "Nephrology", "Endocrinology",
+)
+FIRST_NAMES = (
+    "Aarav", "Aditi", "Amit", "Ananya", "Arjun", "Diya", "Farhan", "Isha", "Kabir", "Kavya",
+    "Meera", "Nikhil", "Priya", "Rahul", "Riya", "Rohan", "Saanvi", "Sameer", "Sneha", "Tara",
+    "Varun", "Vikram", "Zoya", "Anil", "Deepa", "Gaurav", "Lakshmi", "Manoj", "Neha", "Suresh",
+)
+LAST_NAMES = (
+    "Sharma", "Verma", "Iyer", "Nair", "Reddy", "Gupta", "Mukherjee", "Banerjee", "Das", "Khan",
+    "Patel", "Shah", "Mehta", "Joshi", "Kulkarni", "Rao", "Menon", "Pillai", "Singh", "Chopra",
+)
+DIAGNOSES = (
+    "Viral fever", "Hypertension", "Type 2 diabetes", "Migraine", "Lower back pain",
+    "Seasonal allergy", "Gastritis", "Sprained ankle", "Bronchitis", "Routine check-up",
+)
+PRESCRIPTIONS = (
+    "Paracetamol 500mg", "Amlodipine 5mg", "Metformin 500mg", "Ibuprofen 400mg",
+    "Cetirizine 10mg", "Pantoprazole 40mg", "Rest and fluids", "Physiotherapy", "No medicine",
+)
+SESSIONS = (("09:00", "13:00"), ("14:00", "17:00"), ("17:30", "20:00"))
+
+
+def next_id(cur, table):
+    return (cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table};").fetchone()[0]) + 1
+
+
+def zipf_weights(n, s=1.1):
+    """A few popular items, a long tail (doctors per department, visits per patient)."""
+    return [1.0 / (k ** s) for k in range(1, n + 1)]
+
+
+def person(rnd):
+    return f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}"
+
+
+def generate(
+    db_path,
+    seed=42,
+    departments=8,
+    doctors=50,
+    patients=2000,
+    days_back=60,
+    days_ahead=7,
+    utilization=0.6,
+    slot_minutes=15,
+    password="password",
+    hash_method="pbkdf2:sha256:1000",
+    today=None,
+    log=print,
+):
+    """Generate the data set; returns {table: rows inserted}."""
+    rnd = random.Random(seed)
+    today = today or date.today()
+    now = datetime.utcnow().isoformat()
+    counts = {}
+
+    create_tables(db_path)
+    migrate(db_path)
+    conn = get_db_connection(db_path)
+    cur = conn.cursor()
+    started = time.perf_counter()
+
+    def insert(table, sql, rows):
+        cur.executemany(sql, rows)
+        counts[table] = counts.get(table, 0) + len(rows)
+        log(f"  {table:20s} {len(rows):>9,d} rows  ({time.perf_counter() - started:6.1f}s)")
+
+    # --- departments (reuse existing names) ---
+    existing = {row["name"]: row["id"] for row in cur.execute("SELECT id, name FROM departments;")}
+    dept_id = next_id(cur, "departments")
+    new_depts = []
+    for name in DEPARTMENTS[:departments]:
+        if name not in existing:
+            existing[name] = dept_id
+            new_depts.append((dept_id, name, f"{name} department", now))
+            dept_id += 1
+    insert("departments", "INSERT INTO departments (id, name, description, created_at) VALUES (?, ?, ?, ?);", new_depts)
+    dept_ids = [existing[name] for name in DEPARTMENTS[:departments]]
+
+    # --- users: doctors then patients ---
+    pwhash = hash_with(password, hash_method)
+    user_id = next_id(cur, "users")
+    doctor_id = next_id(cur, "doctors")
+    patient_id = next_id(cur, "patients")
+    users, doctor_rows, patient_rows = [], [], []
+
+    dept_weights = zipf_weights(len(dept_ids), s=0.8)
+    for _ in range(doctors):
+        users.append((user_id, f"doc{user_id}", pwhash, "Dr. " + person(rnd), f"doc{user_id}@hms.test",
+                      f"9{rnd.randrange(10 ** 9):09d}", "doctor", now))
+        doctor_rows.append((doctor_id, user_id, rnd.choices(dept_ids, dept_weights)[0],
+                            "Consultant", f"{rnd.randint(1, 5)}{rnd.randint(0, 40):02d}"))
+        user_id += 1
+        doctor_id += 1
+    for _ in range(patients):
+        users.append((user_id, f"pat{user_id}", pwhash, person(rnd), f"pat{user_id}@mail.test",
+                      f"8{rnd.randrange(10 ** 9):09d}", "patient", now))
+        age = min(95, max(0, int(rnd.gauss(40, 18))))
+        patient_rows.append((patient_id, user_id, age, rnd.choice(("Male", "Female")),
+                             f"{rnd.randint(1, 300)} Main Road", f"7{rnd.randrange(10 ** 9):09d}"))
+        user_id += 1
+        patient_id += 1
+
+    insert("users", """
+        INSERT INTO users (id, username, password_hash, full_name, email, phone, role, is_active, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?);
+    """, users)
+    insert("doctors", """
+        INSERT INTO doctors (id, user_id, department_id, bio, room_no, is_blacklisted)
+        VALUES (?, ?, ?, ?, ?, 0);
+    """, doctor_rows)
+    insert("patients", """
+        INSERT INTO patients (id, user_id, age, gender, address, emergency_contact, is_blacklisted)
+        VALUES (?, ?, ?, ?, ?, ?, 0);
+    """, patient_rows)
+
+    # --- availability windows: most doctors work most weekdays, one or two sessions ---
+    window_id = next_id(cur, "doctor_availability")
+    windows = []
+    for doc_row in doctor_rows:
+        sessions = rnd.sample(SESSIONS, rnd.choice((1, 1, 2)))
+        weekdays = set(rnd.sample(range(6), rnd.randint(3, 6)))
+        for offset in range(-days_back, days_ahead + 1):
+            day = today + timedelta(days=offset)
+            if day.weekday() not in weekdays:
+                continue
+            for start, end in sessions:
+                windows.append((window_id, doc_row[0], day.isoformat(), start, end, rnd.choice((8, 10, 12))))
+                window_id += 1
+    insert("doctor_availability", """
+        INSERT INTO doctor_availability (id, doctor_id, date, start_time, end_time, max_appointments, is_available)
+        VALUES (?, ?, ?, ?, ?, ?, 1);
+    """, windows)
+    counts["availability_slots"] = expand_windows(cur, [w[0] for w in windows], slot_minutes)
+    log(f"  {'availability_slots':20s} {counts['availability_slots']:>9,d} rows  ({time.perf_counter() - started:6.1f}s)")
+
+    # --- appointments: fill windows up to capacity at `utilization`, frequent patients favoured ---
+    patient_ids = [row[0] for row in patient_rows]
+    patient_weights = zipf_weights(len(patient_ids), s=0.6)
+    today_str = today.isoformat()
+    appointment_id = next_id(cur, "appointments")
+    appointments, treatments = [], []
+    for _, doc, day, start, end, capacity in windows:
+        past = day < today_str
+        fill = utilization * (1.0 if past else 0.5)
+        slots = slot_times(start, end, slot_minutes)
+        taken = rnd.sample(slots, min(capacity, int(len(slots) * fill * rnd.uniform(0.5, 1.2))))
+        for t in sorted(taken):
+            if past:
+                status = rnd.choices(("Completed", "Cancelled", "Booked"), (0.82, 0.13, 0.05))[0]
+            else:
+                status = rnd.choices(("Booked", "Cancelled"), (0.9, 0.1))[0]
+            stamp = f"{day}T{t}:00"
+            appointments.append((appointment_id, rnd.choices(patient_ids, patient_weights)[0], doc, day, t,
+                                 status, stamp, stamp))
+            if status == "Completed" and rnd.random() < 0.9:
+                treatments.append((appointment_id, rnd.choice(DIAGNOSES), rnd.choice(PRESCRIPTIONS),
+                                   rnd.choice(("", "Follow up in 2 weeks", "Review reports")), stamp))
+            appointment_id += 1
+    insert("appointments", """
+        INSERT INTO appointments (id, patient_id, doctor_id, date, time, status, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+    """, appointments)
+    insert("treatments", """
+        INSERT INTO treatments (appointment_id, diagnosis, prescription, notes, created_at)
+        VALUES (?, ?, ?, ?, ?);
+    """, treatments)
+
+    conn.commit()
+    conn.execute("ANALYZE;")
+    conn.close()
+    log(f"Done in {time.perf_counter() - started:.1f}s.")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", required=True, help="database file (created if missing)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--departments", type=int, default=8)
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--days-back", type=int, default=60, help="days of appointment history")
+    parser.add_argument("--days-ahead", type=int, default=7, help="days of future availability")
+    parser.add_argument("--utilization", type=float, default=0.6, help="share of past slots booked")
+    parser.add_argument("--password", default="password", help="password of every generated user")
+    parser.add_argument("--hash-method", default="pbkdf2:sha256:1000",
+                        help="cheap by default; match the app's PASSWORD_HASH_METHOD to avoid rehash on login")
+    args = parser.parse_args()
+
+    print(f"Generating into {args.db} (seed {args.seed})...")
+    generate(
+        args.db,
+        seed=args.seed,
+        departments=args.departments,
+        doctors=args.doctors,
+        patients=args.patients,
+        days_back=args.days_back,
+        days_ahead=args.days_ahead,
+        utilization=args.utilization,
+        password=args.password,
+        hash_method=args.hash_method,
+    )
+
+
+if __name__ == "__main__":
+    main()
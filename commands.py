@@ -0,0 +1,109 @@
+# commands.py
+"""
+Maintenance commands, available through the Flask CLI:
+
+    flask --app app reconcile-stats
+    flask --app app check-doctor-stats [--repair]
+    flask --app app rebuild-slots
+    flask --app app export-appointments [--format csv|ndjson] [--output FILE]
+    flask --app app import-people FILE --role patient|doctor [--workers N]
+"""
+import click
+
+
+def register_commands(app):
+    @app.cli.command("reconcile-stats")
+    def reconcile_stats_command():
+        """Rebuild the hospital_stats counters and report any drift."""
+        from models.stats import reconcile_stats
+
+        drift = reconcile_stats(app.config["DATABASE"])
+        if not drift:
+            click.echo("Counters OK, no drift.")
+            return
+        for column, (stored, actual) in drift.items():
+            click.echo(f"{column}: stored={stored} actual={actual}")
+        click.echo(f"Rebuilt {len(drift)} drifted counter(s).")
+
+    @app.cli.command("check-doctor-stats")
+    @click.option("--repair", is_flag=True, help="Rewrite drifted rows from a recount.")
+    def check_doctor_stats_command(repair):
+        """Compare per-doctor counters with the appointments table."""
+        from models.stats import check_doctor_stats
+
+        drift = check_doctor_stats(app.config["DATABASE"], repair=repair)
+        if not drift:
+            click.echo("Doctor counters consistent.")
+            return
+        for doctor_id, diffs in drift.items():
+            parts = ", ".join(f"{col} stored={old} actual={new}" for col, (old, new) in diffs.items())
+            click.echo(f"doctor {doctor_id}: {parts}")
+        click.echo(f"{len(drift)} doctor(s) inconsistent" + ("; repaired." if repair else "."))
+
+    @app.cli.command("rebuild-slots")
+    def rebuild_slots_command():
+        """Re-expand every availability window using the current SLOT_MINUTES."""
+        from models.availability import rebuild_slots
+        from models.models import get_db_connection
+
+        conn = get_db_connection(app.config["DATABASE"])
+        try:
+            count = rebuild_slots(conn, app.config["SLOT_MINUTES"])
+            conn.commit()
+        finally:
+            conn.close()
+        click.echo(f"Rebuilt {count} slot(s) at {app.config['SLOT_MINUTES']} minutes.")
+
+    @app.cli.command("export-appointments")
+    @click.option("--format", "fmt", type=click.Choice(["csv", "ndjson"]), default="csv")
+    @click.option("--from", "date_from", help="First date (YYYY-MM-DD).")
+    @click.option("--to", "date_to", help="Last date (YYYY-MM-DD).")
+    @click.option("--status", type=click.Choice(["Booked", "Completed", "Cancelled"]))
+    @click.option("--output", type=click.File("w", encoding="utf-8"), default="-", help="Defaults to stdout.")
+    def export_appointments_command(fmt, date_from, date_to, status, output):
+        """Stream appointments with patient, doctor and treatment details."""
+        from models.export import export_appointments
+        from models.models import get_db_connection
+
+        conn = get_db_connection(app.config["DATABASE"])
+        try:
+            for chunk in export_appointments(
+                conn,
+                fmt,
+                date_from=date_from,
+                date_to=date_to,
+                status=status,
+                batch_size=app.config["EXPORT_BATCH_SIZE"],
+            ):
+                output.write(chunk)
+        finally:
+            conn.close()
+
+    @app.cli.command("import-people")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--role", type=click.Choice(["patient", "doctor"]), required=True)
+    @click.option("--batch-size", default=1000, show_default=True, help="Rows per transaction.")
+    @click.option("--workers", type=int, help="Password hashing processes (default: CPU count).")
+    @click.option("--dry-run", is_flag=True, help="Validate only, write nothing.")
+    def import_people_command(path, role, batch_size, workers, dry_run):
+        """Bulk-create patients or doctors from a CSV or JSONL file."""
+        from models.importer import import_people, read_records
+
+        report = import_people(
+            app.config["DATABASE"],
+            role,
+            read_records(path),
+            batch_size=batch_size,
+            workers=workers,
+            dry_run=dry_run,
+            method=app.config["PASSWORD_HASH_METHOD"],
+        )
+        for line_no, username, reason in report.skipped[:20]:
+            click.echo(f"line {line_no} ({username}): {reason}")
+        if len(report.skipped) > 20:
+            click.echo(f"... and {len(report.skipped) - 20} more skipped")
+        verb = "Validated" if dry_run else "Imported"
+        click.echo(
+            f"{verb} {report.created} {role}(s), skipped {len(report.skipped)} "
+            f"in {report.elapsed:.2f}s ({report.rows_per_second:.0f} rows/s)."
+        )
@@ -0,0 +1,314 @@
+# controllers/api.py
+"""
+Versioned JSON API (/api/v1) for kiosks and the mobile client.
+
+Uses the same queries as the HTML views. Every response carries an ETag
+(and, where the data has timestamps, a Last-Modified derived from
+appointments.updated_at / treatments.created_at / directory_version, the
+trigger-maintained version of the joined names and departments). The
+ETag takes precedence when a client sends both validators. Conditional GETs whose
+validators still match get an empty 304; for appointments that check runs
+on a single aggregate query, before any rows are fetched or serialized.
+"""
+import hashlib
+import json
+from datetime import datetime, date as date_cls, timedelta, timezone
+from functools import wraps
+
+from flask import Blueprint, current_app, g, request, session
+from werkzeug.http import http_date, quote_etag
+
+from controllers.routes import (
+    APPOINTMENT_QUERIES,
+    decode_cursor,
+    fetch_appointments_page,
+    get_doctor_directory,
+    load_current_user,
+    page_size,
+)
+from models.availability import free_slots
+from models.pool import get_db
+
+api_bp = Blueprint("api_v1", __name__, url_prefix="/api/v1")
+
+# role -> condition on `appointments a` matching APPOINTMENT_QUERIES[role]
+APPOINTMENT_SCOPES = {
+    "admin": "1=1",
+    "patient": "a.patient_id = ?",
+    "doctor": "a.doctor_id = ?",
+}
+
+APPOINTMENT_DETAIL_QUERY = """
+    SELECT a.*,
+           pu.full_name AS patient_name,
+           du.full_name AS doctor_name,
+           dept.name AS dept_name,
+           t.diagnosis,
+           t.prescription,
+           t.notes,
+           t.created_at AS treatment_updated_at,
+           v.version AS directory_version,
+           v.changed_at AS directory_changed_at
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.id
+    JOIN users pu ON p.user_id = pu.id
+    JOIN doctors d ON a.doctor_id = d.id
+    JOIN users du ON d.user_id = du.id
+    LEFT JOIN departments dept ON d.department_id = dept.id
+    LEFT JOIN treatments t ON t.appointment_id = a.id
+    LEFT JOIN directory_version v ON v.id = 1
+    WHERE a.id = ? AND {scope};
+"""
+
+TREATMENT_FIELDS = ("diagnosis", "prescription", "notes", "treatment_updated_at")
+VERSION_FIELDS = ("directory_version", "directory_changed_at")
+
+
+# --------- Helpers ---------
+def api_error(status, message):
+    return current_app.response_class(
+        json.dumps({"error": message}), status=status, mimetype="application/json"
+    )
+
+
+def api_login_required(*roles):
+    """Session auth like login_required/role_required, but answering 401/403 in JSON."""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(*args, **kwargs):
+            if "user_id" not in session:
+                return api_error(401, "Login required.")
+            if roles and session.get("role") not in roles:
+                return api_error(403, "Forbidden.")
+            if not load_current_user():
+                return api_error(401, "Your account is no longer active.")
+            return view_func(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def rows_to_dicts(rows):
+    """sqlite3.Row list -> plain dicts, reading the column names once."""
+    if not rows:
+        return []
+    keys = rows[0].keys()
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def make_etag(*parts):
+    return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def parse_timestamp(value):
+    """
+    Stored UTC isoformat -> aware datetime truncated to seconds (HTTP date
+    precision) for Last-Modified. None while that second is still running:
+    a later change could land in the same second and an If-Modified-Since
+    check would miss it, so until then clients only get the ETag.
+    """
+    if not value:
+        return None
+    changed = datetime.fromisoformat(value).replace(tzinfo=timezone.utc, microsecond=0)
+    if changed >= datetime.now(timezone.utc).replace(microsecond=0):
+        return None
+    return changed
+
+
+def encode_json(payload):
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+def validators_match(etag, last_modified, if_none_match, if_modified_since):
+    """
+    True when the client's cached copy matches. `if_none_match` is a
+    werkzeug ETags and wins over `if_modified_since` (an aware datetime).
+    """
+    if if_none_match:
+        return if_none_match.contains(etag)
+    return bool(last_modified and if_modified_since and last_modified <= if_modified_since)
+
+
+def validator_headers(etag, last_modified=None):
+    headers = [("ETag", quote_etag(etag)), ("Cache-Control", "private, no-cache")]
+    if last_modified:
+        headers.append(("Last-Modified", http_date(last_modified)))
+    return headers
+
+
+def is_fresh(etag, last_modified=None):
+    return validators_match(etag, last_modified, request.if_none_match, request.if_modified_since)
+
+
+def not_modified(etag, last_modified=None):
+    return current_app.response_class(status=304, headers=validator_headers(etag, last_modified))
+
+
+def json_response(payload, etag=None, last_modified=None):
+    """Compact JSON with validators; ETag defaults to a hash of the body."""
+    body = encode_json(payload)
+    if etag is None:
+        etag = make_etag(body)
+    if is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+    return current_app.response_class(
+        body, mimetype="application/json", headers=validator_headers(etag, last_modified)
+    )
+
+
+def appointment_scope():
+    """(condition, params) limiting appointments to what the current user may see."""
+    params = () if g.role == "admin" else (g.profile_id,)
+    return APPOINTMENT_SCOPES[g.role], params
+
+
+def appointments_validators(conn, where, params, key):
+    """
+    (etag, last_modified) of an appointment listing, from one aggregate over
+    `where`: any insert, status change, delete or treatment edit moves the
+    count or one of the two (microsecond) timestamps, and an edit to the
+    joined names / departments moves directory_version. `key` identifies the
+    page requested.
+    """
+    count, appt_changed, treatment_changed, version, directory_changed = conn.execute(
+        f"""
+        SELECT COUNT(*), MAX(a.updated_at), MAX(t.created_at), v.version, v.changed_at
+        FROM appointments a
+        LEFT JOIN treatments t ON t.appointment_id = a.id
+        LEFT JOIN directory_version v ON v.id = 1
+        WHERE {where};
+        """,
+        params,
+    ).fetchone()
+    etag = make_etag("appointments", *key, count, appt_changed, treatment_changed, version)
+    changed = max(filter(None, (appt_changed, treatment_changed, directory_changed)), default=None)
+    return etag, parse_timestamp(changed)
+
+
+# --------- Doctors ---------
+@api_bp.route("/doctors")
+@api_login_required()
+def doctors():
+    department_id = request.args.get("department_id", type=int)
+    items = [
+        d for d in get_doctor_directory()
+        if department_id is None or d["department_id"] == department_id
+    ]
+    return json_response({"items": items})
+
+
+@api_bp.route("/doctors/<int:doctor_id>/availability")
+@api_login_required()
+def doctor_availability(doctor_id):
+    """Free slots for the next 7 days, as offered on the booking form."""
+    if not any(d["doctor_id"] == doctor_id for d in get_doctor_directory()):
+        return api_error(404, "Doctor not found.")
+
+    return json_response(availability_payload(get_db(), doctor_id))
+
+
+def availability_payload(conn, doctor_id):
+    today = date_cls.today()
+    max_day = today + timedelta(days=7)
+    slots = free_slots(conn, doctor_id, today.isoformat(), max_day.isoformat())
+    return {
+        "doctor_id": doctor_id,
+        "date_from": today.isoformat(),
+        "date_to": max_day.isoformat(),
+        "slots": [[s["date"], s["time"]] for s in slots],
+    }
+
+
+# --------- Appointments & treatments ---------
+@api_bp.route("/appointments")
+@api_login_required()
+def appointments():
+    """
+    One keyset page of the current user's appointments (all, for admins).
+    ?section=upcoming|past, ?after=<cursor>, ?per_page=; admins may also
+    filter by ?doctor_id=, ?patient_id= and ?status=.
+    """
+    section = request.args.get("section", "upcoming")
+    if section not in ("upcoming", "past"):
+        return api_error(400, "section must be 'upcoming' or 'past'.")
+
+    limit = page_size("HISTORY_PAGE_SIZE")
+    etag, last_modified, payload = appointments_listing(
+        get_db(), g.role, g.profile_id, section, request.args, request.query_string.decode(), limit, is_fresh,
+    )
+    if payload is None:
+        return not_modified(etag, last_modified)
+    return json_response(payload, etag=etag, last_modified=last_modified)
+
+
+def appointments_listing(conn, role, profile_id, section, args, query_string, limit, fresh):
+    """
+    Shared by the Flask view and asgi.py: (etag, last_modified, payload),
+    with payload None when fresh(etag, last_modified) says the client's copy
+    is current -- checked before any rows are fetched.
+    """
+    params = [] if role == "admin" else [profile_id]
+    filters = ""
+    if role == "admin":
+        for column in ("doctor_id", "patient_id", "status"):
+            value = args.get(column)
+            if value:
+                filters += f" AND a.{column} = ?"
+                params.append(value)
+
+    today_str = date_cls.today().isoformat()
+    etag, last_modified = appointments_validators(
+        conn, APPOINTMENT_SCOPES[role] + filters, params, (role, profile_id, query_string, today_str, limit),
+    )
+    if fresh(etag, last_modified):
+        return etag, last_modified, None
+
+    rows, next_cursor = fetch_appointments_page(
+        APPOINTMENT_QUERIES[role] + filters, params, section, today_str,
+        cursor=decode_cursor(args.get("after")), limit=limit, conn=conn,
+    )
+    return etag, last_modified, {"items": rows_to_dicts(rows), "next": next_cursor}
+
+
+def load_appointment(appointment_id):
+    scope, params = appointment_scope()
+    return get_db().execute(
+        APPOINTMENT_DETAIL_QUERY.format(scope=scope), (appointment_id, *params)
+    ).fetchone()
+
+
+def appointment_validators(appt):
+    """(etag, last_modified) of one appointment, its treatment and the joined names."""
+    etag = make_etag(
+        "appointment", appt["id"], appt["updated_at"], appt["treatment_updated_at"], appt["directory_version"]
+    )
+    changed = max(filter(None, (appt["updated_at"], appt["treatment_updated_at"], appt["directory_changed_at"])))
+    return etag, parse_timestamp(changed)
+
+
+@api_bp.route("/appointments/<int:appointment_id>")
+@api_login_required()
+def appointment_detail(appointment_id):
+    appt = load_appointment(appointment_id)
+    if appt is None:
+        return api_error(404, "Appointment not found.")
+
+    etag, last_modified = appointment_validators(appt)
+    item = {key: appt[key] for key in appt.keys() if key not in TREATMENT_FIELDS + VERSION_FIELDS}
+    item["treatment"] = (
+        {field: appt[field] for field in TREATMENT_FIELDS} if appt["treatment_updated_at"] else None
+    )
+    return json_response(item, etag=etag, last_modified=last_modified)
+
+
+@api_bp.route("/appointments/<int:appointment_id>/treatment")
+@api_login_required()
+def appointment_treatment(appointment_id):
+    appt = load_appointment(appointment_id)
+    if appt is None:
+        return api_error(404, "Appointment not found.")
+    if not appt["treatment_updated_at"]:
+        return api_error(404, "No treatment recorded.")
+
+    etag, last_modified = appointment_validators(appt)
+    payload = {"appointment_id": appt["id"], **{field: appt[field] for field in TREATMENT_FIELDS}}
+    return json_response(payload, etag=etag, last_modified=last_modified)
@@ -1,24 +1,120 @@
 # controllers/routes.py
-from flask import Blueprint, render_template, redirect, url_for, request, session, flash, jsonify
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask import (
+    Blueprint, render_template, redirect, url_for, request, session, flash, jsonify, g, current_app,
+    Response, stream_template, stream_with_context,
+)
 from functools import wraps
 # from datetime import datetime, date as date_cls
 from datetime import datetime, date as date_cls, timedelta
 
-import sqlite3
-
-from models.models import get_db_connection
+import time
+
+from models.pool import get_db, get_pool, run_write
+from models.rows import LazyRows
+from models.stats import read_doctor_stats, read_stats
+from models.cache import get_cache
+from models.fragments import invalidate_fragments
+from models.snapshot import get_snapshot
+from models.availability import expand_window, free_slots
+from models.booking import BookingError, book_appointment, bulk_set_status
+from models.export import EXPORT_FORMATS, export_appointments
+from models.passwords import VerifierBusy, get_hasher, hash_password
+from models.schedule import WEEKDAYS, ScheduleError, create_recurring_windows
+from models.search import (
+    DOCTOR_COLUMNS, PATIENT_COLUMNS, build_match_query, has_search_index, search_user_ids,
+)
 
 main_bp = Blueprint("main", __name__)
 
 
 # --------- Helpers ---------
+# role -> query resolving the role-specific profile id of an active, non-blacklisted user
+PROFILE_QUERIES = {
+    "patient": """
+        SELECT p.id FROM patients p JOIN users u ON p.user_id = u.id
+        WHERE u.id = ? AND u.is_active = 1 AND p.is_blacklisted = 0;
+    """,
+    "doctor": """
+        SELECT d.id FROM doctors d JOIN users u ON d.user_id = u.id
+        WHERE u.id = ? AND u.is_active = 1 AND d.is_blacklisted = 0;
+    """,
+}
+
+# user_id -> time the admin revoked it; sessions checked before that re-resolve
+_revoked_users = {}
+
+
+def resolve_profile_id(user_id, role):
+    query = PROFILE_QUERIES.get(role)
+    if query is None:
+        return None
+    row = get_db().execute(query, (user_id,)).fetchone()
+    return row["id"] if row else None
+
+
+def revoke_user_session(user_id):
+    """
+    Force sessions of `user_id` to re-check their cached profile id on the
+    next request (called when an admin blacklists / deactivates an account).
+    Other worker processes pick this up after PROFILE_RECHECK_SECONDS.
+    """
+    now = time.time()
+    ttl = current_app.config.get("PROFILE_RECHECK_SECONDS", 300)
+    for uid, revoked_at in list(_revoked_users.items()):
+        if now - revoked_at > ttl:
+            del _revoked_users[uid]
+    _revoked_users[user_id] = now
+
+
+def profile_is_stale(sess):
+    """True when the profile id cached in session `sess` must be re-resolved."""
+    checked_at = sess.get("profile_checked_at", 0)
+    ttl = current_app.config.get("PROFILE_RECHECK_SECONDS", 300)
+    return (
+        sess.get("profile_id") is None
+        or time.time() - checked_at > ttl
+        or _revoked_users.get(sess["user_id"], 0) >= checked_at
+    )
+
+
+def load_current_user():
+    """
+    Expose the session user on flask.g (user_id, role, profile_id).
+    The profile id is resolved once at login and cached in the session; it is
+    re-resolved when missing, older than PROFILE_RECHECK_SECONDS, or revoked.
+    Returns False when the account is no longer allowed in.
+    """
+    if "user_id" in g:
+        return True
+
+    user_id = session["user_id"]
+    role = session.get("role")
+    profile_id = session.get("profile_id")
+
+    if role in PROFILE_QUERIES:
+        if profile_is_stale(session):
+            profile_id = resolve_profile_id(user_id, role)
+            if profile_id is None:
+                session.clear()
+                return False
+            session["profile_id"] = profile_id
+            session["profile_checked_at"] = time.time()
+
+    g.user_id = user_id
+    g.role = role
+    g.profile_id = profile_id
+    return True
+
+
 def login_required(view_func):
     @wraps(view_func)
     def wrapped(*args, **kwargs):
         if "user_id" not in session:
             flash("Please log in to continue.", "warning")
             return redirect(url_for("main.login"))
+        if not load_current_user():
+            flash("Your account is no longer active.", "danger")
+            return redirect(url_for("main.login"))
         return view_func(*args, **kwargs)
     return wrapped
 
@@ -30,37 +126,277 @@ def role_required(role):
             if "user_id" not in session or session.get("role") != role:
                 flash("Unauthorized access.", "danger")
                 return redirect(url_for("main.login"))
+            if not load_current_user():
+                flash("Your account is no longer active.", "danger")
+                return redirect(url_for("main.login"))
             return view_func(*args, **kwargs)
         return wrapped
     return decorator
 
 
 def get_current_patient_id():
-    if "user_id" not in session:
+    if "user_id" not in session or session.get("role") != "patient":
         return None
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT p.id FROM patients p JOIN users u ON p.user_id = u.id WHERE u.id = ?;",
-        (session["user_id"],),
-    )
-    row = cur.fetchone()
-    conn.close()
-    return row["id"] if row else None
+    if not load_current_user():
+        return None
+    return g.profile_id
 
 
 def get_current_doctor_id():
-    if "user_id" not in session:
+    if "user_id" not in session or session.get("role") != "doctor":
         return None
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT d.id FROM doctors d JOIN users u ON d.user_id = u.id WHERE u.id = ?;",
-        (session["user_id"],),
+    if not load_current_user():
+        return None
+    return g.profile_id
+
+
+# Appointment listings, one per role, each ending in an open WHERE clause so
+# filters and the keyset conditions of fetch_appointments_page can be appended.
+# Shared by the HTML views and the JSON API.
+APPOINTMENT_QUERIES = {
+    "admin": """
+        SELECT a.*,
+               pu.full_name AS patient_name,
+               du.full_name AS doctor_name,
+               dept.name AS dept_name
+        FROM appointments a
+        JOIN patients p ON a.patient_id = p.id
+        JOIN users pu ON p.user_id = pu.id
+        JOIN doctors d ON a.doctor_id = d.id
+        JOIN users du ON d.user_id = du.id
+        LEFT JOIN departments dept ON d.department_id = dept.id
+        WHERE 1=1
+    """,
+    "patient": """
+        SELECT a.*, u.full_name AS doctor_name, dept.name AS dept_name
+        FROM appointments a
+        JOIN doctors d ON a.doctor_id = d.id
+        JOIN users u ON d.user_id = u.id
+        LEFT JOIN departments dept ON d.department_id = dept.id
+        WHERE a.patient_id = ?
+    """,
+    "doctor": """
+        SELECT a.*, u.full_name AS patient_name, u.phone
+        FROM appointments a
+        JOIN patients p ON a.patient_id = p.id
+        JOIN users u ON p.user_id = u.id
+        WHERE a.doctor_id = ?
+    """,
+}
+
+
+# Next few Booked appointments on the doctor dashboard
+DOCTOR_UPCOMING_QUERY = """
+    SELECT a.id, a.date, a.time, a.status,
+           u.full_name AS patient_name,
+           u.phone
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.id
+    JOIN users u ON p.user_id = u.id
+    WHERE a.doctor_id = ?
+      AND a.status = 'Booked'
+      AND a.date >= ?
+    ORDER BY a.date, a.time
+    LIMIT 5;
+"""
+
+# A doctor's open windows between two dates (booking form, availability page)
+DOCTOR_WINDOWS_QUERY = """
+    SELECT * FROM doctor_availability
+    WHERE doctor_id = ?
+      AND is_available = 1
+      AND date >= ?
+      AND date <= ?
+    ORDER BY date, start_time;
+"""
+
+TREATMENT_ID_QUERY = "SELECT id FROM treatments WHERE appointment_id = ?;"
+
+# Admin patient listing; the view appends the search filter and ORDER BY
+ADMIN_PATIENTS_QUERY = """
+    SELECT p.id AS patient_id,
+           u.full_name,
+           u.username,
+           u.email,
+           u.phone,
+           p.age,
+           p.gender,
+           p.address,
+           p.is_blacklisted
+    FROM patients p
+    JOIN users u ON p.user_id = u.id
+"""
+
+
+def encode_cursor(row):
+    return f"{row['date']}|{row['time']}|{row['id']}"
+
+
+def decode_cursor(raw):
+    """Parse a 'date|time|id' keyset cursor; None if absent or malformed."""
+    if not raw:
+        return None
+    parts = raw.split("|")
+    if len(parts) != 3 or not parts[2].isdigit():
+        return None
+    return parts[0], parts[1], int(parts[2])
+
+
+def appointments_page_query(query, params, section, today_str, cursor=None, limit=None):
+    """
+    (sql, params) of one keyset page, newest first, by (date, time, id).
+    `query` is a SELECT over `appointments a` ending in a WHERE clause (no ORDER BY).
+    `section` is "upcoming" (Booked, today or later) or "past" (everything else),
+    so the split happens in indexed SQL instead of a Python loop.
+    Fetches limit + 1 rows to tell whether there is a next page.
+    """
+    params = list(params)
+    if section == "upcoming":
+        query += " AND a.date >= ? AND a.status = 'Booked'"
+    else:
+        query += " AND (a.date < ? OR a.status != 'Booked')"
+    params.append(today_str)
+
+    if cursor:
+        query += " AND (a.date, a.time, a.id) < (?, ?, ?)"
+        params.extend(cursor)
+
+    query += " ORDER BY a.date DESC, a.time DESC, a.id DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit + 1)
+    return query + ";", params
+
+
+def fetch_appointments_page(query, params, section, today_str, cursor=None, limit=None, conn=None):
+    """
+    Page through appointments (see appointments_page_query).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    Runs on the request connection unless `conn` is given.
+    """
+    sql, params = appointments_page_query(query, params, section, today_str, cursor, limit)
+    rows = (conn or get_db()).execute(sql, params).fetchall()
+    if limit is not None and len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
+
+
+def page_size(config_key, args=None, config=None):
+    """?per_page= clamped to [1, MAX_PAGE_SIZE]; defaults to this request's args and app config."""
+    args = request.args if args is None else args
+    config = current_app.config if config is None else config
+    default = config.get(config_key, 50)
+    try:
+        size = int(args.get("per_page", default))
+    except ValueError:
+        size = default
+    return max(1, min(size, config.get("MAX_PAGE_SIZE", 500)))
+
+
+def stream_page(template_name, chunk_size=16384, **context):
+    """
+    stream_template for unpaginated listings (rows passed as LazyRows).
+    Jinja yields many tiny strings; they are joined into ~chunk_size writes.
+    """
+    pieces = stream_template(template_name, **context)  # carries the request context along
+
+    def chunks():
+        buffer, size = [], 0
+        for piece in pieces:
+            buffer.append(piece)
+            size += len(piece)
+            if size >= chunk_size:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+
+    return Response(chunks(), mimetype="text/html")
+
+
+def appointment_history(endpoint, query, params):
+    """
+    Shared by patient_appointments / doctor_appointments: every upcoming
+    appointment plus one keyset page of past ones (cursor in ?past_after=).
+    Returns (upcoming, past, next_past_url, first_page_url).
+    """
+    today_str = date_cls.today().isoformat()
+    upcoming, _ = fetch_appointments_page(query, params, "upcoming", today_str)
+    past, next_past = fetch_appointments_page(
+        query, params, "past", today_str,
+        cursor=decode_cursor(request.args.get("past_after")),
+        limit=page_size("HISTORY_PAGE_SIZE"),
     )
-    row = cur.fetchone()
-    conn.close()
-    return row["id"] if row else None
+
+    args = request.args.to_dict()
+    next_past_url = first_page_url = None
+    if next_past:
+        next_past_url = url_for(endpoint, **{**args, "past_after": next_past})
+    if "past_after" in args:
+        first_page_url = url_for(endpoint, **{k: v for k, v in args.items() if k != "past_after"})
+    return upcoming, past, next_past_url, first_page_url
+
+
+def fts_match(q, columns):
+    """FTS5 MATCH expression for q, or None to use the LIKE fallback."""
+    if "search_index" not in current_app.extensions:
+        current_app.extensions["search_index"] = has_search_index(get_db())
+    if not current_app.extensions["search_index"]:
+        return None
+    return build_match_query(q, columns)
+
+
+# --------- Cached listings ---------
+DIRECTORY_CACHE_KEYS = ("departments", "doctor_directory")
+
+
+def get_departments():
+    return get_cache().get_or_set(
+        "departments",
+        lambda: [dict(r) for r in get_db().execute("SELECT * FROM departments ORDER BY name;")],
+        ttl=current_app.config.get("DIRECTORY_CACHE_TTL"),
+    )
+
+
+def get_doctor_directory():
+    """All bookable doctors (not blacklisted, active), ordered by name."""
+    def load():
+        rows = get_db().execute(
+            """
+            SELECT d.id AS doctor_id,
+                   d.user_id,
+                   d.department_id,
+                   u.full_name,
+                   u.email,
+                   u.phone,
+                   d.room_no,
+                   dept.name AS dept_name
+            FROM doctors d
+            JOIN users u ON d.user_id = u.id
+            LEFT JOIN departments dept ON d.department_id = dept.id
+            WHERE d.is_blacklisted = 0 AND u.is_active = 1
+            ORDER BY u.full_name;
+            """
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    return get_cache().get_or_set(
+        "doctor_directory", load, ttl=current_app.config.get("DIRECTORY_CACHE_TTL")
+    )
+
+
+def invalidate_directory_cache():
+    get_cache().invalidate(*DIRECTORY_CACHE_KEYS)
+    invalidate_fragments("departments")
+    invalidate_week_availability()
+
+
+def invalidate_week_availability(*doctor_ids):
+    """After windows change: refresh those doctors in the snapshot (all if none given)."""
+    snapshot = get_snapshot()
+    for doctor_id in doctor_ids or (None,):
+        snapshot.invalidate(doctor_id)
+    invalidate_fragments("week_availability")
 
 
 # --------- Auth & Index ---------
@@ -83,16 +419,41 @@ def login():
         username = request.form.get("username")
         password = request.form.get("password")
 
-        conn = get_db_connection()
+        conn = get_db()
         cur = conn.cursor()
         cur.execute("SELECT * FROM users WHERE username = ? AND is_active = 1;", (username,))
         user = cur.fetchone()
-        conn.close()
 
-        if user and check_password_hash(user["password_hash"], password):
+        hasher = get_hasher()
+        try:
+            valid = bool(user) and hasher.verify(user["password_hash"], password)
+        except VerifierBusy as e:
+            flash(str(e), "warning")
+            return render_template("login.html"), 503
+
+        if valid:
+            # Resolve the patient/doctor profile id once; views read it from the session
+            profile_id = resolve_profile_id(user["id"], user["role"])
+            if user["role"] in PROFILE_QUERIES and profile_id is None:
+                flash("Your account has been blocked. Please contact the hospital.", "danger")
+                return render_template("login.html")
+
+            # Upgrade hashes stored under an old method/cost while we have the password
+            if hasher.needs_rehash(user["password_hash"]):
+                try:
+                    new_hash = hasher.rehash(password)
+                    run_write(lambda cur: cur.execute(
+                        "UPDATE users SET password_hash = ? WHERE id = ?;", (new_hash, user["id"])
+                    ))
+                except VerifierBusy:
+                    pass  # try again on a later login
+
+            session.clear()
             session["user_id"] = user["id"]
             session["role"] = user["role"]
             session["full_name"] = user["full_name"]
+            session["profile_id"] = profile_id
+            session["profile_checked_at"] = time.time()
             flash("Logged in successfully.", "success")
 
             if user["role"] == "admin":
@@ -133,40 +494,39 @@ def register():
             flash("Passwords do not match.", "danger")
             return render_template("register.html")
 
-        conn = get_db_connection()
+        conn = get_db()
         cur = conn.cursor()
 
         # Check if username exists
         cur.execute("SELECT id FROM users WHERE username = ?;", (username,))
         if cur.fetchone():
-            conn.close()
             flash("Username already taken.", "warning")
             return render_template("register.html")
 
         now = datetime.utcnow().isoformat()
-        password_hash = generate_password_hash(password)
+        password_hash = hash_password(password)
 
-        # Insert into users
-        cur.execute(
-            """
-            INSERT INTO users (username, password_hash, full_name, email, phone, role, is_active, created_at)
-            VALUES (?, ?, ?, ?, ?, 'patient', 1, ?);
-        """,
-            (username, password_hash, full_name, email, phone, now),
-        )
-        user_id = cur.lastrowid
+        def create_patient(cur):
+            # Insert into users
+            cur.execute(
+                """
+                INSERT INTO users (username, password_hash, full_name, email, phone, role, is_active, created_at)
+                VALUES (?, ?, ?, ?, ?, 'patient', 1, ?);
+            """,
+                (username, password_hash, full_name, email, phone, now),
+            )
+            user_id = cur.lastrowid
 
-        # Insert into patients
-        cur.execute(
-            """
-            INSERT INTO patients (user_id, age, gender, address, emergency_contact, is_blacklisted)
-            VALUES (?, ?, ?, ?, ?, 0);
-        """,
-            (user_id, age, gender, address, emergency_contact),
-        )
+            # Insert into patients
+            cur.execute(
+                """
+                INSERT INTO patients (user_id, age, gender, address, emergency_contact, is_blacklisted)
+                VALUES (?, ?, ?, ?, ?, 0);
+            """,
+                (user_id, age, gender, address, emergency_contact),
+            )
 
-        conn.commit()
-        conn.close()
+        run_write(create_patient)
 
         flash("Registration successful. You can now log in.", "success")
         return redirect(url_for("main.login"))
@@ -182,82 +542,204 @@ def api_stats():
     Simple JSON API endpoint returning summary statistics:
     - total doctors, patients, appointments
     - appointment counts by status
+    Served from the trigger-maintained hospital_stats row.
     """
-    conn = get_db_connection()
-    cur = conn.cursor()
+    return jsonify(stats_summary(get_db()))
 
-    # total doctors
-    cur.execute("SELECT COUNT(*) AS c FROM doctors;")
-    total_doctors = cur.fetchone()["c"]
 
-    # total patients
-    cur.execute("SELECT COUNT(*) AS c FROM patients;")
-    total_patients = cur.fetchone()["c"]
+def stats_summary(conn):
+    """The /api/stats payload (also served by asgi.py)."""
+    stats = read_stats(conn)
+    return {
+        "total_doctors": stats["total_doctors"],
+        "total_patients": stats["total_patients"],
+        "total_appointments": stats["total_appointments"],
+        "appointments_by_status": stats["by_status"],
+    }
 
-    # total appointments
-    cur.execute("SELECT COUNT(*) AS c FROM appointments;")
-    total_appointments = cur.fetchone()["c"]
 
-    # appointments by status
-    cur.execute(
-        """
-        SELECT status, COUNT(*) AS c
-        FROM appointments
-        GROUP BY status;
-        """
-    )
-    rows = cur.fetchall()
-    conn.close()
+# --------- Metrics ---------
+# stats() keys that only ever grow; exported as counters (NAME_total)
+COUNTER_STATS = {
+    "hits", "misses", "waits", "wait_time", "invalidations",
+    "verified", "rejected", "rehashed", "rebuilds", "refreshes",
+}
 
-    by_status = {row["status"]: row["c"] for row in rows}
 
+@main_bp.route("/admin/metrics")
+@login_required
+@role_required("admin")
+def admin_metrics():
+    """Request/SQL metrics plus pool, cache and login-hasher gauges, in Prometheus text format."""
+    metrics = current_app.extensions.get("metrics")
+    if metrics is None:
+        return Response("metrics disabled (METRICS_ENABLED = False)\n", status=404, mimetype="text/plain")
+
+    gauges, counters = {}, {}
+    for source, prefix, stats in (
+        ("db pool", "hms_db_pool", get_pool().stats()),
+        ("cache", "hms_cache", get_cache().stats()),
+        ("password hasher", "hms_password", get_hasher().stats()),
+        ("availability snapshot", "hms_availability_snapshot", get_snapshot().stats()),
+    ):
+        for key, value in stats.items():
+            if isinstance(value, (int, float)):
+                target = counters if key in COUNTER_STATS else gauges
+                target[f"{prefix}_{key}"] = (f"{source} {key.replace('_', ' ')}", value)
+
+    return Response(metrics.render(gauges, counters), mimetype="text/plain; version=0.0.4")
+
+
+# --------- API: Bulk schedule import ---------
+@main_bp.route("/api/schedules/import", methods=["POST"])
+@login_required
+@role_required("admin")
+def api_import_schedules():
+    """
+    Import recurring schedules for many doctors in one write transaction.
+    Body: {"schedules": [{"doctor_id", "start_date", "weekdays", "start_time",
+    "end_time", "weeks", "max_appointments"?}, ...]}
+    Invalid or overlapping entries are skipped and reported per entry.
+    """
+    payload = request.get_json(silent=True) or {}
+    entries = payload.get("schedules") if isinstance(payload, dict) else payload
+    if not isinstance(entries, list):
+        return jsonify({"error": "Expected a list of schedules."}), 400
+
+    slot_minutes = current_app.config.get("SLOT_MINUTES", 15)
+    max_weeks = current_app.config.get("MAX_SCHEDULE_WEEKS", 26)
+
+    def import_all(cur):
+        results = []
+        for i, entry in enumerate(entries):
+            entry = entry if isinstance(entry, dict) else {}
+            doctor_id = entry.get("doctor_id")
+            if not isinstance(doctor_id, (int, str)) or not cur.execute(
+                "SELECT 1 FROM doctors WHERE id = ?;", (doctor_id,)
+            ).fetchone():
+                results.append({"index": i, "doctor_id": doctor_id, "error": "Doctor not found."})
+                continue
+            try:
+                created = create_recurring_windows(
+                    cur,
+                    doctor_id,
+                    entry.get("start_date", ""),
+                    entry.get("weekdays", []),
+                    entry.get("start_time", ""),
+                    entry.get("end_time", ""),
+                    entry.get("weeks"),
+                    max_appointments=entry.get("max_appointments", 10),
+                    slot_minutes=slot_minutes,
+                    max_weeks=max_weeks,
+                )
+                results.append({"index": i, "doctor_id": doctor_id, "created": created})
+            except ScheduleError as e:
+                results.append({"index": i, "doctor_id": doctor_id, "error": str(e)})
+        return results
+
+    results = run_write(import_all)
+    changed = {r["doctor_id"] for r in results if r.get("created")}
+    if changed:
+        invalidate_week_availability(*changed)
     return jsonify(
         {
-            "total_doctors": total_doctors,
-            "total_patients": total_patients,
-            "total_appointments": total_appointments,
-            "appointments_by_status": by_status,
+            "created": sum(r.get("created", 0) for r in results),
+            "failed": sum(1 for r in results if "error" in r),
+            "results": results,
         }
     )
 
 
-# --------- Dashboards ---------
-@main_bp.route("/admin/dashboard")
-@login_required
-@role_required("admin")
-def admin_dashboard():
-    conn = get_db_connection()
-    cur = conn.cursor()
+# --------- Bulk status updates ---------
+BULK_ACTIONS = {"cancel": "Cancelled", "complete": "Completed"}
 
-    cur.execute("SELECT COUNT(*) AS c FROM doctors;")
-    total_doctors = cur.fetchone()["c"]
 
-    cur.execute("SELECT COUNT(*) AS c FROM patients;")
-    total_patients = cur.fetchone()["c"]
+def bulk_status_update(doctor_id=None, redirect_endpoint="main.admin_appointments"):
+    """
+    Shared body of the admin and doctor bulk endpoints.
+    Input: action ("cancel"/"complete") plus either appointment ids or
+    doctor_id/date_from/date_to, as JSON or form fields. JSON requests get
+    per-id results back; form posts get a flash message and a redirect.
+    Passing doctor_id restricts the update to that doctor's appointments.
+    """
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object."}), 400
+        ids = data.get("ids")
+    else:
+        data = request.form
+        ids = request.form.getlist("appointment_ids") or None
+
+    new_status = BULK_ACTIONS.get(data.get("action", ""))
+    if doctor_id is None:
+        doctor_id = data.get("doctor_id") or None
+
+    error = None
+    results = []
+    try:
+        if request.is_json and ids is not None:
+            # Strict for JSON: a string would otherwise be iterated digit by digit.
+            if not isinstance(ids, list) or not all(type(i) is int for i in ids):
+                raise TypeError(ids)
+        ids = [int(i) for i in ids] if ids is not None else None
+        doctor_id = int(doctor_id) if doctor_id is not None else None
+    except (TypeError, ValueError):
+        error = "Appointment and doctor ids must be numbers."
+
+    if error is None and new_status is None:
+        error = "Invalid action."
+    if error is None:
+        try:
+            results = run_write(lambda cur: bulk_set_status(
+                cur,
+                new_status,
+                ids=ids,
+                doctor_id=doctor_id,
+                date_from=data.get("date_from"),
+                date_to=data.get("date_to"),
+            ))
+        except ValueError as e:
+            error = str(e)
+
+    updated = sum(1 for r in results if r["result"] == "updated")
+    if request.is_json:
+        if error:
+            return jsonify({"error": error}), 400
+        return jsonify({"status": new_status, "updated": updated, "results": results})
+
+    if error:
+        flash(error, "danger")
+    else:
+        flash(f"{updated} appointment(s) marked as {new_status}.", "success" if updated else "info")
+    return redirect(url_for(redirect_endpoint))
+
+
+@main_bp.route("/admin/appointments/bulk", methods=["POST"])
+@login_required
+@role_required("admin")
+def admin_bulk_appointments():
+    return bulk_status_update()
 
-    cur.execute("SELECT COUNT(*) AS c FROM appointments;")
-    total_appointments = cur.fetchone()["c"]
 
-    # appointments by status for chart
-    cur.execute(
-        """
-        SELECT status, COUNT(*) AS c
-        FROM appointments
-        GROUP BY status;
-        """
-    )
-    rows = cur.fetchall()
-    conn.close()
+@main_bp.route("/doctor/appointments/bulk", methods=["POST"])
+@login_required
+@role_required("doctor")
+def doctor_bulk_appointments():
+    doctor_id = get_current_doctor_id()
+    if not doctor_id:
+        flash("Doctor profile not found.", "danger")
+        return redirect(url_for("main.doctor_dashboard"))
+    return bulk_status_update(doctor_id, redirect_endpoint="main.doctor_appointments")
 
-    # build dict: {status: count}
-    by_status = {row["status"]: row["c"] for row in rows}
 
-    stats = {
-        "total_doctors": total_doctors,
-        "total_patients": total_patients,
-        "total_appointments": total_appointments,
-        "by_status": by_status,
-    }
+# --------- Dashboards ---------
+@main_bp.route("/admin/dashboard")
+@login_required
+@role_required("admin")
+def admin_dashboard():
+    # totals + {status: count} for the chart, from the counters row
+    stats = read_stats(get_db())
 
     return render_template("dashboard_admin.html", stats=stats)
 
@@ -272,67 +754,17 @@ def doctor_dashboard():
         flash("Doctor profile not found.", "danger")
         return redirect(url_for("main.login"))
 
-    conn = get_db_connection()
+    conn = get_db()
     cur = conn.cursor()
 
     today_str = date_cls.today().isoformat()
 
-    # Total appointments for this doctor
-    cur.execute(
-        "SELECT COUNT(*) AS c FROM appointments WHERE doctor_id = ?;",
-        (doctor_id,),
-    )
-    total_appts = cur.fetchone()["c"]
-
-    # Upcoming (Booked) appointments
-    today_str = date_cls.today().isoformat()
-
-# Upcoming (Booked) appointments: today or future
-    cur.execute(
-        """
-        SELECT COUNT(*) AS c
-        FROM appointments
-        WHERE doctor_id = ?
-        AND status = 'Booked'
-        AND date >= ?;
-        """,
-        (doctor_id, today_str),
-    )
-    upcoming_count = cur.fetchone()["c"]
-
-
-    # Completed appointments
-    cur.execute(
-        "SELECT COUNT(*) AS c FROM appointments WHERE doctor_id = ? AND status = 'Completed';",
-        (doctor_id,),
-    )
-    completed_count = cur.fetchone()["c"]
+    # total / upcoming / completed from the trigger-maintained doctor_stats row
+    stats = read_doctor_stats(conn, doctor_id, today_str)
 
     # Next few upcoming appointments (today or later, status = Booked)
-    cur.execute(
-        """
-        SELECT a.id, a.date, a.time, a.status,
-               u.full_name AS patient_name,
-               u.phone
-        FROM appointments a
-        JOIN patients p ON a.patient_id = p.id
-        JOIN users u ON p.user_id = u.id
-        WHERE a.doctor_id = ?
-          AND a.status = 'Booked'
-          AND a.date >= ?
-        ORDER BY a.date, a.time
-        LIMIT 5;
-        """,
-        (doctor_id, today_str),
-    )
+    cur.execute(DOCTOR_UPCOMING_QUERY, (doctor_id, today_str))
     upcoming = cur.fetchall()
-    conn.close()
-
-    stats = {
-        "total": total_appts,
-        "upcoming": upcoming_count,
-        "completed": completed_count,
-    }
 
     return render_template("dashboard_doctor.html", stats=stats, upcoming=upcoming)
 
@@ -341,42 +773,21 @@ def doctor_dashboard():
 @login_required
 @role_required("patient")
 def patient_dashboard():
-    conn = get_db_connection()
-    cur = conn.cursor()
-
     # departments
-    cur.execute("SELECT * FROM departments ORDER BY name;")
-    departments = cur.fetchall()
+    departments = get_departments()
 
-    # doctor availability for next 7 days
+    # doctor availability for next 7 days: the shared in-memory snapshot, only
+    # read when the template's cached fragment has expired
     today = date_cls.today()
-    max_day = today + timedelta(days=7)
-    cur.execute(
-        """
-        SELECT da.date,
-               da.start_time,
-               da.end_time,
-               du.full_name AS doctor_name,
-               dept.name AS dept_name
-        FROM doctor_availability da
-        JOIN doctors d ON da.doctor_id = d.id
-        JOIN users du ON d.user_id = du.id
-        LEFT JOIN departments dept ON d.department_id = dept.id
-        WHERE da.is_available = 1
-          AND da.date >= ?
-          AND da.date <= ?
-        ORDER BY da.date, da.start_time, doctor_name;
-        """,
-        (today.isoformat(), max_day.isoformat()),
-    )
-    availability = cur.fetchall()
 
-    conn.close()
+    def week_availability():
+        return get_snapshot().rows(get_db(), today)
 
     return render_template(
         "dashboard_patient.html",
         departments=departments,
-        availability=availability,
+        week_availability=week_availability,
+        today=today,
     )
 
 
@@ -387,8 +798,7 @@ def patient_dashboard():
 @role_required("admin")
 def admin_doctors():
     q = request.args.get("q", "").strip()
-    conn = get_db_connection()
-    cur = conn.cursor()
+    conn = get_db()
 
     base_query = """
         SELECT d.id AS doctor_id,
@@ -405,30 +815,37 @@ def admin_doctors():
     """
 
     params = []
-    if q:
+    match = fts_match(q, DOCTOR_COLUMNS) if q else None
+    if match:
+        # Prefix search over the FTS index, best match first
         base_query += """
-            WHERE u.full_name LIKE ? OR dept.name LIKE ?
+            JOIN people_search s ON s.rowid = u.id
+            WHERE s.people_search MATCH ? AND s.role = 'doctor'
+            ORDER BY s.rank;
         """
-        like_q = f"%{q}%"
-        params.extend([like_q, like_q])
-
-    base_query += " ORDER BY u.full_name;"
+        params.append(match)
+    else:
+        if q:
+            base_query += """
+                WHERE u.full_name LIKE ? OR dept.name LIKE ?
+            """
+            like_q = f"%{q}%"
+            params.extend([like_q, like_q])
 
-    cur.execute(base_query, params)
-    doctors = cur.fetchall()
-    conn.close()
+        base_query += " ORDER BY u.full_name;"
 
-    return render_template("admin_doctors.html", doctors=doctors)
+    # Unpaginated: stream rows and HTML instead of materializing both
+    doctors = LazyRows(conn.execute(base_query, params))
+    return stream_page("admin_doctors.html", doctors=doctors)
 
 
 @main_bp.route("/admin/doctors/add", methods=["GET", "POST"])
 @login_required
 @role_required("admin")
 def admin_add_doctor():
-    conn = get_db_connection()
+    conn = get_db()
     cur = conn.cursor()
-    cur.execute("SELECT * FROM departments ORDER BY name;")
-    departments = cur.fetchall()
+    departments = get_departments()
 
     if request.method == "POST":
         full_name = request.form.get("full_name")
@@ -443,45 +860,43 @@ def admin_add_doctor():
 
         if password != confirm_password:
             flash("Passwords do not match.", "danger")
-            conn.close()
             return render_template("admin_doctor_form.html", departments=departments)
 
         # Check username uniqueness
         cur.execute("SELECT id FROM users WHERE username = ?;", (username,))
         if cur.fetchone():
             flash("Username already taken.", "warning")
-            conn.close()
             return render_template("admin_doctor_form.html", departments=departments)
 
         now = datetime.utcnow().isoformat()
-        password_hash = generate_password_hash(password)
+        password_hash = hash_password(password)
 
-        # Insert into users table with role=doctor
-        cur.execute(
-            """
-            INSERT INTO users (username, password_hash, full_name, email, phone, role, is_active, created_at)
-            VALUES (?, ?, ?, ?, ?, 'doctor', 1, ?);
-        """,
-            (username, password_hash, full_name, email, phone, now),
-        )
-        user_id = cur.lastrowid
+        def create_doctor(cur):
+            # Insert into users table with role=doctor
+            cur.execute(
+                """
+                INSERT INTO users (username, password_hash, full_name, email, phone, role, is_active, created_at)
+                VALUES (?, ?, ?, ?, ?, 'doctor', 1, ?);
+            """,
+                (username, password_hash, full_name, email, phone, now),
+            )
+            user_id = cur.lastrowid
 
-        # Insert into doctors table
-        cur.execute(
-            """
-            INSERT INTO doctors (user_id, department_id, bio, room_no, is_blacklisted)
-            VALUES (?, ?, ?, ?, 0);
-        """,
-            (user_id, department_id, bio, room_no),
-        )
+            # Insert into doctors table
+            cur.execute(
+                """
+                INSERT INTO doctors (user_id, department_id, bio, room_no, is_blacklisted)
+                VALUES (?, ?, ?, ?, 0);
+            """,
+                (user_id, department_id, bio, room_no),
+            )
 
-        conn.commit()
-        conn.close()
+        run_write(create_doctor)
+        invalidate_directory_cache()
 
         flash("Doctor created successfully.", "success")
         return redirect(url_for("main.admin_doctors"))
 
-    conn.close()
     return render_template("admin_doctor_form.html", departments=departments)
 
 
@@ -489,21 +904,22 @@ def admin_add_doctor():
 @login_required
 @role_required("admin")
 def admin_toggle_doctor_blacklist(doctor_id):
-    conn = get_db_connection()
+    conn = get_db()
     cur = conn.cursor()
 
-    cur.execute("SELECT is_blacklisted FROM doctors WHERE id = ?;", (doctor_id,))
+    cur.execute("SELECT is_blacklisted, user_id FROM doctors WHERE id = ?;", (doctor_id,))
     doc = cur.fetchone()
 
     if not doc:
-        conn.close()
         flash("Doctor not found.", "danger")
         return redirect(url_for("main.admin_doctors"))
 
     new_status = 0 if doc["is_blacklisted"] else 1
-    cur.execute("UPDATE doctors SET is_blacklisted = ? WHERE id = ?;", (new_status, doctor_id))
-    conn.commit()
-    conn.close()
+    run_write(lambda cur: cur.execute(
+        "UPDATE doctors SET is_blacklisted = ? WHERE id = ?;", (new_status, doctor_id)
+    ))
+    revoke_user_session(doc["user_id"])
+    invalidate_directory_cache()
 
     flash("Doctor status updated.", "info")
     return redirect(url_for("main.admin_doctors"))
@@ -515,61 +931,55 @@ def admin_toggle_doctor_blacklist(doctor_id):
 @role_required("admin")
 def admin_patients():
     q = request.args.get("q", "").strip()
-    conn = get_db_connection()
-    cur = conn.cursor()
+    conn = get_db()
 
-    base_query = """
-        SELECT p.id AS patient_id,
-               u.full_name,
-               u.username,
-               u.email,
-               u.phone,
-               p.age,
-               p.gender,
-               p.address,
-               p.is_blacklisted
-        FROM patients p
-        JOIN users u ON p.user_id = u.id
-    """
+    base_query = ADMIN_PATIENTS_QUERY
     params = []
 
-    if q:
+    match = fts_match(q, PATIENT_COLUMNS) if q else None
+    if match:
         base_query += """
-            WHERE u.full_name LIKE ?
-               OR u.email LIKE ?
-               OR u.phone LIKE ?
+            JOIN people_search s ON s.rowid = u.id
+            WHERE s.people_search MATCH ? AND s.role = 'patient'
+            ORDER BY s.rank;
         """
-        like_q = f"%{q}%"
-        params.extend([like_q, like_q, like_q])
-
-    base_query += " ORDER BY u.full_name;"
+        params.append(match)
+    else:
+        if q:
+            base_query += """
+                WHERE u.full_name LIKE ?
+                   OR u.email LIKE ?
+                   OR u.phone LIKE ?
+            """
+            like_q = f"%{q}%"
+            params.extend([like_q, like_q, like_q])
 
-    cur.execute(base_query, params)
-    patients = cur.fetchall()
-    conn.close()
+        base_query += " ORDER BY u.full_name;"
 
-    return render_template("admin_patients.html", patients=patients)
+    # Unpaginated: stream rows and HTML instead of materializing both
+    patients = LazyRows(conn.execute(base_query, params))
+    return stream_page("admin_patients.html", patients=patients)
 
 
 @main_bp.route("/admin/patients/<int:patient_id>/toggle_blacklist")
 @login_required
 @role_required("admin")
 def admin_toggle_patient_blacklist(patient_id):
-    conn = get_db_connection()
+    conn = get_db()
     cur = conn.cursor()
 
-    cur.execute("SELECT is_blacklisted FROM patients WHERE id = ?;", (patient_id,))
+    cur.execute("SELECT is_blacklisted, user_id FROM patients WHERE id = ?;", (patient_id,))
     row = cur.fetchone()
 
     if not row:
-        conn.close()
         flash("Patient not found.", "danger")
         return redirect(url_for("main.admin_patients"))
 
     new_status = 0 if row["is_blacklisted"] else 1
-    cur.execute("UPDATE patients SET is_blacklisted = ? WHERE id = ?;", (new_status, patient_id))
-    conn.commit()
-    conn.close()
+    run_write(lambda cur: cur.execute(
+        "UPDATE patients SET is_blacklisted = ? WHERE id = ?;", (new_status, patient_id)
+    ))
+    revoke_user_session(row["user_id"])
 
     flash("Patient status updated.", "info")
     return redirect(url_for("main.admin_patients"))
@@ -583,22 +993,7 @@ def admin_appointments():
     doctor_q = request.args.get("doctor", "").strip()
     status_q = request.args.get("status", "").strip()
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    query = """
-        SELECT a.*,
-               pu.full_name AS patient_name,
-               du.full_name AS doctor_name,
-               dept.name AS dept_name
-        FROM appointments a
-        JOIN patients p ON a.patient_id = p.id
-        JOIN users pu ON p.user_id = pu.id
-        JOIN doctors d ON a.doctor_id = d.id
-        JOIN users du ON d.user_id = du.id
-        LEFT JOIN departments dept ON d.department_id = dept.id
-        WHERE 1=1
-    """
+    query = APPOINTMENT_QUERIES["admin"]
     params = []
 
     if patient_q:
@@ -613,56 +1008,103 @@ def admin_appointments():
         query += " AND a.status = ?"
         params.append(status_q)
 
-    query += " ORDER BY a.date DESC, a.time DESC;"
+    # Upcoming and past are paged independently, each with its own cursor
+    today_str = date_cls.today().isoformat()
+    limit = page_size("ADMIN_APPOINTMENTS_PAGE_SIZE")
+    upcoming, next_upcoming = fetch_appointments_page(
+        query, params, "upcoming", today_str,
+        cursor=decode_cursor(request.args.get("upcoming_after")), limit=limit,
+    )
+    past, next_past = fetch_appointments_page(
+        query, params, "past", today_str,
+        cursor=decode_cursor(request.args.get("past_after")), limit=limit,
+    )
 
-    cur.execute(query, params)
-    rows = cur.fetchall()
-    conn.close()
+    args = request.args.to_dict()
+    next_upcoming_url = next_past_url = None
+    if next_upcoming:
+        next_upcoming_url = url_for("main.admin_appointments", **{**args, "upcoming_after": next_upcoming})
+    if next_past:
+        next_past_url = url_for("main.admin_appointments", **{**args, "past_after": next_past})
 
-    today_str = date_cls.today().isoformat()
-    upcoming = []
-    past = []
+    first_page_url = None
+    if "upcoming_after" in args or "past_after" in args:
+        filters = {k: v for k, v in args.items() if k not in ("upcoming_after", "past_after")}
+        first_page_url = url_for("main.admin_appointments", **filters)
 
-    for r in rows:
-        if r["date"] >= today_str and r["status"] == "Booked":
-            upcoming.append(r)
-        else:
-            past.append(r)
+    return render_template(
+        "admin_appointments.html",
+        doctors=get_doctor_directory(),
+        today=date_cls.today().isoformat(),
+        upcoming=upcoming,
+        past=past,
+        next_upcoming_url=next_upcoming_url,
+        next_past_url=next_past_url,
+        first_page_url=first_page_url,
+    )
 
-    return render_template("admin_appointments.html", upcoming=upcoming, past=past)
+
+@main_bp.route("/admin/export/appointments.<fmt>")
+@login_required
+@role_required("admin")
+def admin_export_appointments(fmt):
+    """
+    Stream every appointment (with patient, doctor and treatment) as CSV or
+    NDJSON. Optional filters: ?date_from=, ?date_to=, ?status=.
+    """
+    if fmt not in EXPORT_FORMATS:
+        flash("Unknown export format.", "danger")
+        return redirect(url_for("main.admin_appointments"))
+
+    status = request.args.get("status", "").strip() or None
+    if status and status not in ("Booked", "Completed", "Cancelled"):
+        flash("Invalid status.", "danger")
+        return redirect(url_for("main.admin_appointments"))
+
+    chunks = export_appointments(
+        get_db(),
+        fmt,
+        date_from=request.args.get("date_from", "").strip() or None,
+        date_to=request.args.get("date_to", "").strip() or None,
+        status=status,
+        batch_size=current_app.config.get("EXPORT_BATCH_SIZE", 500),
+    )
+    # stream_with_context keeps the request (and its pooled connection) alive
+    # until the last chunk has been sent
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename=appointments.{fmt}"},
+    )
 
 
 @main_bp.route("/admin/appointments/<int:appointment_id>/cancel")
 @login_required
 @role_required("admin")
 def admin_cancel_appointment(appointment_id):
-    conn = get_db_connection()
+    conn = get_db()
     cur = conn.cursor()
 
     cur.execute("SELECT * FROM appointments WHERE id = ?;", (appointment_id,))
     appt = cur.fetchone()
 
     if not appt:
-        conn.close()
         flash("Appointment not found.", "danger")
         return redirect(url_for("main.admin_appointments"))
 
     if appt["status"] != "Booked":
-        conn.close()
         flash("Only booked appointments can be cancelled.", "warning")
         return redirect(url_for("main.admin_appointments"))
 
     now = datetime.utcnow().isoformat()
-    cur.execute(
+    run_write(lambda cur: cur.execute(
         """
         UPDATE appointments
         SET status = 'Cancelled', updated_at = ?
         WHERE id = ?;
         """,
         (now, appointment_id),
-    )
-    conn.commit()
-    conn.close()
+    ))
 
     flash("Appointment cancelled by admin.", "info")
     return redirect(url_for("main.admin_appointments"))
@@ -677,41 +1119,32 @@ def patient_doctors():
     q = request.args.get("q", "").strip()
     department_id = request.args.get("department_id", "").strip()
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    query = """
-        SELECT d.id AS doctor_id,
-               u.full_name,
-               u.email,
-               u.phone,
-               d.room_no,
-               dept.name AS dept_name
-        FROM doctors d
-        JOIN users u ON d.user_id = u.id
-        LEFT JOIN departments dept ON d.department_id = dept.id
-        WHERE d.is_blacklisted = 0 AND u.is_active = 1
-    """
-    params = []
+    # Filter the cached directory instead of re-running the JOIN per request
+    doctors = get_doctor_directory()
 
     if department_id:
-        query += " AND dept.id = ?"
-        params.append(department_id)
+        doctors = [d for d in doctors if str(d["department_id"]) == department_id]
 
     if q:
-        query += " AND (u.full_name LIKE ? OR dept.name LIKE ?)"
-        like_q = f"%{q}%"
-        params.extend([like_q, like_q])
-
-    query += " ORDER BY u.full_name;"
-
-    cur.execute(query, params)
-    doctors = cur.fetchall()
-
-    cur.execute("SELECT * FROM departments ORDER BY name;")
-    departments = cur.fetchall()
+        match = fts_match(q, DOCTOR_COLUMNS)
+        if match:
+            # Ranked ids from the FTS index, applied to the cached directory
+            user_rank = {
+                user_id: i
+                for i, user_id in enumerate(search_user_ids(get_db(), q, "doctor", DOCTOR_COLUMNS))
+            }
+            doctors = sorted(
+                (d for d in doctors if d["user_id"] in user_rank),
+                key=lambda d: user_rank[d["user_id"]],
+            )
+        else:
+            needle = q.casefold()
+            doctors = [
+                d for d in doctors
+                if needle in d["full_name"].casefold() or needle in (d["dept_name"] or "").casefold()
+            ]
 
-    conn.close()
+    departments = get_departments()
 
     return render_template("patient_doctors.html", doctors=doctors, departments=departments)
 
@@ -720,7 +1153,7 @@ def patient_doctors():
 @login_required
 @role_required("patient")
 def patient_book_appointment(doctor_id):
-    conn = get_db_connection()
+    conn = get_db()
     cur = conn.cursor()
 
     # Fetch doctor info
@@ -743,82 +1176,53 @@ def patient_book_appointment(doctor_id):
     doctor = cur.fetchone()
 
     if not doctor or doctor["is_blacklisted"]:
-        conn.close()
         flash("Doctor not available.", "danger")
         return redirect(url_for("main.patient_doctors"))
 
     # availability for this doctor for next 7 days
     today = date_cls.today()
     max_day = today + timedelta(days=7)
-    cur.execute(
-        """
-        SELECT * FROM doctor_availability
-        WHERE doctor_id = ?
-          AND is_available = 1
-          AND date >= ?
-          AND date <= ?
-        ORDER BY date, start_time;
-        """,
-        (doctor_id, today.isoformat(), max_day.isoformat()),
-    )
+    cur.execute(DOCTOR_WINDOWS_QUERY, (doctor_id, today.isoformat(), max_day.isoformat()))
     availability = cur.fetchall()
 
+    # Bookable slots that are still free, straight from the slot grid
+    open_slots = free_slots(conn, doctor_id, today.isoformat(), max_day.isoformat())
+
+    def render_form():
+        return render_template(
+            "patient_book_appointment.html",
+            doctor=doctor,
+            availability=availability,
+            open_slots=open_slots,
+        )
+
     if request.method == "POST":
+        # The slot picker posts "date|time"; plain date/time fields still work
         date_str = request.form.get("date")
         time_str = request.form.get("time")
+        if request.form.get("slot") and "|" in request.form["slot"]:
+            date_str, time_str = request.form["slot"].split("|", 1)
 
         if not date_str or not time_str:
             flash("Please select date and time.", "warning")
-            conn.close()
-            return render_template("patient_book_appointment.html", doctor=doctor, availability=availability)
+            return render_form()
 
         patient_id = get_current_patient_id()
         if not patient_id:
-            conn.close()
             flash("Patient profile not found.", "danger")
             return redirect(url_for("main.patient_dashboard"))
 
-        # Check that chosen time falls within an availability window
-        cur.execute(
-            """
-            SELECT *
-            FROM doctor_availability
-            WHERE doctor_id = ?
-              AND is_available = 1
-              AND date = ?
-              AND start_time <= ?
-              AND end_time >= ?;
-            """,
-            (doctor_id, date_str, time_str, time_str),
-        )
-        slot = cur.fetchone()
-        if not slot:
-            flash("Doctor is not available at the selected date/time. Please choose within the available slots.", "danger")
-            conn.close()
-            return render_template("patient_book_appointment.html", doctor=doctor, availability=availability)
-
-        now = datetime.utcnow().isoformat()
+        # Slot, capacity and insert checked atomically in one BEGIN IMMEDIATE transaction
         try:
-            cur.execute(
-                """
-                INSERT INTO appointments (patient_id, doctor_id, date, time, status, created_at, updated_at)
-                VALUES (?, ?, ?, ?, 'Booked', ?, ?);
-                """,
-                (patient_id, doctor_id, date_str, time_str, now, now),
-            )
-            conn.commit()
+            run_write(lambda cur: book_appointment(cur, patient_id, doctor_id, date_str, time_str))
             flash("Appointment booked successfully.", "success")
-        except sqlite3.IntegrityError:
-            flash("This slot is already booked for the doctor. Please choose another time.", "danger")
-            conn.rollback()
-            conn.close()
-            return render_template("patient_book_appointment.html", doctor=doctor, availability=availability)
+        except BookingError as e:
+            flash(str(e), "danger")
+            return render_form()
 
-        conn.close()
         return redirect(url_for("main.patient_appointments"))
 
-    conn.close()
-    return render_template("patient_book_appointment.html", doctor=doctor, availability=availability)
+    return render_form()
 
 
 
@@ -832,36 +1236,17 @@ def patient_appointments():
         flash("Patient profile not found.", "danger")
         return redirect(url_for("main.patient_dashboard"))
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        SELECT a.*, u.full_name AS doctor_name, dept.name AS dept_name
-        FROM appointments a
-        JOIN doctors d ON a.doctor_id = d.id
-        JOIN users u ON d.user_id = u.id
-        LEFT JOIN departments dept ON d.department_id = dept.id
-        WHERE a.patient_id = ?
-        ORDER BY a.date DESC, a.time DESC;
-        """,
-        (patient_id,),
+    upcoming, past, next_past_url, first_page_url = appointment_history(
+        "main.patient_appointments", APPOINTMENT_QUERIES["patient"], (patient_id,)
     )
-    rows = cur.fetchall()
-    conn.close()
-
-    today_str = date_cls.today().isoformat()
-    upcoming = []
-    past = []
-
-    for r in rows:
-        # simple classification: date >= today => upcoming
-        if r["date"] >= today_str and r["status"] == "Booked":
-            upcoming.append(r)
-        else:
-            past.append(r)
 
-    return render_template("patient_appointments.html", upcoming=upcoming, past=past)
+    return render_template(
+        "patient_appointments.html",
+        upcoming=upcoming,
+        past=past,
+        next_past_url=next_past_url,
+        first_page_url=first_page_url,
+    )
 
 
 @main_bp.route("/patient/appointments/<int:appointment_id>/cancel")
@@ -873,7 +1258,7 @@ def patient_cancel_appointment(appointment_id):
         flash("Patient profile not found.", "danger")
         return redirect(url_for("main.patient_dashboard"))
 
-    conn = get_db_connection()
+    conn = get_db()
     cur = conn.cursor()
 
     cur.execute(
@@ -883,26 +1268,22 @@ def patient_cancel_appointment(appointment_id):
     appt = cur.fetchone()
 
     if not appt:
-        conn.close()
         flash("Appointment not found.", "danger")
         return redirect(url_for("main.patient_appointments"))
 
     if appt["status"] != "Booked":
-        conn.close()
         flash("Only booked appointments can be cancelled.", "warning")
         return redirect(url_for("main.patient_appointments"))
 
     now = datetime.utcnow().isoformat()
-    cur.execute(
+    run_write(lambda cur: cur.execute(
         """
         UPDATE appointments
         SET status = 'Cancelled', updated_at = ?
         WHERE id = ?;
         """,
         (now, appointment_id),
-    )
-    conn.commit()
-    conn.close()
+    ))
 
     flash("Appointment cancelled.", "info")
     return redirect(url_for("main.patient_appointments"))
@@ -918,34 +1299,17 @@ def doctor_appointments():
         flash("Doctor profile not found.", "danger")
         return redirect(url_for("main.doctor_dashboard"))
 
-    conn = get_db_connection()
-    cur = conn.cursor()
-
-    cur.execute(
-        """
-        SELECT a.*, u.full_name AS patient_name, u.phone
-        FROM appointments a
-        JOIN patients p ON a.patient_id = p.id
-        JOIN users u ON p.user_id = u.id
-        WHERE a.doctor_id = ?
-        ORDER BY a.date DESC, a.time DESC;
-        """,
-        (doctor_id,),
+    upcoming, past, next_past_url, first_page_url = appointment_history(
+        "main.doctor_appointments", APPOINTMENT_QUERIES["doctor"], (doctor_id,)
     )
-    rows = cur.fetchall()
-    conn.close()
-
-    today_str = date_cls.today().isoformat()
-    upcoming = []
-    past = []
 
-    for r in rows:
-        if r["date"] >= today_str and r["status"] == "Booked":
-            upcoming.append(r)
-        else:
-            past.append(r)
-
-    return render_template("doctor_appointments.html", upcoming=upcoming, past=past)
+    return render_template(
+        "doctor_appointments.html",
+        upcoming=upcoming,
+        past=past,
+        next_past_url=next_past_url,
+        first_page_url=first_page_url,
+    )
 
 
 @main_bp.route("/doctor/appointments/<int:appointment_id>/status/<new_status>")
@@ -961,7 +1325,7 @@ def doctor_update_appointment_status(appointment_id, new_status):
         flash("Invalid status.", "danger")
         return redirect(url_for("main.doctor_appointments"))
 
-    conn = get_db_connection()
+    conn = get_db()
     cur = conn.cursor()
 
     cur.execute(
@@ -971,26 +1335,22 @@ def doctor_update_appointment_status(appointment_id, new_status):
     appt = cur.fetchone()
 
     if not appt:
-        conn.close()
         flash("Appointment not found.", "danger")
         return redirect(url_for("main.doctor_appointments"))
 
     if appt["status"] != "Booked":
-        conn.close()
         flash("Only booked appointments can be updated.", "warning")
         return redirect(url_for("main.doctor_appointments"))
 
     now = datetime.utcnow().isoformat()
-    cur.execute(
+    run_write(lambda cur: cur.execute(
         """
         UPDATE appointments
         SET status = ?, updated_at = ?
         WHERE id = ?;
         """,
         (new_status, now, appointment_id),
-    )
-    conn.commit()
-    conn.close()
+    ))
 
     flash(f"Appointment marked as {new_status}.", "success")
     return redirect(url_for("main.doctor_appointments"))
@@ -1008,7 +1368,7 @@ def doctor_availability():
     today = date_cls.today()
     max_day = today + timedelta(days=7)
 
-    conn = get_db_connection()
+    conn = get_db()
     cur = conn.cursor()
 
     if request.method == "POST":
@@ -1031,32 +1391,69 @@ def doctor_availability():
             elif start_time >= end_time:
                 flash("Start time must be before end time.", "warning")
             else:
-                cur.execute(
-                    """
-                    INSERT INTO doctor_availability (doctor_id, date, start_time, end_time, max_appointments, is_available)
-                    VALUES (?, ?, ?, ?, ?, 1);
-                    """,
-                    (doctor_id, date_str, start_time, end_time, 10),
-                )
-                conn.commit()
+                slot_minutes = current_app.config.get("SLOT_MINUTES", 15)
+
+                def add_window(cur):
+                    cur.execute(
+                        """
+                        INSERT INTO doctor_availability (doctor_id, date, start_time, end_time, max_appointments, is_available)
+                        VALUES (?, ?, ?, ?, ?, 1);
+                        """,
+                        (doctor_id, date_str, start_time, end_time, 10),
+                    )
+                    # Expand the window into bookable slots in the same transaction
+                    expand_window(cur, cur.lastrowid, slot_minutes)
+
+                run_write(add_window)
+                invalidate_week_availability(doctor_id)
                 flash("Availability added.", "success")
 
     # fetch availability for this doctor for next 7 days
-    cur.execute(
-        """
-        SELECT * FROM doctor_availability
-        WHERE doctor_id = ?
-          AND date >= ?
-          AND date <= ?
-          AND is_available = 1
-        ORDER BY date, start_time;
-        """,
-        (doctor_id, today.isoformat(), max_day.isoformat()),
-    )
+    cur.execute(DOCTOR_WINDOWS_QUERY, (doctor_id, today.isoformat(), max_day.isoformat()))
     slots = cur.fetchall()
-    conn.close()
 
-    return render_template("doctor_availability.html", slots=slots, today=today, max_day=max_day)
+    return render_template(
+        "doctor_availability.html",
+        slots=slots,
+        today=today,
+        max_day=max_day,
+        weekdays=WEEKDAYS,
+        max_weeks=current_app.config.get("MAX_SCHEDULE_WEEKS", 26),
+    )
+
+
+@main_bp.route("/doctor/availability/recurring", methods=["POST"])
+@login_required
+@role_required("doctor")
+def doctor_recurring_availability():
+    doctor_id = get_current_doctor_id()
+    if not doctor_id:
+        flash("Doctor profile not found.", "danger")
+        return redirect(url_for("main.doctor_dashboard"))
+
+    try:
+        weeks = int(request.form.get("weeks", ""))
+    except ValueError:
+        weeks = None
+
+    try:
+        created = run_write(lambda cur: create_recurring_windows(
+            cur,
+            doctor_id,
+            request.form.get("start_date", ""),
+            request.form.getlist("weekdays"),
+            request.form.get("start_time", ""),
+            request.form.get("end_time", ""),
+            weeks,
+            slot_minutes=current_app.config.get("SLOT_MINUTES", 15),
+            max_weeks=current_app.config.get("MAX_SCHEDULE_WEEKS", 26),
+        ))
+        invalidate_week_availability(doctor_id)
+        flash(f"Recurring schedule added ({created} sessions).", "success")
+    except ScheduleError as e:
+        flash(str(e), "warning")
+
+    return redirect(url_for("main.doctor_availability"))
 
 
 @main_bp.route("/doctor/availability/<int:slot_id>/delete")
@@ -1068,7 +1465,7 @@ def doctor_delete_availability(slot_id):
         flash("Doctor profile not found.", "danger")
         return redirect(url_for("main.doctor_dashboard"))
 
-    conn = get_db_connection()
+    conn = get_db()
     cur = conn.cursor()
 
     cur.execute(
@@ -1078,13 +1475,11 @@ def doctor_delete_availability(slot_id):
     slot = cur.fetchone()
 
     if not slot or slot["doctor_id"] != doctor_id:
-        conn.close()
         flash("Availability slot not found.", "danger")
         return redirect(url_for("main.doctor_availability"))
 
-    cur.execute("DELETE FROM doctor_availability WHERE id = ?;", (slot_id,))
-    conn.commit()
-    conn.close()
+    run_write(lambda cur: cur.execute("DELETE FROM doctor_availability WHERE id = ?;", (slot_id,)))
+    invalidate_week_availability(doctor_id)
 
     flash("Availability slot removed.", "info")
     return redirect(url_for("main.doctor_availability"))
@@ -1100,7 +1495,7 @@ def doctor_treatment(appointment_id):
         flash("Doctor profile not found.", "danger")
         return redirect(url_for("main.doctor_dashboard"))
 
-    conn = get_db_connection()
+    conn = get_db()
     cur = conn.cursor()
 
     # Fetch appointment + existing treatment (if any)
@@ -1122,7 +1517,6 @@ def doctor_treatment(appointment_id):
     appt = cur.fetchone()
 
     if not appt:
-        conn.close()
         flash("Appointment not found.", "danger")
         return redirect(url_for("main.doctor_appointments"))
 
@@ -1132,50 +1526,46 @@ def doctor_treatment(appointment_id):
         notes = request.form.get("notes")
         now = datetime.utcnow().isoformat()
 
-        # If still Booked, mark as Completed when treatment is saved
-        if appt["status"] == "Booked":
-            cur.execute(
-                """
-                UPDATE appointments
-                SET status = 'Completed', updated_at = ?
-                WHERE id = ?;
-                """,
-                (now, appointment_id),
-            )
+        def save_treatment(cur):
+            # If still Booked, mark as Completed when treatment is saved
+            if appt["status"] == "Booked":
+                cur.execute(
+                    """
+                    UPDATE appointments
+                    SET status = 'Completed', updated_at = ?
+                    WHERE id = ?;
+                    """,
+                    (now, appointment_id),
+                )
 
-        # Check if treatment already exists
-        cur.execute(
-            "SELECT id FROM treatments WHERE appointment_id = ?;",
-            (appointment_id,),
-        )
-        existing = cur.fetchone()
+            # Check if treatment already exists
+            cur.execute(TREATMENT_ID_QUERY, (appointment_id,))
+            existing = cur.fetchone()
 
-        if existing:
-            cur.execute(
-                """
-                UPDATE treatments
-                SET diagnosis = ?, prescription = ?, notes = ?, created_at = ?
-                WHERE appointment_id = ?;
-                """,
-                (diagnosis, prescription, notes, now, appointment_id),
-            )
-        else:
-            cur.execute(
-                """
-                INSERT INTO treatments (appointment_id, diagnosis, prescription, notes, created_at)
-                VALUES (?, ?, ?, ?, ?);
-                """,
-                (appointment_id, diagnosis, prescription, notes, now),
-            )
+            if existing:
+                cur.execute(
+                    """
+                    UPDATE treatments
+                    SET diagnosis = ?, prescription = ?, notes = ?, created_at = ?
+                    WHERE appointment_id = ?;
+                    """,
+                    (diagnosis, prescription, notes, now, appointment_id),
+                )
+            else:
+                cur.execute(
+                    """
+                    INSERT INTO treatments (appointment_id, diagnosis, prescription, notes, created_at)
+                    VALUES (?, ?, ?, ?, ?);
+                    """,
+                    (appointment_id, diagnosis, prescription, notes, now),
+                )
 
-        conn.commit()
-        conn.close()
+        run_write(save_treatment)
 
         flash("Treatment details saved.", "success")
         return redirect(url_for("main.doctor_appointments"))
 
     # GET: show form with existing data (if any)
-    conn.close()
     return render_template("doctor_treatment_form.html", appt=appt)
 
 
@@ -1189,7 +1579,7 @@ def patient_appointment_details(appointment_id):
         flash("Patient profile not found.", "danger")
         return redirect(url_for("main.patient_dashboard"))
 
-    conn = get_db_connection()
+    conn = get_db()
     cur = conn.cursor()
 
     cur.execute(
@@ -1210,7 +1600,6 @@ def patient_appointment_details(appointment_id):
         (appointment_id, patient_id),
     )
     appt = cur.fetchone()
-    conn.close()
 
     if not appt:
         flash("Appointment not found.", "danger")
@@ -1,9 +1,27 @@
 # init_db.py
+import sys
+
+from app import config_from_env
 from models.models import create_tables, seed_admin_and_defaults
+from models.migrations import check_query_plans, migrate
 
 if __name__ == "__main__":
+    if "--check-plans" in sys.argv:
+        # Fail loudly if any hot route query has regressed to a full table SCAN.
+        # Plans are checked against the current schema, as the app would run it.
+        create_tables()
+        migrate(config=config_from_env())
+        regressions = check_query_plans()
+        for name, scans in regressions.items():
+            print(f"{name}: {', '.join(scans)}")
+        print("Query plans OK." if not regressions else "Query plan regressions found.")
+        sys.exit(1 if regressions else 0)
+
     print("Creating tables...")
     create_tables()
+    print("Applying migrations...")
+    applied = migrate(config=config_from_env())  # HMS_SLOT_MINUTES sizes the slot grid
+    print(f"Applied: {applied}" if applied else "Schema already up to date.")
     print("Seeding admin and default data...")
     seed_admin_and_defaults()
     print("Done. Database initialized.")
@@ -0,0 +1,67 @@
+# models/async_db.py
+"""
+Non-blocking database access for the async (ASGI) serving mode.
+
+sqlite3 calls block, so they run on a dedicated thread executor: each
+executor thread opens its own connection on first use and keeps it for
+the life of the executor. Coroutines await the result without tying up
+the event loop. Functions written for the sync code path take a
+connection as their first argument (read_stats, free_slots,
+fetch_appointments_page(conn=...)), and run unchanged:
+
+    stats = await db.run(read_stats)
+    slots = await db.run(free_slots, doctor_id, date_from, date_to)
+
+Only reads run here; requests that write are served by the Flask app.
+"""
+import asyncio
+import functools
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncDatabase:
+    def __init__(self, db_path, workers=4, pragmas=None):
+        self.db_path = db_path
+        self.pragmas = dict(pragmas or {})
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._readers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-read")
+
+    def _conn(self):
+        """This executor thread's connection, opened on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            for name, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {name} = {value};")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, fn, args, kwargs):
+        conn = self._conn()
+        try:
+            return fn(conn, *args, **kwargs)
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+
+    async def run(self, fn, *args, **kwargs):
+        """await fn(conn, *args, **kwargs) on a reader thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, functools.partial(self._call, fn, args, kwargs))
+
+    async def fetchone(self, sql, params=()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchone())
+
+    def close(self):
+        self._readers.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
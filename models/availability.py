@@ -0,0 +1,146 @@
+# models/availability.py
+"""
+Slot-level availability.
+
+Each doctor_availability window is expanded into discrete bookable slots
+(one row per start time, SLOT_MINUTES apart) in `availability_slots`.
+A slot's appointment_id is its occupancy: triggers on appointments fill it
+in and clear it, and a partial index over the free slots lets one query
+return exactly what can still be booked.
+"""
+import json
+from datetime import datetime, timedelta
+
+DEFAULT_SLOT_MINUTES = 15
+
+SLOT_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS availability_slots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        availability_id INTEGER NOT NULL,
+        doctor_id INTEGER NOT NULL,
+        date TEXT NOT NULL,       -- YYYY-MM-DD
+        time TEXT NOT NULL,       -- HH:MM
+        appointment_id INTEGER,   -- NULL = free
+        FOREIGN KEY(availability_id) REFERENCES doctor_availability(id),
+        FOREIGN KEY(doctor_id) REFERENCES doctors(id),
+        FOREIGN KEY(appointment_id) REFERENCES appointments(id),
+        UNIQUE(availability_id, time)
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_slots_doctor_date ON availability_slots(doctor_id, date, time);",
+    """
+    CREATE INDEX IF NOT EXISTS idx_slots_free ON availability_slots(doctor_id, date, time)
+    WHERE appointment_id IS NULL;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_slots_window_delete AFTER DELETE ON doctor_availability
+    BEGIN
+        DELETE FROM availability_slots WHERE availability_id = OLD.id;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_slots_appointment_insert AFTER INSERT ON appointments
+    BEGIN
+        UPDATE availability_slots SET appointment_id = NEW.id
+        WHERE doctor_id = NEW.doctor_id AND date = NEW.date AND time = NEW.time;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_slots_appointment_delete AFTER DELETE ON appointments
+    BEGIN
+        UPDATE availability_slots SET appointment_id = NULL
+        WHERE appointment_id = OLD.id;
+    END;
+    """,
+]
+
+
+def slot_times(start_time, end_time, slot_minutes=DEFAULT_SLOT_MINUTES):
+    """Start times ("HH:MM") of every whole slot that fits in [start_time, end_time)."""
+    start = datetime.strptime(start_time[:5], "%H:%M")
+    end = datetime.strptime(end_time[:5], "%H:%M")
+    step = timedelta(minutes=slot_minutes)
+    times = []
+    while start + step <= end:
+        times.append(start.strftime("%H:%M"))
+        start += step
+    return times
+
+
+def expand_window(cur, availability_id, slot_minutes=DEFAULT_SLOT_MINUTES):
+    """Materialize the slots of one availability window, marking any already booked."""
+    return expand_windows(cur, [availability_id], slot_minutes)
+
+
+def expand_windows(cur, availability_ids, slot_minutes=DEFAULT_SLOT_MINUTES):
+    """Materialize the slots of several windows: one SELECT, one executemany."""
+    windows = cur.execute(
+        """
+        SELECT id, doctor_id, date, start_time, end_time FROM doctor_availability
+        WHERE id IN (SELECT value FROM json_each(?));
+        """,
+        (json.dumps(list(availability_ids)),),
+    ).fetchall()
+    rows = []
+    for availability_id, doctor_id, day, start_time, end_time in windows:
+        rows.extend(
+            (availability_id, doctor_id, day, t, doctor_id, day, t)
+            for t in slot_times(start_time, end_time, slot_minutes)
+        )
+
+    cur.executemany(
+        """
+        INSERT OR IGNORE INTO availability_slots (availability_id, doctor_id, date, time, appointment_id)
+        VALUES (?, ?, ?, ?, (SELECT id FROM appointments WHERE doctor_id = ? AND date = ? AND time = ?));
+        """,
+        rows,
+    )
+    return len(rows)
+
+
+def rebuild_slots(conn, slot_minutes=DEFAULT_SLOT_MINUTES):
+    """Re-expand every window (e.g. after changing SLOT_MINUTES). Caller commits."""
+    cur = conn.cursor()
+    cur.execute("DELETE FROM availability_slots;")
+    window_ids = [row[0] for row in cur.execute("SELECT id FROM doctor_availability;").fetchall()]
+    return expand_windows(cur, window_ids, slot_minutes)
+
+
+def create_slot_grid(conn, config):
+    """Migration step: slot table, occupancy triggers and a first expansion at SLOT_MINUTES."""
+    for sql in SLOT_SCHEMA:
+        conn.execute(sql)
+    rebuild_slots(conn, config.get("SLOT_MINUTES", DEFAULT_SLOT_MINUTES))
+
+
+FREE_SLOTS_QUERY = """
+    SELECT DISTINCT s.date, s.time
+    FROM availability_slots s
+    JOIN doctor_availability da ON da.id = s.availability_id
+    WHERE s.doctor_id = ?
+      AND s.date >= ?
+      AND s.date <= ?
+      AND s.appointment_id IS NULL
+      AND da.is_available = 1
+    ORDER BY s.date, s.time;
+"""
+
+FIND_SLOT_QUERY = """
+    SELECT s.id, s.availability_id, s.appointment_id
+    FROM availability_slots s
+    JOIN doctor_availability da ON da.id = s.availability_id
+    WHERE s.doctor_id = ? AND s.date = ? AND s.time = ? AND da.is_available = 1
+    ORDER BY s.appointment_id IS NOT NULL
+    LIMIT 1;
+"""
+
+
+def free_slots(conn, doctor_id, date_from, date_to):
+    """Distinct free (date, time) slots of a doctor's open windows, in order."""
+    return conn.execute(FREE_SLOTS_QUERY, (doctor_id, date_from, date_to)).fetchall()
+
+
+def find_slot(conn, doctor_id, date_str, time_str):
+    """The open-window slot at exactly date/time, free or not; None if there is none."""
+    return conn.execute(FIND_SLOT_QUERY, (doctor_id, date_str, time_str)).fetchone()
@@ -0,0 +1,118 @@
+# models/booking.py
+"""
+Booking service: slot check, window capacity check and insert, all in one
+write transaction (run it through models.pool.run_write, which uses
+BEGIN IMMEDIATE and retries on lock contention). Also the set-based bulk
+status update used to cancel or complete many appointments at once.
+"""
+import json
+import sqlite3
+from datetime import datetime
+
+from models.availability import find_slot
+
+
+# Capacity of an availability window and how many live bookings it has
+WINDOW_CAPACITY_QUERY = """
+    SELECT da.max_appointments,
+           (SELECT COUNT(*)
+            FROM availability_slots s
+            JOIN appointments a ON a.id = s.appointment_id
+            WHERE s.availability_id = da.id AND a.status != 'Cancelled') AS booked
+    FROM doctor_availability da
+    WHERE da.id = ?;
+"""
+
+
+class BookingError(Exception):
+    """A booking was refused; `reason` is "unavailable", "taken" or "full"."""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
+def book_appointment(cur, patient_id, doctor_id, date_str, time_str):
+    """
+    Book one slot and return the new appointment id.
+    Must run inside a write transaction so nothing can change between the
+    checks and the INSERT. Raises BookingError when the slot is not bookable.
+    """
+    slot = find_slot(cur, doctor_id, date_str, time_str)
+    if slot is None:
+        raise BookingError(
+            "unavailable",
+            "Doctor is not available at the selected date/time. Please choose within the available slots.",
+        )
+    if slot["appointment_id"]:
+        raise BookingError("taken", "This slot is already booked for the doctor. Please choose another time.")
+
+    # Per-window capacity (cancelled appointments don't count)
+    row = cur.execute(WINDOW_CAPACITY_QUERY, (slot["availability_id"],)).fetchone()
+    if row["max_appointments"] is not None and row["booked"] >= row["max_appointments"]:
+        raise BookingError("full", "This session is fully booked. Please choose another day or time.")
+
+    now = datetime.utcnow().isoformat()
+    try:
+        cur.execute(
+            """
+            INSERT INTO appointments (patient_id, doctor_id, date, time, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, 'Booked', ?, ?);
+            """,
+            (patient_id, doctor_id, date_str, time_str, now, now),
+        )
+    except sqlite3.IntegrityError:
+        raise BookingError("taken", "This slot is already booked for the doctor. Please choose another time.")
+    return cur.lastrowid
+
+
+# --------- Bulk status updates ---------
+BULK_STATUSES = ("Completed", "Cancelled")
+
+
+def bulk_set_status(cur, new_status, ids=None, doctor_id=None, date_from=None, date_to=None):
+    """
+    Move many Booked appointments to `new_status` with one set-based UPDATE.
+
+    Either pass `ids`, or `doctor_id` with a `date_from`/`date_to` range (all
+    of that doctor's Booked appointments in it). When both `ids` and
+    `doctor_id` are given, ids belonging to other doctors count as not found.
+    Returns a list of {"id", "result"} with result "updated", "not_found" or
+    "not_booked". Run inside a write transaction (models.pool.run_write).
+    """
+    if new_status not in BULK_STATUSES:
+        raise ValueError("Invalid status.")
+
+    if ids is not None:
+        ids = list(dict.fromkeys(int(i) for i in ids))
+        where = "id IN (SELECT value FROM json_each(?))"
+        params = [json.dumps(ids)]
+        if doctor_id is not None:
+            where += " AND doctor_id = ?"
+            params.append(doctor_id)
+    elif doctor_id is not None and date_from and date_to:
+        where = "doctor_id = ? AND date >= ? AND date <= ? AND status = 'Booked'"
+        params = [doctor_id, date_from, date_to]
+    else:
+        raise ValueError("Give appointment ids, or a doctor and a date range.")
+
+    found = {
+        row[0]: row[1]
+        for row in cur.execute(f"SELECT id, status FROM appointments WHERE {where};", params).fetchall()
+    }
+    cur.execute(
+        f"UPDATE appointments SET status = ?, updated_at = ? WHERE {where} AND status = 'Booked';",
+        [new_status, datetime.utcnow().isoformat()] + params,
+    )
+
+    results = []
+    for appointment_id in (ids if ids is not None else sorted(found)):
+        status = found.get(appointment_id)
+        if status is None:
+            result = "not_found"
+        elif status != "Booked":
+            result = "not_booked"
+        else:
+            result = "updated"
+        results.append({"id": appointment_id, "result": result})
+    return results
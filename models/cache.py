@@ -0,0 +1,144 @@
+# models/cache.py
+"""
+Small read-through cache for rarely-changing listings (departments, the
+doctor directory). Entries expire after a TTL and are dropped explicitly by
+the write paths that change them.
+
+The storage is a pluggable CacheBackend; the default keeps entries in a
+per-process dict. To share one cache between several workers, pass a
+CacheBackend subclass implementing its four methods (e.g. backed by a local
+memcached/redis process) as app.config["CACHE_BACKEND"]. Cached values are
+plain dicts/lists so they can be pickled by such a backend.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from flask import current_app
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Interface every cache backend implements."""
+
+    @abstractmethod
+    def get(self, key, default=_MISSING):
+        """Return the stored value, or `default` if absent or expired."""
+
+    @abstractmethod
+    def set(self, key, value, ttl):
+        """Store `value`; ttl is in seconds, None (or 0) for no expiry."""
+
+    @abstractmethod
+    def delete(self, key):
+        """Remove `key` if present."""
+
+    @abstractmethod
+    def clear(self):
+        """Remove every entry."""
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Per-process dict of key -> (expires_at, value). Expired entries are
+    dropped when read, and by a sweep run from set() at most every
+    sweep_interval seconds, so keys that are never read again don't pile up.
+    """
+
+    def __init__(self, sweep_interval=60.0):
+        self._data = {}
+        self._lock = threading.Lock()
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl):
+        now = time.monotonic()
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            if now >= self._next_sweep:
+                self._next_sweep = now + self.sweep_interval
+                self._sweep(now)
+
+    def _sweep(self, now):
+        expired = [
+            key for key, (expires_at, _) in self._data.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for key in expired:
+            del self._data[key]
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class Cache:
+    def __init__(self, backend=None, default_ttl=300):
+        self.backend = backend or MemoryBackend()
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_set(self, key, loader, ttl=None):
+        """Return the cached value for `key`, calling loader() to fill it on a miss."""
+        value = self.backend.get(key, _MISSING)
+        if value is not _MISSING:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        value = loader()
+        self.backend.set(key, value, self.default_ttl if ttl is None else ttl)
+        return value
+
+    def invalidate(self, *keys):
+        for key in keys:
+            self.backend.delete(key)
+        with self._lock:
+            self.invalidations += len(keys)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+# --------- Flask glue ---------
+def get_cache():
+    return current_app.extensions["cache"]
+
+
+def init_app(app):
+    cache = Cache(
+        backend=app.config.get("CACHE_BACKEND"),
+        default_ttl=app.config.get("CACHE_DEFAULT_TTL", 300),
+    )
+    app.extensions["cache"] = cache
+    return cache
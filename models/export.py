@@ -0,0 +1,127 @@
+# models/export.py
+"""
+Streaming export of appointments joined with patient, doctor and treatment.
+
+Rows are read from one open cursor in fetchmany() batches and encoded one
+batch at a time, so memory use depends on EXPORT_BATCH_SIZE, not on the size
+of the export. Used by the admin export endpoint and `flask export-appointments`.
+
+The SELECT keeps a read snapshot open until the last batch. In WAL mode
+("concurrent" storage) writers carry on meanwhile. With the default rollback
+journal, commits wait for the export to finish.
+"""
+import csv
+import io
+import json
+
+EXPORT_COLUMNS = (
+    "appointment_id",
+    "date",
+    "time",
+    "status",
+    "patient_id",
+    "patient_name",
+    "patient_email",
+    "patient_phone",
+    "doctor_id",
+    "doctor_name",
+    "dept_name",
+    "diagnosis",
+    "prescription",
+    "notes",
+    "created_at",
+    "updated_at",
+)
+
+EXPORT_QUERY = """
+    SELECT a.id AS appointment_id,
+           a.date,
+           a.time,
+           a.status,
+           a.patient_id,
+           pu.full_name AS patient_name,
+           pu.email AS patient_email,
+           pu.phone AS patient_phone,
+           a.doctor_id,
+           du.full_name AS doctor_name,
+           dept.name AS dept_name,
+           t.diagnosis,
+           t.prescription,
+           t.notes,
+           a.created_at,
+           a.updated_at
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.id
+    JOIN users pu ON p.user_id = pu.id
+    JOIN doctors d ON a.doctor_id = d.id
+    JOIN users du ON d.user_id = du.id
+    LEFT JOIN departments dept ON d.department_id = dept.id
+    LEFT JOIN treatments t ON t.appointment_id = a.id
+    WHERE 1=1
+"""
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def iter_export_batches(conn, date_from=None, date_to=None, status=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield lists of row tuples (in EXPORT_COLUMNS order), oldest first."""
+    query = EXPORT_QUERY
+    params = []
+    if date_from:
+        query += " AND a.date >= ?"
+        params.append(date_from)
+    if date_to:
+        query += " AND a.date <= ?"
+        params.append(date_to)
+    if status:
+        query += " AND a.status = ?"
+        params.append(status)
+    query += " ORDER BY a.date, a.time, a.id;"
+
+    cur = conn.cursor()
+    cur.execute(query, params)
+    try:
+        while True:
+            batch = cur.fetchmany(batch_size)
+            if not batch:
+                break
+            yield [tuple(row) for row in batch]
+    finally:
+        cur.close()
+
+
+def encode_csv(batches):
+    """Header line, then one CSV chunk per batch."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buf.getvalue()
+    for batch in batches:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(batch)
+        yield buf.getvalue()
+
+
+def encode_ndjson(batches):
+    """One JSON object per line, one chunk per batch."""
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), separators=(",", ":"), ensure_ascii=False) + "\n"
+            for row in batch
+        )
+
+
+def export_appointments(conn, fmt, **filters):
+    """Generator of text chunks of the export in `fmt` ("csv" or "ndjson")."""
+    batches = iter_export_batches(conn, **filters)
+    if fmt == "csv":
+        return encode_csv(batches)
+    if fmt == "ndjson":
+        return encode_ndjson(batches)
+    raise ValueError(f"Unknown export format: {fmt}")
@@ -0,0 +1,103 @@
+# models/fragments.py
+"""
+Template-side caching.
+
+- Compiled templates are kept on disk (FileSystemBytecodeCache in
+  TEMPLATE_BYTECODE_CACHE_DIR), so a restarted worker loads bytecode
+  instead of re-compiling every template. Entries are keyed by the
+  template source checksum, so edited templates are recompiled.
+- A {% cache %} tag stores rendered HTML fragments in the app cache
+  (models.cache):
+
+      {% cache "week_availability", today, ttl=60 %}
+          ... expensive block ...
+      {% endcache %}
+
+  The first argument names the fragment, any further arguments are part
+  of its key, and ttl defaults to FRAGMENT_CACHE_TTL. Write paths drop every
+  cached variant of a fragment with invalidate_fragments("week_availability"),
+  which replaces the fragment's generation token (part of every key).
+
+Expressions inside the block are only evaluated on a miss, so a view can
+pass a callable (e.g. week_availability=lambda: ...) to skip its query when
+the fragment is cached.
+"""
+import os
+import uuid
+
+from flask import current_app, has_app_context
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from models.cache import get_cache
+
+
+def generation_key(name):
+    return f"fragment-generation:{name}"
+
+
+def fragment_generation(cache, name):
+    """
+    Token that is part of every key of fragment `name`. Invalidation deletes
+    it and the next render picks a fresh one, so old variants are never read
+    again; no index of keys is kept for renders to race on. They are dropped
+    once their TTL has passed by MemoryBackend's expiry sweep (a shared
+    backend evicts expired entries itself).
+    """
+    generation = cache.backend.get(generation_key(name), None)
+    if generation is None:
+        generation = uuid.uuid4().hex[:12]
+        cache.backend.set(generation_key(name), generation, None)
+    return generation
+
+
+def fragment_key(name, generation, vary):
+    return "fragment:" + "|".join(str(part) for part in (name, generation, *vary))
+
+
+def render_fragment(name, vary, ttl, render):
+    if not has_app_context():
+        return render()
+
+    cache = get_cache()
+    key = fragment_key(name, fragment_generation(cache, name), vary)
+    if ttl is None:
+        ttl = current_app.config.get("FRAGMENT_CACHE_TTL", 300)
+    return Markup(cache.get_or_set(key, lambda: str(render()), ttl=ttl))
+
+
+def invalidate_fragments(*names):
+    """Drop every cached variant of the named fragments."""
+    get_cache().invalidate(*(generation_key(name) for name in names))
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache name[, vary...][, ttl=seconds] %}...{% endcache %}"""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        ttl = nodes.Const(None)
+        while parser.stream.skip_if("comma"):
+            if parser.stream.current.test("name:ttl") and parser.stream.look().test("assign"):
+                parser.stream.skip(2)
+                ttl = parser.parse_expression()
+            else:
+                args.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        call = self.call_method("_render", [args[0], nodes.List(args[1:]), ttl])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, name, vary, ttl, caller):
+        return render_fragment(name, vary, ttl, caller)
+
+
+def init_app(app):
+    cache_dir = app.config.get("TEMPLATE_BYTECODE_CACHE_DIR")
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    app.jinja_env.add_extension(FragmentCacheExtension)
@@ -0,0 +1,216 @@
+# models/importer.py
+"""
+Bulk import of patients or doctors from CSV / JSONL (`flask import-people`).
+
+Records are handled in batches: validate against the usernames preloaded
+from the database (and those seen earlier in the file), hash the batch's
+passwords in a process pool (hashing is CPU-bound and dominates the cost),
+then insert users and profiles with executemany in one BEGIN IMMEDIATE
+transaction per batch.
+"""
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from models.models import get_db_connection
+from models.passwords import DEFAULT_METHOD, hash_with
+from models.pool import run_immediate
+
+REQUIRED_FIELDS = ("username", "password", "full_name")
+
+# role -> INSERT of the role's profile row (see profile_row)
+PROFILE_INSERTS = {
+    "patient": """
+        INSERT INTO patients (user_id, age, gender, address, emergency_contact, is_blacklisted)
+        VALUES (?, ?, ?, ?, ?, 0);
+    """,
+    "doctor": """
+        INSERT INTO doctors (user_id, department_id, bio, room_no, is_blacklisted)
+        VALUES (?, ?, ?, ?, 0);
+    """,
+}
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.skipped = []  # (line number, username, reason)
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.created / self.elapsed if self.elapsed else 0.0
+
+
+class InvalidRecord:
+    """A JSON-lines line that could not be read as a record; skipped with `reason`."""
+
+    def __init__(self, reason):
+        self.reason = reason
+
+
+def read_records(path):
+    """
+    Yield (line number, dict) from a .csv file or a JSON-lines file.
+    Malformed JSON lines come back as InvalidRecord, so one bad line is
+    reported instead of aborting the import.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for line_no, row in enumerate(csv.DictReader(f), start=2):
+                yield line_no, row
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, InvalidRecord(f"invalid JSON: {e}")
+
+
+def clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def profile_row(role, record, user_id, departments):
+    if role == "patient":
+        age = clean(record.get("age"))
+        return (
+            user_id,
+            int(age) if age else None,
+            clean(record.get("gender")),
+            clean(record.get("address")),
+            clean(record.get("emergency_contact")),
+        )
+    return (
+        user_id,
+        departments.get((clean(record.get("department")) or "").lower()),
+        clean(record.get("bio")),
+        clean(record.get("room_no")),
+    )
+
+
+def validate(role, record, usernames, departments):
+    """Reason the record can't be imported, or None."""
+    if isinstance(record, InvalidRecord):
+        return record.reason
+    if not isinstance(record, dict):
+        return "not a JSON object"
+    for field in REQUIRED_FIELDS:
+        if not clean(record.get(field)):
+            return f"missing {field}"
+    if clean(record["username"]) in usernames:
+        return "username already taken"
+    if role == "patient":
+        age = clean(record.get("age"))
+        if age and not age.isdigit():
+            return "age must be a number"
+    else:
+        department = clean(record.get("department"))
+        if department and department.lower() not in departments:
+            return f"unknown department {department!r}"
+    return None
+
+
+def hash_passwords(passwords, method, executor=None, workers=1):
+    if executor is None:
+        return [hash_with(p, method) for p in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(executor.map(hash_with, passwords, [method] * len(passwords), chunksize=chunksize))
+
+
+def insert_batch(conn, role, batch, hashes, departments):
+    """One transaction: users via executemany, then their profiles."""
+    now = datetime.utcnow().isoformat()
+
+    def write(cur):
+        cur.executemany(
+            """
+            INSERT INTO users (username, password_hash, full_name, email, phone, role, is_active, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, 1, ?);
+            """,
+            [
+                (
+                    clean(r["username"]),
+                    password_hash,
+                    clean(r["full_name"]),
+                    clean(r.get("email")),
+                    clean(r.get("phone")),
+                    role,
+                    now,
+                )
+                for (_, r), password_hash in zip(batch, hashes)
+            ],
+        )
+        user_ids = dict(
+            cur.execute(
+                "SELECT username, id FROM users WHERE username IN (SELECT value FROM json_each(?));",
+                (json.dumps([clean(r["username"]) for _, r in batch]),),
+            ).fetchall()
+        )
+        cur.executemany(
+            PROFILE_INSERTS[role],
+            [profile_row(role, r, user_ids[clean(r["username"])], departments) for _, r in batch],
+        )
+
+    run_immediate(conn, write)
+
+
+def import_people(
+    db_path, role, records, batch_size=1000, workers=None, dry_run=False, method=DEFAULT_METHOD
+):
+    """
+    Import (line number, record) pairs as `role` users. Returns an ImportReport.
+    workers: hashing processes (default: CPU count; 1 hashes in-process).
+    method: password hash method (the app's PASSWORD_HASH_METHOD).
+    """
+    if role not in PROFILE_INSERTS:
+        raise ValueError(f"Unknown role: {role}")
+
+    report = ImportReport()
+    started = time.perf_counter()
+    conn = get_db_connection(db_path)
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and not dry_run else None
+    try:
+        usernames = {row[0] for row in conn.execute("SELECT username FROM users;")}
+        departments = {
+            row["name"].lower(): row["id"] for row in conn.execute("SELECT id, name FROM departments;")
+        }
+
+        batch = []
+
+        def flush():
+            if batch and not dry_run:
+                hashes = hash_passwords([str(r["password"]) for _, r in batch], method, executor, workers)
+                insert_batch(conn, role, batch, hashes, departments)
+            report.created += len(batch)
+            batch.clear()
+
+        for line_no, record in records:
+            reason = validate(role, record, usernames, departments)
+            if reason:
+                username = clean(record.get("username")) if isinstance(record, dict) else None
+                report.skipped.append((line_no, username, reason))
+                continue
+            usernames.add(clean(record["username"]))
+            batch.append((line_no, record))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        conn.close()
+
+    report.elapsed = time.perf_counter() - started
+    return report
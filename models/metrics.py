@@ -0,0 +1,220 @@
+# models/metrics.py
+"""
+Request and SQL instrumentation, exposed in Prometheus text format at
+/admin/metrics.
+
+- A before/after_request hook times every request into a per-endpoint
+  latency histogram.
+- Pooled connections are opened with TracedConnection, whose cursors time
+  each execute()/executemany(). Statements are counted per request, and a
+  request that runs the same statement SQL_N_PLUS_ONE_THRESHOLD or more times
+  is flagged as a likely N+1 and logged.
+- With SQL_SLOW_QUERY_MS set (opt-in), statements slower than that are logged
+  to the "hms.sql" logger.
+
+Statement time covers execute() (preparing the statement and computing the
+first row), not later fetches.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import current_app, g, has_app_context, request
+
+logger = logging.getLogger("hms.sql")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+# --------- SQL tracing ---------
+def record_statement(sql, elapsed):
+    if not has_app_context():
+        return
+    stats = g.get("sql_stats")
+    if stats is not None:
+        stats["count"] += 1
+        stats["time"] += elapsed
+        stats["statements"][sql] += 1
+
+    threshold_ms = current_app.config.get("SQL_SLOW_QUERY_MS")
+    if threshold_ms is not None and elapsed * 1000 >= threshold_ms:
+        metrics = current_app.extensions.get("metrics")
+        if metrics is not None:
+            metrics.count_slow_query()
+        logger.warning("slow query %.1f ms: %s", elapsed * 1000, " ".join(sql.split()))
+
+
+class TracedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_statement(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            record_statement(sql, time.perf_counter() - started)
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose cursors report every statement."""
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# --------- Collection ---------
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self, n_plus_one_threshold=10):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self._lock = threading.Lock()
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))        # (endpoint, method)
+        self.requests = Counter()                                             # (endpoint, method, status)
+        self.queries = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))    # endpoint
+        self.sql_seconds = Counter()                                          # endpoint
+        self.n_plus_one = Counter()                                           # endpoint
+        self.slow_queries = 0
+
+    def count_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def observe_request(self, endpoint, method, status, elapsed, sql_stats=None):
+        """sql_stats=None: the request's statements were not traced (no SQL sample)."""
+        if sql_stats is None:
+            repeated_sql, repeats = None, 0
+        else:
+            repeated_sql, repeats = (sql_stats["statements"].most_common(1) or [(None, 0)])[0]
+        suspect = repeats >= self.n_plus_one_threshold
+        with self._lock:
+            self.latency[(endpoint, method)].observe(elapsed)
+            self.requests[(endpoint, method, status)] += 1
+            if sql_stats is not None:
+                self.queries[endpoint].observe(sql_stats["count"])
+                self.sql_seconds[endpoint] += sql_stats["time"]
+            if suspect:
+                self.n_plus_one[endpoint] += 1
+        if suspect:
+            logger.warning(
+                "possible N+1 in %s: %d queries, this one ran %d times: %s",
+                endpoint, sql_stats["count"], repeats, " ".join(repeated_sql.split()),
+            )
+
+    def render(self, gauges=None, counters=None):
+        """
+        Prometheus text exposition (format 0.0.4). `gauges` / `counters` map
+        name -> (help, value); counters get the conventional _total suffix.
+        """
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, labels, hist):
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f"{name}_bucket{format_labels({**labels, 'le': bound})} {count}")
+            lines.append(f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {hist.count}")
+            lines.append(f"{name}_sum{format_labels(labels)} {hist.sum:.6f}")
+            lines.append(f"{name}_count{format_labels(labels)} {hist.count}")
+
+        with self._lock:
+            header("hms_request_duration_seconds", "histogram", "Request latency by endpoint.")
+            for (endpoint, method), hist in sorted(self.latency.items()):
+                histogram("hms_request_duration_seconds", {"endpoint": endpoint, "method": method}, hist)
+
+            header("hms_requests_total", "counter", "Requests by endpoint and status code.")
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                labels = {"endpoint": endpoint, "method": method, "status": status}
+                lines.append(f"hms_requests_total{format_labels(labels)} {count}")
+
+            header("hms_sql_queries_per_request", "histogram", "SQL statements executed per request.")
+            for endpoint, hist in sorted(self.queries.items()):
+                histogram("hms_sql_queries_per_request", {"endpoint": endpoint}, hist)
+
+            header("hms_sql_seconds_total", "counter", "Time spent executing SQL, by endpoint.")
+            for endpoint, seconds in sorted(self.sql_seconds.items()):
+                lines.append(f"hms_sql_seconds_total{format_labels({'endpoint': endpoint})} {seconds:.6f}")
+
+            header("hms_n_plus_one_requests_total", "counter", "Requests that repeated one statement past the N+1 threshold.")
+            for endpoint, count in sorted(self.n_plus_one.items()):
+                lines.append(f"hms_n_plus_one_requests_total{format_labels({'endpoint': endpoint})} {count}")
+
+            header("hms_slow_queries_total", "counter", "Statements slower than SQL_SLOW_QUERY_MS.")
+            lines.append(f"hms_slow_queries_total {self.slow_queries}")
+
+        for name, (help_text, value) in sorted((gauges or {}).items()):
+            header(name, "gauge", help_text)
+            lines.append(f"{name} {value}")
+
+        for name, (help_text, value) in sorted((counters or {}).items()):
+            header(f"{name}_total", "counter", help_text)
+            lines.append(f"{name}_total {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+# --------- Flask glue ---------
+def get_metrics():
+    return current_app.extensions["metrics"]
+
+
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.sql_stats = {"count": 0, "time": 0.0, "statements": Counter()}
+
+
+def record_request(response):
+    started = g.get("request_started")
+    if started is not None:
+        get_metrics().observe_request(
+            request.endpoint or "unmatched",
+            request.method,
+            response.status_code,
+            time.perf_counter() - started,
+            g.sql_stats,
+        )
+    return response
+
+
+def init_app(app):
+    metrics = Metrics(n_plus_one_threshold=app.config.get("SQL_N_PLUS_ONE_THRESHOLD", 10))
+    app.extensions["metrics"] = metrics
+    app.before_request(start_request_timer)
+    app.after_request(record_request)
+    return metrics
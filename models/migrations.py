@@ -0,0 +1,480 @@
+# models/migrations.py
+"""
+Versioned schema migrations.
+The applied version lives in SQLite's `PRAGMA user_version`; each entry in
+MIGRATIONS runs once, in order, inside its own transaction. An entry's steps
+are either a list of SQL statements or a callable taking the connection and
+the app config (e.g. the slot grid is expanded at the configured SLOT_MINUTES).
+"""
+import re
+
+from models.models import DB_PATH, get_db_connection
+from models.availability import create_slot_grid
+from models.search import create_search_index
+
+# Changes to the rows the appointment listings join in (names, phones,
+# departments) bump directory_version, which goes into the API's ETags.
+DIRECTORY_VERSION_EVENTS = [
+    ("users_update", "UPDATE OF full_name, phone ON users"),
+    ("users_delete", "DELETE ON users"),
+    ("doctors_update", "UPDATE OF user_id, department_id ON doctors"),
+    ("doctors_delete", "DELETE ON doctors"),
+    ("patients_update", "UPDATE OF user_id ON patients"),
+    ("patients_delete", "DELETE ON patients"),
+    ("departments_update", "UPDATE OF name ON departments"),
+    ("departments_delete", "DELETE ON departments"),
+]
+
+MIGRATIONS = [
+    (
+        1,
+        "secondary indexes for appointment / availability hot queries",
+        [
+            # patient_appointments, patient_appointment_details
+            "CREATE INDEX IF NOT EXISTS idx_appointments_patient_date "
+            "ON appointments(patient_id, date, time);",
+            # doctor_dashboard counts + upcoming list
+            "CREATE INDEX IF NOT EXISTS idx_appointments_doctor_status_date "
+            "ON appointments(doctor_id, status, date, time);",
+            # admin_appointments status filter and global date ordering
+            "CREATE INDEX IF NOT EXISTS idx_appointments_status_date "
+            "ON appointments(status, date, time);",
+            "CREATE INDEX IF NOT EXISTS idx_appointments_date_time "
+            "ON appointments(date, time);",
+            # doctor_availability, patient_book_appointment
+            "CREATE INDEX IF NOT EXISTS idx_availability_doctor_date "
+            "ON doctor_availability(doctor_id, date, is_available, start_time);",
+            # patient_dashboard 7-day window across all doctors
+            "CREATE INDEX IF NOT EXISTS idx_availability_date "
+            "ON doctor_availability(is_available, date, start_time);",
+            # treatment joins
+            "CREATE INDEX IF NOT EXISTS idx_treatments_appointment "
+            "ON treatments(appointment_id);",
+            # get_current_doctor_id / get_current_patient_id
+            "CREATE INDEX IF NOT EXISTS idx_doctors_user ON doctors(user_id);",
+            "CREATE INDEX IF NOT EXISTS idx_patients_user ON patients(user_id);",
+            "ANALYZE;",
+        ],
+    ),
+    (
+        2,
+        "materialized hospital_stats counters maintained by triggers",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS hospital_stats (
+                id INTEGER PRIMARY KEY CHECK(id = 1),
+                total_doctors INTEGER NOT NULL DEFAULT 0,
+                total_patients INTEGER NOT NULL DEFAULT 0,
+                total_appointments INTEGER NOT NULL DEFAULT 0,
+                booked INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                cancelled INTEGER NOT NULL DEFAULT 0
+            );
+            """,
+            """
+            INSERT OR REPLACE INTO hospital_stats
+                (id, total_doctors, total_patients, total_appointments, booked, completed, cancelled)
+            SELECT 1,
+                   (SELECT COUNT(*) FROM doctors),
+                   (SELECT COUNT(*) FROM patients),
+                   (SELECT COUNT(*) FROM appointments),
+                   (SELECT COUNT(*) FROM appointments WHERE status = 'Booked'),
+                   (SELECT COUNT(*) FROM appointments WHERE status = 'Completed'),
+                   (SELECT COUNT(*) FROM appointments WHERE status = 'Cancelled');
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_stats_doctor_insert AFTER INSERT ON doctors
+            BEGIN
+                UPDATE hospital_stats SET total_doctors = total_doctors + 1 WHERE id = 1;
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_stats_doctor_delete AFTER DELETE ON doctors
+            BEGIN
+                UPDATE hospital_stats SET total_doctors = total_doctors - 1 WHERE id = 1;
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_stats_patient_insert AFTER INSERT ON patients
+            BEGIN
+                UPDATE hospital_stats SET total_patients = total_patients + 1 WHERE id = 1;
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_stats_patient_delete AFTER DELETE ON patients
+            BEGIN
+                UPDATE hospital_stats SET total_patients = total_patients - 1 WHERE id = 1;
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_stats_appointment_insert AFTER INSERT ON appointments
+            BEGIN
+                UPDATE hospital_stats
+                SET total_appointments = total_appointments + 1,
+                    booked = booked + (NEW.status = 'Booked'),
+                    completed = completed + (NEW.status = 'Completed'),
+                    cancelled = cancelled + (NEW.status = 'Cancelled')
+                WHERE id = 1;
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_stats_appointment_delete AFTER DELETE ON appointments
+            BEGIN
+                UPDATE hospital_stats
+                SET total_appointments = total_appointments - 1,
+                    booked = booked - (OLD.status = 'Booked'),
+                    completed = completed - (OLD.status = 'Completed'),
+                    cancelled = cancelled - (OLD.status = 'Cancelled')
+                WHERE id = 1;
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_stats_appointment_status AFTER UPDATE OF status ON appointments
+            WHEN OLD.status != NEW.status
+            BEGIN
+                UPDATE hospital_stats
+                SET booked = booked + (NEW.status = 'Booked') - (OLD.status = 'Booked'),
+                    completed = completed + (NEW.status = 'Completed') - (OLD.status = 'Completed'),
+                    cancelled = cancelled + (NEW.status = 'Cancelled') - (OLD.status = 'Cancelled')
+                WHERE id = 1;
+            END;
+            """,
+        ],
+    ),
+    (
+        3,
+        "per-doctor appointment counters maintained by triggers",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS doctor_stats (
+                doctor_id INTEGER PRIMARY KEY,
+                total INTEGER NOT NULL DEFAULT 0,
+                booked INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                cancelled INTEGER NOT NULL DEFAULT 0,
+                FOREIGN KEY(doctor_id) REFERENCES doctors(id)
+            );
+            """,
+            """
+            INSERT OR REPLACE INTO doctor_stats (doctor_id, total, booked, completed, cancelled)
+            SELECT d.id,
+                   COUNT(a.id),
+                   COALESCE(SUM(a.status = 'Booked'), 0),
+                   COALESCE(SUM(a.status = 'Completed'), 0),
+                   COALESCE(SUM(a.status = 'Cancelled'), 0)
+            FROM doctors d
+            LEFT JOIN appointments a ON a.doctor_id = d.id
+            GROUP BY d.id;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_doctor_stats_doctor_insert AFTER INSERT ON doctors
+            BEGIN
+                INSERT OR IGNORE INTO doctor_stats (doctor_id) VALUES (NEW.id);
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_doctor_stats_appointment_insert AFTER INSERT ON appointments
+            BEGIN
+                INSERT OR IGNORE INTO doctor_stats (doctor_id) VALUES (NEW.doctor_id);
+                UPDATE doctor_stats
+                SET total = total + 1,
+                    booked = booked + (NEW.status = 'Booked'),
+                    completed = completed + (NEW.status = 'Completed'),
+                    cancelled = cancelled + (NEW.status = 'Cancelled')
+                WHERE doctor_id = NEW.doctor_id;
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_doctor_stats_appointment_delete AFTER DELETE ON appointments
+            BEGIN
+                UPDATE doctor_stats
+                SET total = total - 1,
+                    booked = booked - (OLD.status = 'Booked'),
+                    completed = completed - (OLD.status = 'Completed'),
+                    cancelled = cancelled - (OLD.status = 'Cancelled')
+                WHERE doctor_id = OLD.doctor_id;
+            END;
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_doctor_stats_appointment_update
+            AFTER UPDATE OF status, doctor_id ON appointments
+            WHEN OLD.status != NEW.status OR OLD.doctor_id != NEW.doctor_id
+            BEGIN
+                UPDATE doctor_stats
+                SET total = total - 1,
+                    booked = booked - (OLD.status = 'Booked'),
+                    completed = completed - (OLD.status = 'Completed'),
+                    cancelled = cancelled - (OLD.status = 'Cancelled')
+                WHERE doctor_id = OLD.doctor_id;
+                INSERT OR IGNORE INTO doctor_stats (doctor_id) VALUES (NEW.doctor_id);
+                UPDATE doctor_stats
+                SET total = total + 1,
+                    booked = booked + (NEW.status = 'Booked'),
+                    completed = completed + (NEW.status = 'Completed'),
+                    cancelled = cancelled + (NEW.status = 'Cancelled')
+                WHERE doctor_id = NEW.doctor_id;
+            END;
+            """,
+        ],
+    ),
+    (4, "FTS5 people search index (skipped when FTS5 is unavailable)", create_search_index),
+    (5, "bookable slot grid with occupancy index", create_slot_grid),
+    (
+        6,
+        "directory_version row bumped by triggers when joined listing data changes",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS directory_version (
+                id INTEGER PRIMARY KEY CHECK(id = 1),
+                version INTEGER NOT NULL DEFAULT 0,
+                changed_at TEXT
+            );
+            """,
+            "INSERT OR IGNORE INTO directory_version (id, version) VALUES (1, 0);",
+        ]
+        + [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_directory_version_{name} AFTER {event}
+            BEGIN
+                UPDATE directory_version
+                SET version = version + 1, changed_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+                WHERE id = 1;
+            END;
+            """
+            for name, event in DIRECTORY_VERSION_EVENTS
+        ],
+    ),
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrate(db_path=DB_PATH, config=None):
+    """Apply pending migrations; returns the list of versions applied."""
+    config = config or {}
+    conn = get_db_connection(db_path)
+    applied = []
+    try:
+        current = schema_version(conn)
+        for version, _description, steps in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                # Another process may have applied it while we waited for the lock
+                current = schema_version(conn)
+                if version <= current:
+                    conn.rollback()
+                    continue
+                if callable(steps):
+                    steps(conn, config)
+                else:
+                    for sql in steps:
+                        conn.execute(sql)
+                # PRAGMA doesn't accept bound parameters
+                conn.execute(f"PRAGMA user_version = {int(version)};")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(version)
+    finally:
+        conn.close()
+    return applied
+
+
+# --------- Query plan regression check ---------
+# Tables small enough (one row per department / doctor, or a single row)
+# that scanning them, e.g. to drive a join, is fine.
+SMALL_TABLES = {"departments", "doctors", "hospital_stats", "doctor_stats"}
+
+# The statistics plans are checked against: a production-sized hospital
+# (200 doctors, 20k patients, two years of appointments, one window per
+# doctor and day), so the verdict doesn't depend on what the checked
+# database happens to hold. table -> (rows, {column: distinct values});
+# columns not listed count as PLAN_STATS_DEFAULT_DISTINCT distinct values.
+PLAN_STATS = {
+    "users": (20210, {"username": 20210, "email": 20210}),
+    "departments": (10, {"name": 10}),
+    "doctors": (200, {"user_id": 200, "department_id": 10}),
+    "patients": (20000, {"user_id": 20000}),
+    "appointments": (
+        1000000,
+        {"doctor_id": 200, "patient_id": 20000, "status": 3, "date": 730, "time": 40},
+    ),
+    "treatments": (700000, {"appointment_id": 700000}),
+    "doctor_availability": (
+        146000,
+        {"doctor_id": 200, "date": 730, "is_available": 1, "start_time": 3},
+    ),
+    "availability_slots": (
+        1850000,
+        {"availability_id": 146000, "doctor_id": 200, "date": 730, "time": 40},
+    ),
+    "doctor_stats": (200, {"doctor_id": 200}),
+    "hospital_stats": (1, {}),
+    "directory_version": (1, {}),
+}
+PLAN_STATS_DEFAULT_DISTINCT = 10
+
+
+def plan_stats_rows(conn):
+    """sqlite_stat1 rows (tbl, idx, stat) for PLAN_STATS and the indexes that exist."""
+    rows = []
+    indexed = set()
+    indexes = conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index';").fetchall()
+    for index, table in indexes:
+        if table not in PLAN_STATS:
+            continue
+        total, distinct = PLAN_STATS[table]
+        stat, groups = [total], 1
+        for info in conn.execute(f'PRAGMA index_info("{index}");'):
+            groups *= distinct.get(info["name"], PLAN_STATS_DEFAULT_DISTINCT)
+            stat.append(max(1, total // groups))
+        rows.append((table, index, " ".join(str(n) for n in stat)))
+        indexed.add(table)
+    for table, (total, _distinct) in PLAN_STATS.items():
+        if table not in indexed:
+            rows.append((table, None, str(total)))
+    return rows
+
+
+# The index each hot query must be served by under PLAN_STATS, so a lost
+# index is caught even when the planner falls back to another one.
+PLAN_INDEXES = {
+    "get_current_patient_id": "idx_patients_user",
+    "get_current_doctor_id": "idx_doctors_user",
+    "doctor_dashboard.stats": "idx_appointments_doctor_status_date",
+    "doctor_dashboard.upcoming": "idx_appointments_doctor_status_date",
+    "patient_dashboard.availability": "idx_availability_doctor_date",
+    "doctor_availability.windows": "idx_availability_doctor_date",
+    "patient_book_appointment.free_slots": "idx_slots_free",
+    "patient_book_appointment.find_slot": "idx_slots_doctor_date",
+    "treatment_lookup": "idx_treatments_appointment",
+    "patient_appointments.upcoming_page": "idx_appointments_patient_date",
+    "patient_appointments.past_page": "idx_appointments_patient_date",
+    "doctor_appointments.upcoming_page": "idx_appointments_doctor_status_date",
+    "admin_appointments.upcoming_page": "idx_appointments_status_date",
+    "admin_appointments.past_page": "idx_appointments_date_time",
+    "admin_appointments.by_status.upcoming_page": "idx_appointments_status_date",
+    "admin_appointments.by_status.past_page": "idx_appointments_status_date",
+}
+
+
+def hot_queries():
+    """
+    name -> (sql, params) for the hot path of each route, built from the
+    query constants the code runs, so the check can't drift from them.
+    Parameters are placeholders; only the plan matters.
+    """
+    # Imported here: the app imports this module while it is being set up.
+    from controllers.routes import (
+        APPOINTMENT_QUERIES,
+        DOCTOR_UPCOMING_QUERY,
+        DOCTOR_WINDOWS_QUERY,
+        PROFILE_QUERIES,
+        TREATMENT_ID_QUERY,
+        appointments_page_query,
+    )
+    from models.availability import FIND_SLOT_QUERY, FREE_SLOTS_QUERY
+    from models.booking import WINDOW_CAPACITY_QUERY
+    from models.snapshot import WEEK_AVAILABILITY_QUERY
+    from models.stats import DOCTOR_STATS_QUERY
+
+    day, week = "2000-01-01", "2000-01-08"
+    cursor = (week, "09:00", 1)
+    queries = {
+        "get_current_patient_id": (PROFILE_QUERIES["patient"], (1,)),
+        "get_current_doctor_id": (PROFILE_QUERIES["doctor"], (1,)),
+        "doctor_dashboard.stats": (DOCTOR_STATS_QUERY, (1, day, 1)),
+        "doctor_dashboard.upcoming": (DOCTOR_UPCOMING_QUERY, (1, day)),
+        "patient_dashboard.availability": (WEEK_AVAILABILITY_QUERY + ";", (day, week)),
+        "doctor_availability.windows": (DOCTOR_WINDOWS_QUERY, (1, day, week)),
+        "patient_book_appointment.free_slots": (FREE_SLOTS_QUERY, (1, day, week)),
+        "patient_book_appointment.find_slot": (FIND_SLOT_QUERY, (1, day, "09:00")),
+        "patient_book_appointment.capacity": (WINDOW_CAPACITY_QUERY, (1,)),
+        "treatment_lookup": (TREATMENT_ID_QUERY, (1,)),
+    }
+    pages = {
+        "patient_appointments": (APPOINTMENT_QUERIES["patient"], [1], "", 20),
+        "doctor_appointments": (APPOINTMENT_QUERIES["doctor"], [1], "", 20),
+        "admin_appointments": (APPOINTMENT_QUERIES["admin"], [], "", 50),
+        "admin_appointments.by_status": (APPOINTMENT_QUERIES["admin"], ["Booked"], " AND a.status = ?", 50),
+    }
+    for name, (query, params, filters, limit) in pages.items():
+        for section in ("upcoming", "past"):
+            queries[f"{name}.{section}_page"] = appointments_page_query(
+                query + filters, params, section, day, cursor, limit
+            )
+    return queries
+
+
+TABLE_REF = re.compile(
+    r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!(?:ON|WHERE|LEFT|INNER|JOIN|ORDER|GROUP|LIMIT)\b)(\w+))?",
+    re.IGNORECASE,
+)
+
+
+def query_tables(sql):
+    """alias (or bare table name) -> table for the tables a query reads."""
+    tables = {}
+    for table, alias in TABLE_REF.findall(sql):
+        tables[alias or table] = table
+    return tables
+
+
+def full_scans(plan_rows, index_tables, tables):
+    """
+    Plan steps that walk a whole table or index, other than SMALL_TABLES.
+    `index_tables` maps index name -> table, `tables` alias -> table.
+    """
+    scans = []
+    for detail in plan_rows:
+        if not detail.startswith("SCAN ") or detail == "SCAN CONSTANT ROW":
+            continue
+        if detail.startswith("SCAN (subquery-"):
+            continue  # a subquery's result; its own steps are checked separately
+        name = detail.split(" ", 2)[1]
+        table = tables.get(name, name)
+        marker = " USING COVERING INDEX "
+        if marker in detail:
+            table = index_tables.get(detail.split(marker, 1)[1].split(" ", 1)[0], table)
+        if table not in SMALL_TABLES:
+            scans.append(detail)
+    return scans
+
+
+def check_query_plans(db_path=DB_PATH):
+    """
+    Run EXPLAIN QUERY PLAN over hot_queries().
+    Returns {name: [offending plan steps]} for queries that fell back to a
+    SCAN or don't use their PLAN_INDEXES index.
+
+    Plans are taken with the ANALYZE statistics replaced by PLAN_STATS
+    (inside a transaction that is rolled back), so a healthy schema passes
+    whatever data it holds, and the plans are the ones production sees.
+    """
+    conn = get_db_connection(db_path)
+    conn.isolation_level = None
+    regressions = {}
+    try:
+        index_tables = dict(conn.execute("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index';"))
+        conn.execute("BEGIN;")
+        conn.execute("ANALYZE sqlite_schema;")  # creates sqlite_stat1 if missing
+        conn.execute("DELETE FROM sqlite_stat1;")
+        conn.executemany("INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES (?, ?, ?);", plan_stats_rows(conn))
+        conn.execute("ANALYZE sqlite_schema;")  # load the fixture statistics
+        for name, (sql, params) in hot_queries().items():
+            plan = [row["detail"] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            problems = full_scans(plan, index_tables, query_tables(sql))
+            index = PLAN_INDEXES.get(name)
+            if index and not any(f" INDEX {index} " in detail for detail in plan):
+                problems.append(f"{index} not used: " + "; ".join(plan))
+            if problems:
+                regressions[name] = problems
+        conn.execute("ROLLBACK;")
+    finally:
+        conn.close()
+    return regressions
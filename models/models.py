@@ -11,14 +11,14 @@ os.makedirs(INSTANCE_DIR, exist_ok=True)
 DB_PATH = os.path.join(INSTANCE_DIR, "hospital.db")
 
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
+def get_db_connection(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
     return conn
 
 
-def create_tables():
-    conn = get_db_connection()
+def create_tables(db_path=DB_PATH):
+    conn = get_db_connection(db_path)
     cur = conn.cursor()
 
     # Users table
@@ -122,12 +122,12 @@ def create_tables():
     conn.close()
 
 
-def seed_admin_and_defaults():
+def seed_admin_and_defaults(db_path=DB_PATH):
     """
     Create default admin + some departments if they don't already exist.
     Admin must be pre-existing and programmatically created.
     """
-    conn = get_db_connection()
+    conn = get_db_connection(db_path)
     cur = conn.cursor()
 
     # Check if an admin already exists
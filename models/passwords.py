@@ -0,0 +1,129 @@
+# models/passwords.py
+"""
+Password hashing with a configurable method/cost, and a bounded pool for
+verifying passwords at login.
+
+PASSWORD_HASH_METHOD takes werkzeug method strings, e.g. "scrypt" or
+"scrypt:16384:8:1" or "pbkdf2:sha256:600000". Hashes stored under any
+other method are re-hashed on the next successful login (see needs_rehash).
+
+Verification runs on a small thread pool (hashlib's scrypt/pbkdf2 release
+the GIL), so at most PASSWORD_VERIFY_WORKERS hashes burn CPU at once no
+matter how many requests are logging in. At most PASSWORD_VERIFY_QUEUE
+verifications may be in flight; beyond that VerifierBusy is raised and
+login answers 503 instead of piling up work.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "scrypt"
+
+
+class VerifierBusy(Exception):
+    """Too many password checks are already queued."""
+
+
+def normalized_method(method):
+    """The method prefix werkzeug actually stores for `method` (fills in default costs)."""
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+
+def stored_method(pwhash):
+    return pwhash.split("$", 1)[0]
+
+
+def hash_with(password, method=DEFAULT_METHOD):
+    """Module-level so it can be sent to a process pool (bulk import)."""
+    return generate_password_hash(password, method=method)
+
+
+class PasswordHasher:
+    def __init__(self, method=DEFAULT_METHOD, workers=2, max_pending=32, timeout=10.0):
+        self.method = method
+        self.stored_method = normalized_method(method)
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.verified = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def hash(self, password):
+        return hash_with(password, self.method)
+
+    def needs_rehash(self, pwhash):
+        return stored_method(pwhash) != self.stored_method
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise VerifierBusy("Too many logins in progress, please try again.")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is freed when the hash is done, not when we stop waiting,
+        # so work abandoned on timeout still counts against max_pending.
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()  # drops it if it hasn't started yet
+            with self._lock:
+                self.rejected += 1
+            raise VerifierBusy("Login is taking too long, please try again.")
+
+    def verify(self, pwhash, password):
+        """check_password_hash on the pool. Raises VerifierBusy when the queue is full."""
+        ok = self._run(check_password_hash, pwhash, password)
+        with self._lock:
+            self.verified += 1
+        return ok
+
+    def rehash(self, password):
+        """New hash under the configured method, computed on the pool."""
+        pwhash = self._run(self.hash, password)
+        with self._lock:
+            self.rehashed += 1
+        return pwhash
+
+    def stats(self):
+        with self._lock:
+            return {
+                "method": self.stored_method,
+                "verified": self.verified,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+# --------- Flask glue ---------
+def get_hasher():
+    return current_app.extensions["password_hasher"]
+
+
+def hash_password(password):
+    """Hash with the app's configured method (registration, admin forms)."""
+    return get_hasher().hash(password)
+
+
+def init_app(app):
+    hasher = PasswordHasher(
+        method=app.config.get("PASSWORD_HASH_METHOD", DEFAULT_METHOD),
+        workers=app.config.get("PASSWORD_VERIFY_WORKERS", 2),
+        max_pending=app.config.get("PASSWORD_VERIFY_QUEUE", 32),
+        timeout=app.config.get("PASSWORD_VERIFY_TIMEOUT", 10.0),
+    )
+    app.extensions["password_hasher"] = hasher
+    return hasher
@@ -0,0 +1,280 @@
+# models/pool.py
+import queue
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g
+
+
+# "concurrent" storage mode: WAL lets readers carry on while one writer commits
+CONCURRENT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -20000,     # ~20 MB page cache per connection
+    "mmap_size": 268435456,   # 256 MB
+}
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the timeout."""
+
+
+def is_busy_error(exc):
+    msg = str(exc).lower()
+    return "database is locked" in msg or "database is busy" in msg
+
+
+class ConnectionPool:
+    """
+    Bounded pool of sqlite3 connections.
+    Connections are created lazily (a "miss"), reused when idle (a "hit"),
+    and callers block up to `timeout` seconds once `size` connections are out.
+    Pragmas are applied once, when a connection is first opened.
+    `factory` is the sqlite3.Connection class to open (e.g. a traced one).
+    """
+
+    def __init__(self, db_path, size=5, timeout=10.0, pragmas=None, factory=sqlite3.Connection):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.pragmas = dict(pragmas or {})
+        self.factory = factory
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=self.factory)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value};")
+        return conn
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self.hits += 1
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+                self.misses += 1
+
+        if can_create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        # Pool exhausted: wait for another request to hand one back
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"No database connection free after {self.timeout}s")
+        finally:
+            with self._lock:
+                self.waits += 1
+                self.wait_time += time.perf_counter() - start
+
+        with self._lock:
+            self.hits += 1
+        return conn
+
+    def release(self, conn):
+        # Never hand a half-finished transaction to the next request
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def discard(self, conn):
+        conn.close()
+        with self._lock:
+            self._created -= 1
+
+    def prefill(self, count=None):
+        """Open up to `count` (default: all `size`) connections ahead of demand."""
+        target = self.size if count is None else min(count, self.size)
+        opened = 0
+        while True:
+            with self._lock:
+                if self._created >= target:
+                    break
+                self._created += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            self._idle.put(conn)
+            opened += 1
+        return opened
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._created,
+                "idle": self._idle.qsize(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "wait_time": round(self.wait_time, 6),
+            }
+
+
+def run_immediate(conn, fn, retries=5, backoff=0.02):
+    """
+    Run fn(cursor) inside BEGIN IMMEDIATE and commit.
+    Taking the write lock up front makes read-check-write sequences atomic;
+    SQLITE_BUSY is retried with exponential backoff up to `retries` times.
+    Returns (result, retries_used). Any error rolls back and re-raises.
+    """
+    attempt = 0
+    while True:
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            result = fn(conn.cursor())
+            conn.commit()
+            return result, attempt
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if not is_busy_error(e) or attempt >= retries:
+                raise
+            time.sleep(backoff * (2 ** attempt))
+            attempt += 1
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+
+class Writer:
+    """
+    Single serialized write path.
+    Every write runs on one dedicated connection, under a lock, inside
+    BEGIN IMMEDIATE, and is retried with backoff on SQLITE_BUSY.
+    """
+
+    def __init__(self, conn, retries=5, backoff=0.02):
+        self.conn = conn
+        self.retries = retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+
+        self.writes = 0
+        self.retried = 0
+
+    def run(self, fn):
+        with self._lock:
+            result, retried = run_immediate(self.conn, fn, self.retries, self.backoff)
+            self.writes += 1
+            self.retried += retried
+            return result
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+# --------- Flask glue ---------
+def get_pool():
+    return current_app.extensions["db_pool"]
+
+
+def get_db():
+    """
+    Connection for the current request.
+    The first call checks one out of the pool; later calls (views, helpers)
+    reuse it, and it goes back to the pool on app-context teardown.
+    """
+    if "db" not in g:
+        g.db = get_pool().acquire()
+    return g.db
+
+
+def run_write(fn):
+    """
+    Run fn(cursor) as one BEGIN IMMEDIATE write transaction and return its result.
+    In "concurrent" mode this goes through the app's serialized Writer;
+    otherwise it runs on the request connection. Busy errors are retried;
+    anything else rolls the transaction back and is re-raised.
+    """
+    writer = current_app.extensions.get("db_writer")
+    if writer is not None:
+        return writer.run(fn)
+
+    result, _ = run_immediate(
+        get_db(),
+        fn,
+        retries=current_app.config.get("DB_WRITE_RETRIES", 5),
+        backoff=current_app.config.get("DB_WRITE_BACKOFF", 0.02),
+    )
+    return result
+
+
+def close_db(exc=None):
+    conn = g.pop("db", None)
+    if conn is None:
+        return
+    pool = get_pool()
+    try:
+        pool.release(conn)
+    except sqlite3.Error:
+        pool.discard(conn)
+
+
+def init_app(app):
+    pragmas = dict(app.config.get("DB_PRAGMAS") or {})
+    concurrent = app.config.get("DB_STORAGE_MODE") == "concurrent"
+    if concurrent:
+        pragmas = {**CONCURRENT_PRAGMAS, **pragmas}
+
+    factory = sqlite3.Connection
+    if app.config.get("METRICS_ENABLED"):
+        from models.metrics import TracedConnection
+        factory = TracedConnection
+
+    pool = ConnectionPool(
+        app.config["DATABASE"],
+        size=app.config.get("DB_POOL_SIZE", 5),
+        timeout=app.config.get("DB_POOL_TIMEOUT", 10.0),
+        pragmas=pragmas,
+        factory=factory,
+    )
+    app.extensions["db_pool"] = pool
+
+    if concurrent:
+        app.extensions["db_writer"] = Writer(
+            pool._connect(),
+            retries=app.config.get("DB_WRITE_RETRIES", 5),
+            backoff=app.config.get("DB_WRITE_BACKOFF", 0.02),
+        )
+
+    app.teardown_appcontext(close_db)
+    return pool
@@ -0,0 +1,119 @@
+# models/rows.py
+"""
+Row representations for large result sets, selectable per query.
+
+- Record: sqlite3.Row wraps every row's value tuple in a second object; a
+  Record *is* the tuple (a tuple subclass with empty __slots__), with the
+  column names stored once on a per-column-set class. Much smaller than a
+  dict per row, so use it for rows that are kept around (in-memory caches,
+  snapshots). Lookups by name run in Python, a few times slower than
+  sqlite3.Row's, so rows that are only read once are better left as Rows.
+
+      row[0], row["full_name"], row.full_name, row.keys(), dict(row)
+
+  Columns named like a Record/tuple attribute (count, index, keys, ...)
+  would be shadowed for row.name -- and for Jinja's row.name -- so
+  record_class rejects them; alias them in the SQL instead.
+
+      rows = fetch_records(conn, sql, params)
+
+- LazyRows: rows pulled from any cursor one fetchmany() batch at a time,
+  for unpaginated listings handed straight to stream_template, so neither
+  the rows nor the HTML are ever held in full. Truthy when the query
+  returned anything; iterate once.
+
+      rows = LazyRows(conn.execute(sql, params))
+      rows = iter_records(conn, sql, params)       # the same, with Records
+
+benchmarks/bench_rows.py compares them at 100k rows.
+"""
+import threading
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class Record(tuple):
+    """A result row: a tuple that also answers by column name."""
+
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                key = self._index[key]
+            except KeyError:
+                raise IndexError("No item with that key") from None
+        return tuple.__getitem__(self, key)
+
+    def __getattr__(self, name):
+        try:
+            return tuple.__getitem__(self, self._index[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def keys(self):
+        return list(self._fields)
+
+    def __repr__(self):
+        return f"Record({', '.join(f'{k}={v!r}' for k, v in zip(self._fields, self))})"
+
+
+_classes = {}  # column names -> Record subclass
+_classes_lock = threading.Lock()
+
+
+def record_class(columns):
+    """The Record subclass for a column list (shared by every query returning those columns)."""
+    columns = tuple(columns)
+    cls = _classes.get(columns)
+    if cls is None:
+        shadowed = [name for name in columns if hasattr(Record, name)]
+        if shadowed:
+            raise ValueError(f"column names shadow Record attributes: {', '.join(shadowed)}")
+        index = {}
+        for i, name in enumerate(columns):
+            index.setdefault(name, i)  # duplicate names: first one wins, as with sqlite3.Row
+        cls = type("Record", (Record,), {"__slots__": (), "_fields": columns, "_index": index})
+        with _classes_lock:
+            cls = _classes.setdefault(columns, cls)
+    return cls
+
+
+def execute_records(conn, sql, params=()):
+    """Execute on a fresh cursor whose rows come back as Records."""
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(sql, params)
+    if cur.description is not None:
+        cls = record_class(col[0] for col in cur.description)
+        new = tuple.__new__
+        cur.row_factory = lambda _cursor, row: new(cls, row)
+    return cur
+
+
+def fetch_records(conn, sql, params=()):
+    return execute_records(conn, sql, params).fetchall()
+
+
+class LazyRows:
+    """Rows pulled from a cursor batch by batch; iterate once."""
+
+    def __init__(self, cursor, batch_size=DEFAULT_BATCH_SIZE):
+        self._cursor = cursor
+        self.batch_size = batch_size
+        self._head = cursor.fetchmany(batch_size)
+
+    def __bool__(self):
+        return bool(self._head)
+
+    def __iter__(self):
+        batch, self._head = self._head, []
+        while batch:
+            yield from batch
+            batch = self._cursor.fetchmany(self.batch_size)
+
+
+def iter_records(conn, sql, params=(), batch_size=DEFAULT_BATCH_SIZE):
+    return LazyRows(execute_records(conn, sql, params), batch_size)
@@ -0,0 +1,132 @@
+# models/schedule.py
+"""
+Recurring availability schedules, e.g. "Mon-Fri 09:00-13:00 for 8 weeks".
+A schedule is expanded into one doctor_availability window per matching
+day, checked for overlaps, and inserted with one executemany inside the
+caller's write transaction (models.pool.run_write).
+"""
+from datetime import date, datetime, timedelta
+
+from models.availability import DEFAULT_SLOT_MINUTES, expand_windows
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+class ScheduleError(ValueError):
+    """The schedule is invalid or overlaps existing availability."""
+
+
+def parse_weekdays(values):
+    """['mon', 'Wed', 4] -> sorted weekday numbers (Mon = 0)."""
+    if not isinstance(values, (list, tuple)):
+        raise ScheduleError("Weekdays must be a list.")
+    days = set()
+    for value in values:
+        if isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= 6:
+            days.add(value)
+        elif str(value).strip().lower()[:3] in WEEKDAYS:
+            days.add(WEEKDAYS.index(str(value).strip().lower()[:3]))
+        else:
+            raise ScheduleError(f"Unknown weekday: {value!r}")
+    if not days:
+        raise ScheduleError("Pick at least one weekday.")
+    return sorted(days)
+
+
+def parse_time(value, label):
+    """'9:00' / '09:00' -> '09:00'; anything else is a ScheduleError."""
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value.strip(), "%H:%M").strftime("%H:%M")
+        except ValueError:
+            pass
+    raise ScheduleError(f"{label} must be a time in HH:MM format.")
+
+
+def schedule_dates(start_date, weekdays, weeks):
+    """ISO dates on `weekdays` in the `weeks` weeks starting at start_date."""
+    end = start_date + timedelta(weeks=weeks)
+    day = start_date
+    dates = []
+    while day < end:
+        if day.weekday() in weekdays:
+            dates.append(day.isoformat())
+        day += timedelta(days=1)
+    return dates
+
+
+def create_recurring_windows(
+    cur,
+    doctor_id,
+    start_date,
+    weekdays,
+    start_time,
+    end_time,
+    weeks,
+    max_appointments=10,
+    slot_minutes=DEFAULT_SLOT_MINUTES,
+    max_weeks=26,
+):
+    """
+    Insert every window of the schedule and expand their slots.
+    Returns the number of windows created; raises ScheduleError (before
+    writing anything) if the input is invalid or any window overlaps one
+    the doctor already has.
+    """
+    if isinstance(start_date, str):
+        try:
+            start_date = date.fromisoformat(start_date)
+        except ValueError:
+            raise ScheduleError("Invalid start date.")
+    elif not isinstance(start_date, date):
+        raise ScheduleError("Invalid start date.")
+    if start_date < date.today():
+        raise ScheduleError("Schedule cannot start in the past.")
+    start_time = parse_time(start_time, "Start time")
+    end_time = parse_time(end_time, "End time")
+    if start_time >= end_time:
+        raise ScheduleError("Start time must be before end time.")
+    if isinstance(max_appointments, bool) or not isinstance(max_appointments, int) or max_appointments < 1:
+        raise ScheduleError("Max appointments must be a positive whole number.")
+    if isinstance(weeks, bool) or not isinstance(weeks, int) or not 1 <= weeks <= max_weeks:
+        raise ScheduleError(f"Weeks must be between 1 and {max_weeks}.")
+
+    dates = schedule_dates(start_date, parse_weekdays(weekdays), weeks)
+    if not dates:
+        raise ScheduleError("The schedule produces no dates.")
+
+    clashes = cur.execute(
+        """
+        SELECT date, start_time, end_time FROM doctor_availability
+        WHERE doctor_id = ? AND date >= ? AND date <= ? AND is_available = 1
+          AND start_time < ? AND end_time > ?
+        ORDER BY date, start_time;
+        """,
+        (doctor_id, dates[0], dates[-1], end_time, start_time),
+    ).fetchall()
+    wanted = set(dates)
+    clashes = [c for c in clashes if c[0] in wanted]
+    if clashes:
+        first = clashes[0]
+        raise ScheduleError(
+            f"Overlaps existing availability on {first[0]} {first[1]}-{first[2]}"
+            + (f" and {len(clashes) - 1} more." if len(clashes) > 1 else ".")
+        )
+
+    # All windows go in with one executemany; the write transaction holds the
+    # database lock, so the new rows are exactly those above the previous max id.
+    last_id = cur.execute("SELECT COALESCE(MAX(id), 0) FROM doctor_availability;").fetchone()[0]
+    cur.executemany(
+        """
+        INSERT INTO doctor_availability (doctor_id, date, start_time, end_time, max_appointments, is_available)
+        VALUES (?, ?, ?, ?, ?, 1);
+        """,
+        [(doctor_id, d, start_time, end_time, max_appointments) for d in dates],
+    )
+    new_ids = [
+        row[0] for row in cur.execute(
+            "SELECT id FROM doctor_availability WHERE id > ? AND doctor_id = ?;", (last_id, doctor_id)
+        ).fetchall()
+    ]
+    expand_windows(cur, new_ids, slot_minutes)
+    return len(dates)
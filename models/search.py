@@ -0,0 +1,138 @@
+# models/search.py
+"""
+People search (doctors / patients) backed by an SQLite FTS5 index.
+
+`people_search` has one row per user (rowid = users.id) with the searchable
+text: full name, email, phone and, for doctors, the department name. Triggers
+keep it in sync with users, doctors and departments. When SQLite is built
+without FTS5 the index is simply not created and callers fall back to LIKE.
+"""
+import re
+
+SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_search_user_insert AFTER INSERT ON users
+    BEGIN
+        INSERT INTO people_search (rowid, role, full_name, email, phone, dept_name)
+        VALUES (NEW.id, NEW.role, NEW.full_name, COALESCE(NEW.email, ''), COALESCE(NEW.phone, ''), '');
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_search_user_update
+    AFTER UPDATE OF full_name, email, phone, role ON users
+    BEGIN
+        UPDATE people_search
+        SET role = NEW.role,
+            full_name = NEW.full_name,
+            email = COALESCE(NEW.email, ''),
+            phone = COALESCE(NEW.phone, '')
+        WHERE rowid = NEW.id;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_search_user_delete AFTER DELETE ON users
+    BEGIN
+        DELETE FROM people_search WHERE rowid = OLD.id;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_search_doctor_insert AFTER INSERT ON doctors
+    BEGIN
+        UPDATE people_search
+        SET dept_name = COALESCE((SELECT name FROM departments WHERE id = NEW.department_id), '')
+        WHERE rowid = NEW.user_id;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_search_doctor_update AFTER UPDATE OF department_id ON doctors
+    BEGIN
+        UPDATE people_search
+        SET dept_name = COALESCE((SELECT name FROM departments WHERE id = NEW.department_id), '')
+        WHERE rowid = NEW.user_id;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_search_department_update AFTER UPDATE OF name ON departments
+    BEGIN
+        UPDATE people_search
+        SET dept_name = NEW.name
+        WHERE rowid IN (SELECT user_id FROM doctors WHERE department_id = NEW.id);
+    END;
+    """,
+]
+
+# Which indexed columns each screen searches (mirrors the old LIKE clauses)
+DOCTOR_COLUMNS = ("full_name", "dept_name")
+PATIENT_COLUMNS = ("full_name", "email", "phone")
+
+
+def fts5_supported(conn):
+    try:
+        row = conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5');").fetchone()
+        return bool(row[0])
+    except Exception:
+        return False
+
+
+def create_search_index(conn, config=None):
+    """Migration step: build and back-fill people_search, if FTS5 is available."""
+    if not fts5_supported(conn):
+        return
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS people_search USING fts5(
+            role UNINDEXED,
+            full_name,
+            email,
+            phone,
+            dept_name,
+            tokenize = 'unicode61 remove_diacritics 2'
+        );
+        """
+    )
+    conn.execute("DELETE FROM people_search;")
+    conn.execute(
+        """
+        INSERT INTO people_search (rowid, role, full_name, email, phone, dept_name)
+        SELECT u.id, u.role, u.full_name, COALESCE(u.email, ''), COALESCE(u.phone, ''),
+               COALESCE(dept.name, '')
+        FROM users u
+        LEFT JOIN doctors d ON d.user_id = u.id
+        LEFT JOIN departments dept ON d.department_id = dept.id;
+        """
+    )
+    for sql in SEARCH_TRIGGERS:
+        conn.execute(sql)
+
+
+def has_search_index(conn):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'people_search';"
+    ).fetchone()
+    return row is not None
+
+
+def build_match_query(q, columns):
+    """
+    Turn free text into an FTS5 MATCH expression: every word must match as a
+    prefix in one of `columns`, e.g. "ann car" -> {full_name dept_name} : ("ann"* AND "car"*).
+    Returns None when q has no searchable words.
+    """
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    terms = " AND ".join('"{}"*'.format(w) for w in words)
+    return "{%s} : (%s)" % (" ".join(columns), terms)
+
+
+def search_user_ids(conn, q, role, columns, limit=None):
+    """User ids of `role` matching q, best match first (bm25 rank)."""
+    match = build_match_query(q, columns)
+    if match is None:
+        return []
+    sql = "SELECT rowid FROM people_search WHERE people_search MATCH ? AND role = ? ORDER BY rank"
+    params = [match, role]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return [row[0] for row in conn.execute(sql + ";", params).fetchall()]
@@ -0,0 +1,145 @@
+# models/snapshot.py
+"""
+Shared 7-day availability snapshot (the table on every patient dashboard).
+
+The rows are the same for every patient, so each worker keeps one copy in
+memory, grouped by doctor:
+
+- the first read (or a new day, or an entry older than max_age) rebuilds
+  the whole snapshot with one query;
+- invalidate(doctor_id) marks one doctor dirty, and the next read re-queries
+  only the dirty doctors' windows and merges their rows into the sorted list;
+- invalidate() with no doctor forces a full rebuild (doctor names or
+  departments changed).
+
+Like the directory cache, invalidation reaches only the current process;
+max_age bounds how long other workers (or CLI imports) can serve stale rows.
+"""
+import heapq
+import json
+import threading
+import time
+from datetime import date, timedelta
+
+from flask import current_app
+
+from models.rows import execute_records
+
+WEEK_AVAILABILITY_QUERY = """
+    SELECT da.doctor_id,
+           da.date,
+           da.start_time,
+           da.end_time,
+           du.full_name AS doctor_name,
+           dept.name AS dept_name
+    FROM doctor_availability da
+    JOIN doctors d ON da.doctor_id = d.id
+    JOIN users du ON d.user_id = du.id
+    LEFT JOIN departments dept ON d.department_id = dept.id
+    WHERE da.is_available = 1
+      AND da.date >= ?
+      AND da.date <= ?
+"""
+
+
+def sort_key(row):
+    return (row["date"], row["start_time"], row["doctor_name"])
+
+
+class AvailabilitySnapshot:
+    def __init__(self, days=7, max_age=60):
+        self.days = days
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._by_doctor = {}    # doctor_id -> [Records]
+        self._rows = None       # merged + sorted view of _by_doctor; None = re-merge
+        self._day = None        # the "today" the snapshot was built for
+        self._built_at = 0.0
+        self._dirty = set()
+        self._stale = True
+
+        self.hits = 0
+        self.rebuilds = 0
+        self.refreshes = 0
+
+    def invalidate(self, doctor_id=None):
+        with self._lock:
+            if doctor_id is None:
+                self._stale = True
+            else:
+                self._dirty.add(int(doctor_id))
+
+    def rows(self, conn, today=None):
+        """Every open window from today to today + days, ordered by date, time, doctor."""
+        today = today or date.today()
+        with self._lock:
+            expired = self.max_age is not None and time.monotonic() - self._built_at > self.max_age
+            if self._stale or expired or self._day != today:
+                self._rebuild(conn, today)
+            elif self._dirty:
+                self._refresh(conn, today)
+            else:
+                self.hits += 1
+            if self._rows is None:
+                self._rows = tuple(sorted(
+                    (row for rows in self._by_doctor.values() for row in rows), key=sort_key
+                ))
+            return self._rows
+
+    def _window(self, today):
+        return today.isoformat(), (today + timedelta(days=self.days)).isoformat()
+
+    def _rebuild(self, conn, today):
+        by_doctor = {}
+        for row in execute_records(conn, WEEK_AVAILABILITY_QUERY + ";", self._window(today)):
+            by_doctor.setdefault(row["doctor_id"], []).append(row)
+        self._by_doctor = by_doctor
+        self._rows = None
+        self._day = today
+        self._built_at = time.monotonic()
+        self._dirty.clear()
+        self._stale = False
+        self.rebuilds += 1
+
+    def _refresh(self, conn, today):
+        doctor_ids = sorted(self._dirty)
+        fresh = {doctor_id: [] for doctor_id in doctor_ids}
+        rows = execute_records(
+            conn,
+            WEEK_AVAILABILITY_QUERY + " AND da.doctor_id IN (SELECT value FROM json_each(?));",
+            (*self._window(today), json.dumps(doctor_ids)),
+        )
+        for row in rows:
+            fresh[row["doctor_id"]].append(row)
+        for doctor_id, doctor_rows in fresh.items():
+            if doctor_rows:
+                self._by_doctor[doctor_id] = doctor_rows
+            else:
+                self._by_doctor.pop(doctor_id, None)
+        if self._rows is not None:
+            kept = (row for row in self._rows if row["doctor_id"] not in self._dirty)
+            changed = sorted((row for rows in fresh.values() for row in rows), key=sort_key)
+            self._rows = tuple(heapq.merge(kept, changed, key=sort_key))
+        self._dirty.clear()
+        self.refreshes += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "doctors": len(self._by_doctor),
+                "rows": sum(len(rows) for rows in self._by_doctor.values()),
+                "hits": self.hits,
+                "rebuilds": self.rebuilds,
+                "refreshes": self.refreshes,
+            }
+
+
+# --------- Flask glue ---------
+def get_snapshot():
+    return current_app.extensions["availability_snapshot"]
+
+
+def init_app(app):
+    snapshot = AvailabilitySnapshot(max_age=app.config.get("AVAILABILITY_SNAPSHOT_MAX_AGE", 60))
+    app.extensions["availability_snapshot"] = snapshot
+    return snapshot
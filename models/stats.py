@@ -0,0 +1,162 @@
+# models/stats.py
+"""
+Materialized counters.
+`hospital_stats` holds a single row (id = 1) kept current by the triggers
+created in migration 2; `doctor_stats` holds one row per doctor (migration 3).
+Dashboards read these instead of running COUNT(*) scans.
+"""
+from models.models import DB_PATH, get_db_connection
+
+STATUSES = ("Booked", "Completed", "Cancelled")
+
+COUNTER_COLUMNS = (
+    "total_doctors",
+    "total_patients",
+    "total_appointments",
+    "booked",
+    "completed",
+    "cancelled",
+)
+
+# Same counters computed the slow way, straight from the base tables
+RECOUNT_SQL = """
+    SELECT (SELECT COUNT(*) FROM doctors) AS total_doctors,
+           (SELECT COUNT(*) FROM patients) AS total_patients,
+           (SELECT COUNT(*) FROM appointments) AS total_appointments,
+           (SELECT COUNT(*) FROM appointments WHERE status = 'Booked') AS booked,
+           (SELECT COUNT(*) FROM appointments WHERE status = 'Completed') AS completed,
+           (SELECT COUNT(*) FROM appointments WHERE status = 'Cancelled') AS cancelled;
+"""
+
+
+def read_stats(conn):
+    """
+    Summary stats from the counters row:
+    {total_doctors, total_patients, total_appointments, by_status}.
+    by_status only lists statuses that occur, like the old GROUP BY did.
+    """
+    row = conn.execute("SELECT * FROM hospital_stats WHERE id = 1;").fetchone()
+    if row is None:
+        row = conn.execute(RECOUNT_SQL).fetchone()
+    by_status = {
+        status: row[status.lower()] for status in STATUSES if row[status.lower()]
+    }
+    return {
+        "total_doctors": row["total_doctors"],
+        "total_patients": row["total_patients"],
+        "total_appointments": row["total_appointments"],
+        "by_status": by_status,
+    }
+
+
+def reconcile_stats(db_path=DB_PATH):
+    """
+    Rebuild the counters row from scratch.
+    Returns {column: (stored, actual)} for every counter that had drifted.
+    """
+    conn = get_db_connection(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE;")
+        stored = conn.execute("SELECT * FROM hospital_stats WHERE id = 1;").fetchone()
+        actual = conn.execute(RECOUNT_SQL).fetchone()
+
+        drift = {}
+        for col in COUNTER_COLUMNS:
+            old = stored[col] if stored else None
+            if old != actual[col]:
+                drift[col] = (old, actual[col])
+
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO hospital_stats
+                (id, total_doctors, total_patients, total_appointments, booked, completed, cancelled)
+            VALUES (1, ?, ?, ?, ?, ?, ?);
+            """,
+            tuple(actual[col] for col in COUNTER_COLUMNS),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return drift
+
+
+# --------- Per-doctor counters ---------
+DOCTOR_COUNTER_COLUMNS = ("total", "booked", "completed", "cancelled")
+
+DOCTOR_RECOUNT_SQL = """
+    SELECT d.id AS doctor_id,
+           COUNT(a.id) AS total,
+           COALESCE(SUM(a.status = 'Booked'), 0) AS booked,
+           COALESCE(SUM(a.status = 'Completed'), 0) AS completed,
+           COALESCE(SUM(a.status = 'Cancelled'), 0) AS cancelled
+    FROM doctors d
+    LEFT JOIN appointments a ON a.doctor_id = d.id
+    GROUP BY d.id;
+"""
+
+
+DOCTOR_STATS_QUERY = """
+    SELECT COALESCE(s.total, 0) AS total,
+           COALESCE(s.completed, 0) AS completed,
+           COALESCE(s.booked, 0) - (
+               SELECT COUNT(*) FROM appointments
+               WHERE doctor_id = ? AND status = 'Booked' AND date < ?
+           ) AS upcoming
+    FROM (SELECT 1) LEFT JOIN doctor_stats s ON s.doctor_id = ?;
+"""
+
+
+def read_doctor_stats(conn, doctor_id, today_str):
+    """
+    {total, upcoming, completed} for one doctor in a single statement.
+    "upcoming" is the Booked counter minus Booked appointments already in the
+    past, which the (doctor_id, status, date) index counts without a scan.
+    """
+    row = conn.execute(DOCTOR_STATS_QUERY, (doctor_id, today_str, doctor_id)).fetchone()
+    return {"total": row["total"], "upcoming": row["upcoming"], "completed": row["completed"]}
+
+
+def check_doctor_stats(db_path=DB_PATH, repair=False):
+    """
+    Compare doctor_stats against a recount of the appointments table.
+    Returns {doctor_id: {column: (stored, actual)}} for inconsistent doctors;
+    with repair=True the drifted rows are rewritten from the recount.
+    """
+    conn = get_db_connection(db_path)
+    try:
+        conn.execute("BEGIN IMMEDIATE;")
+        stored = {
+            row["doctor_id"]: row
+            for row in conn.execute("SELECT * FROM doctor_stats;").fetchall()
+        }
+        drift = {}
+        fixes = []
+        for actual in conn.execute(DOCTOR_RECOUNT_SQL).fetchall():
+            row = stored.get(actual["doctor_id"])
+            diffs = {
+                col: (row[col] if row else None, actual[col])
+                for col in DOCTOR_COUNTER_COLUMNS
+                if (row[col] if row else None) != actual[col]
+            }
+            if diffs:
+                drift[actual["doctor_id"]] = diffs
+                fixes.append(tuple(actual))
+
+        if repair and fixes:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO doctor_stats (doctor_id, total, booked, completed, cancelled)
+                VALUES (?, ?, ?, ?, ?);
+                """,
+                fixes,
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return drift
@@ -0,0 +1,142 @@
+# serve.py
+"""
+Pre-fork production entry point.
+
+    HMS_SECRET_KEY=... python serve.py --workers 4 --port 8000
+
+The parent brings the database schema up to date, binds the listening
+socket and imports the application code, then forks --workers processes
+(default HMS_WORKERS, else one per CPU). Each worker builds its own app
+with create_production_app(migrate=False) -- sqlite connections must not
+cross a fork -- warms it up, and only then starts accepting connections
+on the shared socket, with a thread per request. Workers that die are
+replaced, after a delay that doubles while replacements keep dying within
+--min-uptime seconds. A worker dying that fast before any worker has
+stayed up (a bad config, an unreadable database), or --max-failures such
+deaths in a row, stops the server instead. SIGTERM/SIGINT stop them all.
+
+Any pre-fork WSGI server can run the same factory instead, e.g.
+gunicorn -w 4 'app:create_production_app()'.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+from app import config_from_env, prepare_database
+from models.models import DB_PATH
+from warmup import preload_modules
+
+
+def default_workers():
+    return int(config_from_env().get("WORKERS") or os.cpu_count() or 1)
+
+
+def run_worker(sock, host, port):
+    from werkzeug.serving import make_server
+
+    from app import create_production_app
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    app = create_production_app(migrate=False)  # the parent has migrated
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    app.logger.info("worker %d ready", os.getpid())
+    server.serve_forever()
+
+
+def spawn(sock, host, port):
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            run_worker(sock, host, port)
+        except BaseException:
+            import traceback
+
+            traceback.print_exc()
+            status = 1
+        finally:
+            os._exit(status)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork HMS server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None, help="default: HMS_WORKERS, else CPU count")
+    parser.add_argument("--backlog", type=int, default=128)
+    parser.add_argument("--min-uptime", type=float, default=5.0,
+                        help="workers dying sooner than this count as failed starts")
+    parser.add_argument("--max-failures", type=int, default=5,
+                        help="consecutive failed starts before giving up")
+    args = parser.parse_args()
+    workers = args.workers or default_workers()
+
+    config = config_from_env()
+    if "SECRET_KEY" not in config:
+        sys.exit("HMS_SECRET_KEY must be set")
+    # Once, here: workers migrating concurrently would race for the lock
+    prepare_database(config.get("DATABASE", DB_PATH), config)
+
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog)
+    sock.set_inheritable(True)
+    preload_modules()
+
+    children = {spawn(sock, args.host, args.port): time.monotonic() for _ in range(workers)}
+    print(f"Serving on http://{args.host}:{args.port} with {workers} workers", flush=True)
+
+    stopping = False
+
+    def stop(signum=None, frame=None):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    started_once = False  # some worker has stayed up for min_uptime
+    failures = 0          # consecutive workers that died within min_uptime
+    exit_status = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        now = time.monotonic()
+        uptime = now - children.pop(pid)
+        if stopping:
+            continue
+        started_once = started_once or any(now - t >= args.min_uptime for t in children.values())
+        if uptime >= args.min_uptime:
+            started_once = True
+            failures = 0
+        else:
+            failures += 1
+            if not started_once or failures >= args.max_failures:
+                print(f"worker {pid} exited ({status}) after {uptime:.1f}s; "
+                      "workers are failing to start, shutting down", file=sys.stderr, flush=True)
+                exit_status = 1
+                stop()
+                continue
+        delay = min(30.0, 0.5 * 2 ** failures) if failures else 0.0
+        print(f"worker {pid} exited ({status}); restarting in {delay:.1f}s", file=sys.stderr, flush=True)
+        deadline = time.monotonic() + delay
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(min(0.1, delay))
+        if not stopping:
+            children[spawn(sock, args.host, args.port)] = time.monotonic()
+    sock.close()
+    sys.exit(exit_status)
+
+
+if __name__ == "__main__":
+    main()
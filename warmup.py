@@ -0,0 +1,66 @@
+# warmup.py
+"""
+Start-up warm-up for production workers (app.create_production_app).
+
+Without it the first requests served by each worker compile their Jinja
+templates, open the pooled sqlite connections and load the department /
+doctor directory caches. warm_up() does all of that before the worker
+accepts traffic, and logs how long each step took.
+"""
+import importlib
+import time
+
+# Imported by serve.py before forking, so every worker shares them
+APP_MODULES = (
+    "app",
+    "commands",
+    "controllers.routes",
+    "controllers.api",
+    "models.availability",
+    "models.booking",
+    "models.export",
+    "models.metrics",
+    "models.passwords",
+    "models.pool",
+    "warmup",
+)
+
+
+def preload_modules():
+    for name in APP_MODULES:
+        importlib.import_module(name)
+
+
+def precompile_templates(app):
+    """Compile every template into the Jinja environment's cache."""
+    env = app.jinja_env
+    names = env.list_templates(filter_func=lambda name: name.endswith(".html"))
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def warm_pool(app):
+    return app.extensions["db_pool"].prefill()
+
+
+def warm_caches(app):
+    from controllers.routes import get_departments, get_doctor_directory
+
+    with app.app_context():
+        return len(get_departments()) + len(get_doctor_directory())
+
+
+def warm_up(app):
+    """Run every warm-up step; returns {step: seconds}."""
+    timings = {}
+    for step, fn in (
+        ("templates", precompile_templates),
+        ("pool", warm_pool),
+        ("caches", warm_caches),
+    ):
+        started = time.perf_counter()
+        count = fn(app)
+        timings[step] = time.perf_counter() - started
+        app.logger.info("warm-up %s: %d in %.1f ms", step, count, timings[step] * 1000)
+    return timings